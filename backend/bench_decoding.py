@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from model_registry import registry, configure_torch_threads, GENERATION_MODEL_NAME
+from generation import AnswerGenerator
+from decoding import DecodingPolicy
+from bench_quantization import load_workload, percentile_ms
+
+
+def run(generator, questions, contexts, batch_size):
+    """
+    Menjawab workload satu per satu (seperti request /ask) lalu sekaligus dalam batch.
+    """
+    latencies = []
+    answers = []
+    for question, context in zip(questions, contexts):
+        start = time.perf_counter()
+        answers.extend(generator.generate_answers([question], [context]))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    generator.generate_answers(questions, contexts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "latency_ms_p50": percentile_ms(latencies, 50),
+        "latency_ms_p99": percentile_ms(latencies, 99),
+        "latency_ms_mean": round(float(np.mean(latencies)) * 1000.0, 3),
+        "batch_throughput_per_second": round(len(questions) / batch_seconds, 2),
+    }, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kebijakan decoding T5 (beam, greedy, greedy adaptif, assisted).")
+    parser.add_argument("--generation-model", default=GENERATION_MODEL_NAME)
+    parser.add_argument("--assistant-model", default=None, help="Model draft kecil untuk assisted decoding (tokenizer sama)")
+    parser.add_argument("--knowledge-base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+    parser.add_argument("--num-queries", type=int, default=50)
+    parser.add_argument("--max-new-tokens", type=int, default=150)
+    parser.add_argument("--min-new-tokens", type=int, default=16)
+    parser.add_argument("--context-ratio", type=float, default=0.75)
+    parser.add_argument("--escalate-confidence", type=float, default=0.5)
+    parser.add_argument("--escalate-beams", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--num-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    threads = configure_torch_threads(args.num_threads)
+    questions, contexts = load_workload(args.knowledge_base, args.num_queries)
+    tokenizer = registry.get_tokenizer(args.generation_model)
+    model = registry.get_seq2seq_model(args.generation_model)
+    assistant_model = registry.get_seq2seq_model(args.assistant_model) if args.assistant_model else None
+
+    options = {
+        "min_new_tokens": args.min_new_tokens, "max_new_tokens": args.max_new_tokens,
+        "context_ratio": args.context_ratio, "escalate_confidence": args.escalate_confidence,
+        "escalate_beams": args.escalate_beams,
+    }
+    policies = {
+        "beam": DecodingPolicy(mode="beam", **options),
+        "greedy": DecodingPolicy(mode="greedy", **options),
+        "adaptive": DecodingPolicy(mode="adaptive", **options),
+    }
+    if assistant_model is not None:
+        policies["adaptive_assisted"] = DecodingPolicy(mode="adaptive", assistant_model=assistant_model, **options)
+
+    results = {}
+    baseline_answers = None
+    for name, policy in policies.items():
+        generator = AnswerGenerator(tokenizer, model, decoding_policy=policy)
+        # Pemanasan agar alokasi pertama tidak ikut terukur
+        generator.generate_answers(questions[:1], contexts[:1])
+        result, answers = run(generator, questions, contexts, args.batch_size)
+        if baseline_answers is None:
+            baseline_answers = answers
+        # Beam search (perilaku lama) menjadi acuan kualitas kebijakan lain
+        result["answer_exact_match_vs_beam"] = round(float(np.mean(
+            [a.strip() == b.strip() for a, b in zip(baseline_answers, answers)]
+        )), 4)
+        result["decoding"] = policy.stats()
+        results[name] = result
+
+    print(json.dumps({
+        "config": vars(args),
+        "torch_threads": threads,
+        "policies": results,
+        "latency_p50_speedup_vs_beam": {
+            name: round(results["beam"]["latency_ms_p50"] / result["latency_ms_p50"], 3)
+            for name, result in results.items()
+        },
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
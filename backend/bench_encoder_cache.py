@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import random
+import time
+import numpy as np
+from model_registry import registry, configure_torch_threads, GENERATION_MODEL_NAME
+from generation import AnswerGenerator
+from encoder_cache import EncoderCache
+
+# Templat pertanyaan berbeda yang mengambil konteks (penyebab) yang sama
+QUESTION_TEMPLATES = [
+    "Apa penyebab {gejala}?",
+    "Kenapa {gejala}?",
+    "Mengapa mobil saya {gejala}?",
+    "Bagaimana mengatasi {gejala}?",
+    "Apa yang harus diperiksa jika {gejala}?",
+]
+
+
+def load_workload(knowledge_base_path, num_contexts, num_queries, seed=0):
+    """
+    Menyusun workload konteks berulang: ``num_queries`` pertanyaan atas ``num_contexts`` konteks,
+    dengan popularitas konteks mengikuti distribusi Zipf (beberapa penyebab sangat sering terambil).
+    """
+    with open(knowledge_base_path, "r", encoding="utf-8") as file:
+        entries = [entry for entry in json.load(file) if entry.get("gejala") and entry.get("penyebab")]
+    rng = random.Random(seed)
+    entries = rng.sample(entries, min(num_contexts, len(entries)))
+    weights = [1.0 / rank for rank in range(1, len(entries) + 1)]
+
+    questions, contexts = [], []
+    for entry in rng.choices(entries, weights=weights, k=num_queries):
+        questions.append(rng.choice(QUESTION_TEMPLATES).format(gejala=entry["gejala"].lower()))
+        contexts.append(entry["penyebab"])
+    return questions, contexts
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000.0, 3)
+
+
+def run(generator, questions, contexts, args):
+    """
+    Menjawab workload satu per satu (seperti request /ask) lalu sekaligus dalam batch.
+    """
+    latencies = []
+    answers = []
+    for question, context in zip(questions, contexts):
+        start = time.perf_counter()
+        answers.extend(generator.generate_answers(
+            [question], [context], max_length=args.max_length, num_beams=args.num_beams
+        ))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    generator.generate_answers(
+        questions, contexts, max_length=args.max_length, num_beams=args.num_beams, batch_size=args.batch_size
+    )
+    batch_seconds = time.perf_counter() - start
+    return {
+        "latency_ms_p50": percentile_ms(latencies, 50),
+        "latency_ms_p99": percentile_ms(latencies, 99),
+        "latency_ms_mean": round(float(np.mean(latencies)) * 1000.0, 3),
+        "batch_throughput_per_second": round(len(questions) / batch_seconds, 2),
+    }, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cache encoder T5 pada workload konteks berulang.")
+    parser.add_argument("--generation-model", default=GENERATION_MODEL_NAME)
+    parser.add_argument("--knowledge-base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+    parser.add_argument("--num-contexts", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024, help="Batas memori cache encoder")
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--num-beams", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--num-threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    threads = configure_torch_threads(args.num_threads)
+    questions, contexts = load_workload(args.knowledge_base, args.num_contexts, args.num_queries, args.seed)
+    tokenizer = registry.get_tokenizer(args.generation_model)
+    model = registry.get_seq2seq_model(args.generation_model)
+
+    baseline = AnswerGenerator(tokenizer, model)
+    cache = EncoderCache(max_bytes=args.max_bytes)
+    cached = AnswerGenerator(tokenizer, model, encoder_cache=cache)
+
+    # Pemanasan agar alokasi pertama tidak ikut terukur; cache dikosongkan lagi sesudahnya
+    baseline.generate_answers(questions[:1], contexts[:1], max_length=args.max_length, num_beams=args.num_beams)
+    cached.generate_answers(questions[:1], contexts[:1], max_length=args.max_length, num_beams=args.num_beams)
+    cache.clear()
+
+    baseline_result, baseline_answers = run(baseline, questions, contexts, args)
+    cached_result, cached_answers = run(cached, questions, contexts, args)
+    cached_result["cache"] = cache.stats()
+
+    # Encoding terpisah mengubah masukan decoder, jadi jawaban dibandingkan dengan prompt gabungan
+    exact = np.mean([a.strip() == b.strip() for a, b in zip(baseline_answers, cached_answers)])
+    print(json.dumps({
+        "config": vars(args),
+        "torch_threads": threads,
+        "distinct_contexts": len(set(contexts)),
+        "joint_prompt": baseline_result,
+        "encoder_cache": cached_result,
+        "latency_p50_speedup": round(baseline_result["latency_ms_p50"] / cached_result["latency_ms_p50"], 3),
+        "answer_exact_match_vs_joint": round(float(exact), 4),
+        "sample_answers": [
+            {"question": q, "joint": a, "encoder_cache": b}
+            for q, a, b in list(zip(questions, baseline_answers, cached_answers))[:3]
+        ],
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
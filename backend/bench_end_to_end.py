@@ -0,0 +1,432 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Kosakata entri sintetis berformat "gejala: penyebab Solusi: solusi"
+SYMPTOMS = [
+    "mesin sulit dinyalakan", "mesin bergetar kasar", "lampu redup", "rem berdecit", "asap putih keluar",
+    "suhu mesin naik", "tarikan berat", "bau bensin menyengat", "setir terasa berat", "aki cepat habis",
+    "AC tidak dingin", "oli cepat berkurang", "knalpot berbunyi keras", "kopling selip", "indikator mesin menyala",
+]
+COMPONENTS = [
+    "aki", "busi", "alternator", "radiator", "injektor", "karburator", "kampas rem", "pompa bensin",
+    "termostat", "kompresor", "filter udara", "sensor oksigen", "timing belt", "power steering", "kopling",
+]
+CONDITIONS = ["aus", "kotor", "bocor", "longgar", "rusak", "lemah", "tersumbat", "retak"]
+ACTIONS = ["ganti", "bersihkan", "kencangkan", "periksa", "setel ulang", "isi ulang"]
+
+# Jumlah baris entri per halaman PDF sintetis (satu baris 14 pt pada halaman A4)
+ENTRIES_PER_PAGE = 50
+
+
+def synthetic_entries(num_entries, seed=0):
+    """
+    Membuat entri knowledge base sintetis yang deterministik (gejala unik per entri).
+    """
+    rng = random.Random(seed)
+    entries = []
+    for i in range(num_entries):
+        component = rng.choice(COMPONENTS)
+        entries.append({
+            "gejala": f"{rng.choice(SYMPTOMS)} pada unit {i}",
+            "penyebab": f"{component} {rng.choice(CONDITIONS)} pada sistem {rng.choice(COMPONENTS)}",
+            "solusi": f"{rng.choice(ACTIONS)} {component}",
+        })
+    return entries
+
+
+def write_pdf(path, pages):
+    """
+    Menulis PDF minimal (font Helvetica bawaan, satu content stream per halaman) tanpa dependensi.
+
+    :param pages: List halaman, masing-masing list baris teks (latin-1)
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        escaped = (line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines)
+        stream = ("BT /F1 10 Tf 40 800 Td 14 TL " + " ".join(f"({line}) '" for line in escaped) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as file:
+        file.write(output)
+
+
+def write_synthetic_pdf(path, entries):
+    """
+    Menulis entri sintetis ke PDF, ENTRIES_PER_PAGE baris "gejala: penyebab Solusi: solusi" per halaman.
+    """
+    lines = [f"{entry['gejala']}: {entry['penyebab']} Solusi: {entry['solusi']}" for entry in entries]
+    write_pdf(path, [lines[i:i + ENTRIES_PER_PAGE] for i in range(0, len(lines), ENTRIES_PER_PAGE)])
+
+
+def build_tiny_models(model_dir, seed=0):
+    """
+    Membuat model embedding BERT (SentenceTransformer) dan model generasi T5 kecil berbobot acak
+    dengan tokenizer WordPiece dari kosakata entri sintetis, agar benchmark berjalan tanpa unduhan.
+    Yang terukur adalah kaskade dan infrastrukturnya, bukan kualitas atau latensi model produksi.
+
+    :return: (path model embedding, path model generasi)
+    """
+    import string
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import AutoModel, AutoModelForSeq2SeqLM, BertConfig, BertTokenizerFast, T5Config
+
+    torch.manual_seed(seed)
+    embedding_dir = os.path.join(model_dir, "bert")
+    generation_dir = os.path.join(model_dir, "t5")
+    os.makedirs(embedding_dir, exist_ok=True)
+    os.makedirs(generation_dir, exist_ok=True)
+
+    # Kata di luar kosakata dipecah menjadi karakter (##x), jadi teks apa pun tetap ter-tokenize
+    words = {word.lower() for phrase in SYMPTOMS + COMPONENTS + CONDITIONS + ACTIONS for word in phrase.split()}
+    words.update(["apa", "penyebab", "pada", "unit", "sistem", "solusi", "kasus", "question", "context"])
+    characters = string.ascii_lowercase + string.digits
+    vocab = (["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list(characters) + list(string.punctuation)
+             + [f"##{character}" for character in characters] + sorted(words))
+    vocab_path = os.path.join(model_dir, "vocab.txt")
+    with open(vocab_path, "w", encoding="utf-8") as file:
+        file.write("\n".join(vocab))
+    tokenizer = BertTokenizerFast(vocab_path, model_max_length=512)
+    # T5 tidak menerima token_type_ids; dengan tokenizer BERT biasa setiap generate akan gagal
+    t5_tokenizer = BertTokenizerFast(vocab_path, model_max_length=512, model_input_names=["input_ids", "attention_mask"])
+
+    bert = AutoModel.from_config(BertConfig(
+        vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512,
+    ))
+    bert.save_pretrained(embedding_dir)
+    tokenizer.save_pretrained(embedding_dir)
+    embedding_model = SentenceTransformer(modules=[
+        models.Transformer(embedding_dir, max_seq_length=256), models.Pooling(bert.config.hidden_size, "mean"),
+    ])
+    embedding_model.save(embedding_dir)
+
+    t5 = AutoModelForSeq2SeqLM.from_config(T5Config(
+        vocab_size=len(vocab), d_model=32, d_kv=8, d_ff=64, num_layers=2, num_heads=2,
+        pad_token_id=t5_tokenizer.pad_token_id, eos_token_id=t5_tokenizer.sep_token_id,
+        decoder_start_token_id=t5_tokenizer.pad_token_id,
+    ))
+    t5.save_pretrained(generation_dir)
+    t5_tokenizer.save_pretrained(generation_dir)
+    return embedding_dir, generation_dir
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000.0, 3) if latencies else None
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "latency_ms_p50": percentile_ms(latencies, 50),
+        "latency_ms_p99": percentile_ms(latencies, 99),
+        "latency_ms_mean": round(float(np.mean(latencies)) * 1000.0, 3) if latencies else None,
+    }
+
+
+def timed(fn, items):
+    """
+    Menjalankan ``fn`` untuk setiap item secara berurutan dan mengembalikan latensinya (detik).
+    """
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def peak_rss_bytes():
+    # ru_maxrss dalam KiB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def check_answers(name, answers, error_answer):
+    """
+    Menggagalkan benchmark jika ada jawaban yang gagal digenerasi (None atau jawaban pengganti error):
+    latensinya mengukur jalur exception, bukan generasi.
+    """
+    failed = sum(1 for answer in answers if answer is None or answer == error_answer)
+    if failed:
+        raise RuntimeError(f"{failed} dari {len(answers)} jawaban tahap {name} gagal digenerasi: {error_answer!r}")
+
+
+def run_throughput(app, queries, clients, requests_per_client, error_answer):
+    """
+    Mengirim POST /ask dari ``clients`` klien bersamaan lewat test client Flask.
+    Setiap request memakai query unik agar tidak dijawab cache jawaban persis.
+    """
+    def client_loop(client_id):
+        client = app.test_client()
+        latencies, statuses, answers = [], {}, []
+        for i in range(requests_per_client):
+            query = f"{queries[(client_id * requests_per_client + i) % len(queries)]} kasus {client_id}-{i}"
+            start = time.perf_counter()
+            response = client.post("/ask", json={"query": query})
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                answers.append(response.get_json().get("answer"))
+        check_answers(f"throughput ({clients} klien)", answers, error_answer)
+        return latencies, statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client_loop, range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    statuses = {}
+    for _, client_statuses in results:
+        for status, count in client_statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    return dict(
+        summarize(latencies),
+        clients=clients,
+        requests_per_second=round(len(latencies) / elapsed, 2),
+        statuses=statuses,
+    )
+
+
+def run_background_startup(args):
+    """
+    Mengukur start di latar (STARTUP_MODE=background): waktu impor sampai app bisa menerima request,
+    waktu sampai /ask pertama terjawab (dan tahap yang menjawabnya) serta waktu sampai semua komponen siap.
+    """
+    start = time.perf_counter()
+    import sistem_pakar_backend as backend
+    result = {"bind_seconds": round(time.perf_counter() - start, 3)}
+
+    client = backend.app.test_client()
+    query = f"Apa penyebab {synthetic_entries(args.worker_size, args.seed)[0]['gejala'].lower()}?"
+    rejected = 0
+    while True:
+        finished = backend.warmup.wait(0)
+        response = client.post("/ask", json={"query": query})
+        if response.status_code == 200:
+            result["first_answer_seconds"] = round(time.perf_counter() - start, 3)
+            result["first_answer_stage"] = response.get_json().get("stage")
+            break
+        rejected += 1
+        if finished:
+            raise RuntimeError(f"/ask tetap gagal setelah warmup selesai: {response.status_code} {response.get_data(as_text=True)}")
+        time.sleep(0.05)
+    result["rejected_before_first_answer"] = rejected
+
+    backend.warmup.wait()
+    status = backend.warmup.status()
+    result["ready_seconds"] = round(time.perf_counter() - start, 3)
+    result["components"] = {
+        name: {"load_seconds": component["load_seconds"], "ready_at_seconds": component["ready_at_seconds"]}
+        for name, component in status["components"].items()
+    }
+    if backend.embedding_batcher is not None:
+        backend.embedding_batcher.close()
+    return result
+
+
+def run_worker(args):
+    """
+    Mengukur satu ukuran knowledge base di proses tersendiri: waktu impor backend (startup),
+    latensi per tahap kaskade /ask, throughput klien bersamaan dan RSS puncak.
+    Konfigurasi backend (PDF, indeks, artefak, model) sudah diatur lewat env oleh proses induk.
+    """
+    start = time.perf_counter()
+    import sistem_pakar_backend as backend
+    from generation import GENERATION_ERROR_ANSWER
+    startup_seconds = time.perf_counter() - start
+    result = {"startup_seconds": round(startup_seconds, 3), "peak_rss_after_startup_bytes": peak_rss_bytes()}
+    if args.startup_only:
+        # Start dingin juga menyinkronkan indeks FAISS dari PDF (di produksi dibangun terpisah)
+        start = time.perf_counter()
+        result["faiss_sync"] = backend.qa_model.faiss_index_manager.add_to_index()
+        result["faiss_build_seconds"] = round(time.perf_counter() - start, 3)
+        backend.embedding_batcher.close()
+        return result
+
+    entries = synthetic_entries(args.worker_size, args.seed)
+    rng = random.Random(args.seed + 1)
+    sample = rng.sample(entries, min(args.num_queries, len(entries)))
+    queries = [f"Apa penyebab {entry['gejala'].lower()}?" for entry in sample]
+
+    # Pemanasan agar alokasi pertama tidak ikut terukur
+    backend.answer_query(queries[0])
+
+    embeddings = {}
+
+    def embed(query):
+        embeddings[query] = backend.embedding_model.encode(
+            [query], convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)[0]
+
+    contexts = {}
+
+    def faiss_search(query):
+        results, _ = backend.qa_model.faiss_index_manager.search_index(query, top_k=5)
+        contexts[query] = results[0]["penyebab"] if results else ""
+
+    answers = {"t5_generate": [], "answer_query": []}
+
+    def generate(query):
+        answers["t5_generate"].append(backend.qa_model.generate_answer(query, contexts[query]))
+
+    answered_by = {}
+
+    def answer(query):
+        response = backend.answer_query(query)
+        answers["answer_query"].append(response.get("answer"))
+        stage = str(response.get("stage"))
+        answered_by[stage] = answered_by.get(stage, 0) + 1
+
+    generate_queries = queries[:args.generate_queries]
+    stages = {
+        "embed": timed(embed, queries),
+        "kb_scan": timed(lambda query: backend.get_answer_from_knowledge_base(query, embeddings[query]), queries),
+        "rag_retrieve": timed(backend.rag_pipeline.retrieve_relevant_info, queries),
+        "faiss_search": timed(faiss_search, queries),
+        "t5_generate": timed(generate, generate_queries),
+        # Kaskade lengkap tanpa cache (knowledge base -> RAG -> QA model, berhenti di tahap yang yakin)
+        "answer_query": timed(answer, queries),
+    }
+    for name, stage_answers in answers.items():
+        check_answers(name, stage_answers, GENERATION_ERROR_ANSWER)
+    result["stages"] = {name: summarize(latencies) for name, latencies in stages.items()}
+    result["answered_by"] = answered_by
+    result["throughput"] = [
+        run_throughput(backend.app, queries, clients, args.requests_per_client, GENERATION_ERROR_ANSWER)
+        for clients in args.clients
+    ]
+    # Tahap kaskade yang error (mis. generasi QA model gagal) tidak muncul sebagai jawaban error
+    stage_errors = {stage["name"]: stage["errors"] for stage in backend.ask_cascade.stats()["stages"] if stage["errors"]}
+    if stage_errors:
+        raise RuntimeError(f"Tahap kaskade gagal selama benchmark: {stage_errors}")
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    result["debug"] = {
+        "inference_pool": backend.inference_pool.stats(),
+        "cascade": backend.ask_cascade.stats(),
+        "models": backend.model_registry.report(),
+    }
+    backend.embedding_batcher.close()
+    return result
+
+
+def run_size(args, size, work_dir):
+    """
+    Menjalankan satu ukuran knowledge base: start dingin (membangun artefak, indeks dan cache
+    embedding dari PDF), start hangat yang juga mengukur tahap dan throughput, lalu start di latar.
+    """
+    size_dir = os.path.join(work_dir, f"kb{size}")
+    os.makedirs(size_dir, exist_ok=True)
+    pdf_path = os.path.join(size_dir, "knowledge_base.pdf")
+    entries = synthetic_entries(size, args.seed)
+    write_synthetic_pdf(pdf_path, entries)
+
+    env = dict(
+        os.environ,
+        PDF_PATH=pdf_path,
+        FAISS_INDEX_PATH=os.path.join(size_dir, "faiss_index"),
+        KB_ARTIFACT_DIR=os.path.join(size_dir, "kb_artifact"),
+        EMBEDDING_MODEL=args.embedding_model,
+        GENERATION_MODEL=args.generation_model,
+        # Cache semantik dimatikan: setiap request benchmark harus melewati kaskade
+        SEMANTIC_CACHE_MAX_DISTANCE="-1",
+        INFERENCE_MAX_QUEUE=str(max(16, max(args.clients) * 2)),
+    )
+    command = [sys.executable, os.path.abspath(__file__), "--worker-size", str(size)] + sys.argv[1:]
+
+    def run(extra, **extra_env):
+        completed = subprocess.run(command + extra, env=dict(env, **extra_env),
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Worker ukuran {size} gagal:\n{completed.stderr[-4000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    cold = run(["--startup-only"], STARTUP_MODE="eager")
+    warm = run([], STARTUP_MODE="eager")
+    # Start di latar dengan artefak dan indeks yang sudah dibangun, dibandingkan dengan start hangat eager
+    background = run(["--background-startup"], STARTUP_MODE="background")
+    return dict(
+        num_entries=size,
+        num_pages=-(-size // ENTRIES_PER_PAGE),
+        pdf_bytes=os.path.getsize(pdf_path),
+        startup_seconds={"cold": cold["startup_seconds"], "warm": warm.pop("startup_seconds"), "background": background},
+        faiss_build_seconds=cold["faiss_build_seconds"],
+        **warm,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark end-to-end kaskade /ask pada PDF gejala:penyebab sintetis. "
+                    "Bawaannya memakai model BERT dan T5 kecil berbobot acak yang dibuat di direktori kerja "
+                    "(tanpa unduhan); berikan --embedding-model/--generation-model untuk mengukur model sebenarnya."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Jumlah entri knowledge base")
+    parser.add_argument("--embedding-model", default=None,
+                        help="Nama atau path SentenceTransformer (bawaan: BERT kecil berbobot acak)")
+    parser.add_argument("--generation-model", default=None,
+                        help="Nama atau path model T5 (bawaan: T5 kecil berbobot acak)")
+    parser.add_argument("--num-queries", type=int, default=50)
+    parser.add_argument("--generate-queries", type=int, default=10, help="Jumlah query untuk tahap generasi T5")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None, help="Direktori PDF dan artefak (bawaan: direktori sementara)")
+    parser.add_argument("--output", default=None, help="File JSON hasil (selain stdout)")
+    parser.add_argument("--worker-size", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--startup-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--background-startup", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_size is not None:
+        print(json.dumps(run_background_startup(args) if args.background_startup else run_worker(args)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        if args.embedding_model is None or args.generation_model is None:
+            embedding_dir, generation_dir = build_tiny_models(os.path.join(work_dir, "tiny"), args.seed)
+            args.embedding_model = args.embedding_model or embedding_dir
+            args.generation_model = args.generation_model or generation_dir
+        results = [run_size(args, size, work_dir) for size in args.sizes]
+
+    report = {
+        "config": vars(args),
+        "environment": {"python": sys.version.split()[0], "cpu_count": os.cpu_count()},
+        "created_at": time.time(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
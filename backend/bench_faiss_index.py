@@ -0,0 +1,96 @@
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+from faiss_index import SUPPORTED_INDEX_TYPES, create_faiss_index, make_search_params
+
+
+def make_synthetic_embeddings(num_vectors, num_queries, dim, num_clusters=64, seed=0):
+    """
+    Membuat embedding sintetis berkelompok (mirip embedding kalimat) beserta query-nya.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        labels = rng.integers(0, num_clusters, size=n)
+        vectors = centers[labels] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+    return sample(num_vectors), sample(num_queries)
+
+
+def recall_at_k(ground_truth, retrieved, k):
+    """
+    Menghitung recall@k terhadap hasil indeks flat (brute force) dengan metrik yang sama.
+    """
+    hits = sum(len(set(truth[:k]) & set(found[:k])) for truth, found in zip(ground_truth, retrieved))
+    return hits / float(len(ground_truth) * k)
+
+
+def benchmark_index(index_type, corpus, queries, top_k, nprobe, ef_search, ground_truth, **index_params):
+    """
+    Membangun satu jenis indeks lalu mengukur waktu build, latensi per query, recall@k dan ukuran memori.
+    """
+    start = time.perf_counter()
+    index = create_faiss_index(index_type, corpus.shape[1], num_vectors=len(corpus), **index_params)
+    if not index.is_trained:
+        index.train(corpus)
+    index.add(corpus)
+    build_seconds = time.perf_counter() - start
+
+    params = make_search_params(index, nprobe, ef_search)
+    latencies = []
+    retrieved = []
+    for query in queries:
+        start = time.perf_counter()
+        _, indices = index.search(query[np.newaxis, :], top_k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        retrieved.append(indices[0].tolist())
+
+    return {
+        "index_type": index_type,
+        "build_seconds": round(build_seconds, 3),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+        "latency_ms_p99": round(float(np.percentile(latencies, 99)), 4),
+        f"recall@{top_k}": round(recall_at_k(ground_truth, retrieved, top_k), 4),
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tipe indeks FAISS terhadap indeks flat.")
+    parser.add_argument("--num-vectors", type=int, default=50000)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--metric", choices=["ip", "l2"], default="ip")
+    parser.add_argument("--index-types", nargs="+", default=list(SUPPORTED_INDEX_TYPES))
+    args = parser.parse_args()
+
+    corpus, queries = make_synthetic_embeddings(args.num_vectors, args.num_queries, args.dim)
+
+    # Hasil indeks flat menjadi acuan recall
+    flat = create_faiss_index("flat", args.dim, metric=args.metric)
+    flat.add(corpus)
+    _, ground_truth = flat.search(queries, args.top_k)
+    ground_truth = ground_truth.tolist()
+
+    results = [
+        benchmark_index(
+            index_type, corpus, queries, args.top_k, args.nprobe, args.ef_search, ground_truth,
+            nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m, metric=args.metric
+        )
+        for index_type in args.index_types
+    ]
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from faiss_index import FAISSIndexManager
+from lexical_index import BM25Index, tokenize
+from model_registry import registry, EMBEDDING_MODEL_NAME
+
+
+def load_entries(knowledge_base_path):
+    """
+    Memuat entri gejala/penyebab dari file JSON knowledge base.
+    """
+    with open(knowledge_base_path, "r", encoding="utf-8") as file:
+        entries = json.load(file)
+    return [
+        {"gejala": entry["gejala"], "penyebab": entry["penyebab"]}
+        for entry in entries if entry.get("gejala") and entry.get("penyebab")
+    ]
+
+
+def make_queries(entries, keywords_per_query=2):
+    """
+    Membuat dua set query berlabel dari setiap entri:
+    - "gejala": pertanyaan alami dari teks gejala (dense biasanya unggul)
+    - "keyword": istilah paling khas (idf tertinggi) dari penyebab, mis. nama komponen (lexical unggul)
+
+    :return: Dict nama set -> list (query, gejala entri yang benar)
+    """
+    lexical = BM25Index(range(len(entries)), [entry["penyebab"] for entry in entries])
+    symptom_queries = []
+    keyword_queries = []
+    for entry in entries:
+        target = entry["gejala"]
+        symptom_queries.append((f"Apa penyebab {entry['gejala'].lower()}?", target))
+
+        terms = sorted(set(tokenize(entry["penyebab"])), key=lambda term: lexical.idf.get(term, 0.0), reverse=True)
+        if terms:
+            keyword_queries.append((f"masalah {' '.join(terms[:keywords_per_query])}", target))
+    return {"gejala": symptom_queries, "keyword": keyword_queries}
+
+
+def evaluate(manager, queries, top_k, mode, prefilter):
+    """
+    Mengukur recall@1, recall@k, MRR dan latensi search_index untuk satu mode retrieval.
+    """
+    manager.lexical_prefilter = prefilter
+    latencies = []
+    hits_at_1 = hits_at_k = reciprocal_ranks = 0.0
+    for query, target in queries:
+        start = time.perf_counter()
+        results, _ = manager.search_index(query, top_k=top_k, min_score=-1.0, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+        found = [result["gejala"] for result in results]
+        if target in found:
+            rank = found.index(target) + 1
+            hits_at_1 += rank == 1
+            hits_at_k += 1
+            reciprocal_ranks += 1.0 / rank
+
+    n = float(len(queries))
+    return {
+        "recall@1": round(hits_at_1 / n, 4),
+        f"recall@{top_k}": round(hits_at_k / n, 4),
+        "mrr": round(reciprocal_ranks / n, 4),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_ms_p99": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval dense vs hybrid (BM25 + FAISS, RRF).")
+    parser.add_argument("--knowledge-base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--lexical-candidates", type=int, default=64)
+    args = parser.parse_args()
+
+    entries = load_entries(args.knowledge_base)
+    query_sets = make_queries(entries)
+    embedding_dim = registry.get_sentence_transformer(args.model).get_sentence_embedding_dimension()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = FAISSIndexManager(
+            os.path.join(tmp_dir, "bench.index"), None, embedding_dim=embedding_dim, model_name=args.model,
+            index_type=args.index_type, lexical_candidates=args.lexical_candidates
+        )
+        manager.load_or_create_index()
+        manager.add_to_index(entries)
+
+        configs = [("dense", "dense", False), ("hybrid", "hybrid", False), ("hybrid+prefilter", "hybrid", True)]
+        results = {
+            name: {label: evaluate(manager, queries, args.top_k, mode, prefilter)
+                   for label, mode, prefilter in configs}
+            for name, queries in query_sets.items()
+        }
+        manager.query_batcher.close()
+
+    print(json.dumps({
+        "config": vars(args),
+        "num_entries": len(entries),
+        "num_queries": {name: len(queries) for name, queries in query_sets.items()},
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
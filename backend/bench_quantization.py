@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from model_registry import ModelRegistry, configure_torch_threads, get_rss_bytes, EMBEDDING_MODEL_NAME, GENERATION_MODEL_NAME
+from generation import AnswerGenerator
+
+
+def load_workload(knowledge_base_path, num_queries):
+    """
+    Menyusun pasangan pertanyaan/konteks dari knowledge base (gejala -> penyebab).
+    """
+    with open(knowledge_base_path, "r", encoding="utf-8") as file:
+        entries = json.load(file)
+    entries = [entry for entry in entries if entry.get("gejala") and entry.get("penyebab")]
+    entries = (entries * (num_queries // max(1, len(entries)) + 1))[:num_queries]
+    questions = [f"Apa penyebab {entry['gejala'].lower()}?" for entry in entries]
+    contexts = [entry["penyebab"] for entry in entries]
+    return questions, contexts
+
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000.0, 3)
+
+
+def run_worker(args):
+    """
+    Mengukur satu presisi di proses tersendiri agar RSS tidak tercampur dengan presisi lain.
+    """
+    threads = configure_torch_threads(args.num_threads, args.interop_threads)
+    questions, contexts = load_workload(args.knowledge_base, args.num_queries)
+    registry = ModelRegistry(precision=args.worker)
+
+    rss_before = get_rss_bytes()
+    start = time.perf_counter()
+    embedding_model = registry.get_sentence_transformer(args.embedding_model, "cpu")
+    generator = AnswerGenerator(
+        registry.get_tokenizer(args.generation_model), registry.get_seq2seq_model(args.generation_model, "cpu")
+    )
+    load_seconds = time.perf_counter() - start
+    rss_loaded = get_rss_bytes()
+
+    def encode(texts):
+        return embedding_model.encode(
+            texts, batch_size=args.batch_size, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32)
+
+    # Pemanasan agar alokasi pertama tidak ikut terukur
+    encode(questions[:1])
+    generator.generate_answers(questions[:1], contexts[:1], max_length=args.max_length, num_beams=args.num_beams)
+
+    embedding_latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        encode([question])
+        embedding_latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    embeddings = encode(questions)
+    embedding_batch_seconds = time.perf_counter() - start
+
+    generation_latencies = []
+    for question, context in zip(questions, contexts):
+        start = time.perf_counter()
+        generator.generate_answers([question], [context], max_length=args.max_length, num_beams=args.num_beams)
+        generation_latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    answers = generator.generate_answers(
+        questions, contexts, max_length=args.max_length, num_beams=args.num_beams, batch_size=args.batch_size
+    )
+    generation_batch_seconds = time.perf_counter() - start
+
+    return {
+        "precision": args.worker,
+        "torch_threads": threads,
+        "load_seconds": round(load_seconds, 3),
+        "model_rss_bytes": rss_loaded - rss_before if rss_before is not None and rss_loaded is not None else None,
+        "peak_rss_bytes": get_rss_bytes(),
+        "models": registry.report()["models"],
+        "embedding": {
+            "latency_ms_p50": percentile_ms(embedding_latencies, 50),
+            "latency_ms_p99": percentile_ms(embedding_latencies, 99),
+            "throughput_per_second": round(len(questions) / embedding_batch_seconds, 2),
+        },
+        "generation": {
+            "latency_ms_p50": percentile_ms(generation_latencies, 50),
+            "latency_ms_p99": percentile_ms(generation_latencies, 99),
+            "throughput_per_second": round(len(questions) / generation_batch_seconds, 2),
+        },
+        "embeddings": embeddings.tolist(),
+        "answers": answers,
+    }
+
+
+def agreement(reference, candidate):
+    """
+    Membandingkan keluaran satu presisi dengan acuan fp32: kemiripan cosine embedding,
+    kesamaan tetangga terdekat, dan persentase jawaban yang identik.
+    """
+    ref_embeddings = np.asarray(reference["embeddings"], dtype=np.float32)
+    cand_embeddings = np.asarray(candidate["embeddings"], dtype=np.float32)
+    cosine = np.sum(ref_embeddings * cand_embeddings, axis=1)
+
+    # Tetangga terdekat setiap query (selain dirinya) harus tetap sama setelah kuantisasi
+    ref_scores = ref_embeddings @ ref_embeddings.T
+    cand_scores = cand_embeddings @ cand_embeddings.T
+    np.fill_diagonal(ref_scores, -np.inf)
+    np.fill_diagonal(cand_scores, -np.inf)
+    neighbour_match = np.mean(np.argmax(ref_scores, axis=1) == np.argmax(cand_scores, axis=1))
+
+    exact = np.mean([a.strip() == b.strip() for a, b in zip(reference["answers"], candidate["answers"])])
+    return {
+        "embedding_cosine_mean": round(float(cosine.mean()), 5),
+        "embedding_cosine_min": round(float(cosine.min()), 5),
+        "nearest_neighbour_agreement": round(float(neighbour_match), 4),
+        "answer_exact_match": round(float(exact), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model fp32 vs kuantisasi int8 dinamis di CPU.")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8"])
+    parser.add_argument("--generation-model", default=GENERATION_MODEL_NAME)
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--knowledge-base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+    parser.add_argument("--num-queries", type=int, default=26)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--num-beams", type=int, default=2)
+    parser.add_argument("--num-threads", type=int, default=None)
+    parser.add_argument("--interop-threads", type=int, default=None)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    results = []
+    for precision in args.precisions:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", precision] + sys.argv[1:]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    reference = results[0]
+    for result in results:
+        result["agreement_vs_" + reference["precision"]] = agreement(reference, result)
+    for result in results:
+        del result["embeddings"]
+        result["sample_answers"] = result.pop("answers")[:3]
+
+    print(json.dumps({"config": vars(args), "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from bench_hybrid_retrieval import load_entries, make_queries
+from faiss_index import FAISSIndexManager
+from model_registry import registry, EMBEDDING_MODEL_NAME, RERANKER_MODEL_NAME
+from reranker import Reranker
+
+
+def rank_of(target, candidates, ids_by_gejala):
+    """
+    Peringkat (mulai 1) entri yang benar di antara kandidat, atau None.
+    """
+    found = [ids_by_gejala[candidate["gejala"]] for candidate in candidates]
+    return found.index(target) + 1 if target in found else None
+
+
+def summarize(ranks):
+    n = float(len(ranks))
+    return {
+        "top1_accuracy": round(sum(rank == 1 for rank in ranks) / n, 4),
+        "mrr": round(sum(1.0 / rank for rank in ranks if rank) / n, 4),
+    }
+
+
+def evaluate(manager, reranker, queries, top_n, mode):
+    """
+    Membandingkan kualitas dan latensi retrieval dengan dan tanpa reranking pada satu set query.
+    """
+    ids_by_gejala = {gejala: i for i, gejala in zip(manager._metadata_ids, manager._metadata_gejala)}
+    before, after = [], []
+    retrieval_ms, rerank_ms = [], []
+    reasons = {}
+    for query, target in queries:
+        start = time.perf_counter()
+        candidates, scores = manager.search_index(query, top_k=top_n, min_score=-1.0, mode=mode)
+        retrieval_ms.append((time.perf_counter() - start) * 1000.0)
+        before.append(rank_of(target, candidates, ids_by_gejala))
+
+        reranked, _, info = reranker.rerank(query, candidates, scores)
+        rerank_ms.append(info["ms"])
+        reasons[info["reason"]] = reasons.get(info["reason"], 0) + 1
+        after.append(rank_of(target, reranked, ids_by_gejala))
+
+    return {
+        "without_rerank": summarize(before),
+        "with_rerank": summarize(after),
+        "retrieval_ms_p50": round(float(np.percentile(retrieval_ms, 50)), 3),
+        "added_ms_p50": round(float(np.percentile(rerank_ms, 50)), 3),
+        "added_ms_p99": round(float(np.percentile(rerank_ms, 99)), 3),
+        "decisions": reasons,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tahap reranking cross-encoder pada knowledge_base.json.")
+    parser.add_argument("--knowledge-base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--reranker-model", default=RERANKER_MODEL_NAME)
+    parser.add_argument("--mode", choices=["dense", "hybrid"], default="hybrid")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--latency-budget-ms", type=float, default=150.0)
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.25, float("inf")],
+                        help="Margin lewatan yang dibandingkan; inf berarti selalu rerank")
+    args = parser.parse_args()
+
+    entries = load_entries(args.knowledge_base)
+    query_sets = make_queries(entries)
+    embedding_dim = registry.get_sentence_transformer(args.embedding_model).get_sentence_embedding_dimension()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = FAISSIndexManager(
+            os.path.join(tmp_dir, "bench.index"), None, embedding_dim=embedding_dim, model_name=args.embedding_model
+        )
+        manager.load_or_create_index()
+        manager.add_to_index(entries)
+
+        for margin in args.margins:
+            reranker = Reranker(
+                args.reranker_model, top_n=args.top_n, latency_budget_ms=args.latency_budget_ms, margin=margin
+            )
+            # Pemanasan: panggilan pertama juga mengisi perkiraan biaya per pasangan
+            reranker.model.predict([("pemanasan", "pemanasan")], show_progress_bar=False)
+            results[f"margin={margin:g}"] = {
+                name: evaluate(manager, reranker, queries, args.top_n, args.mode)
+                for name, queries in query_sets.items()
+            }
+        manager.query_batcher.close()
+
+    print(json.dumps({
+        "config": vars(args),
+        "num_queries": {name: len(queries) for name, queries in query_sets.items()},
+        "results": results,
+    }, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from inference_pool import current_deadline
+from metrics import metrics
+
+# Faktor peluruhan perkiraan biaya setiap kali tahap dilewati karena anggaran, agar satu sampel
+# lambat (mis. generate pertama yang masih dingin) tidak mematikan tahap itu selamanya
+SKIP_DECAY = 0.5
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class CascadeStage:
+    def __init__(self, name, run, exit_confidence=None, ready=None):
+        """
+        Satu tahap kaskade.
+
+        :param run: Fungsi (query, query_embedding) -> tuple (respons, confidence), atau None jika
+                    tahap ini tidak menemukan apa pun yang relevan
+        :param exit_confidence: Confidence minimum agar kaskade berhenti di tahap ini; None berarti
+                                hasil apa pun dari tahap ini diterima
+        :param ready: Fungsi tanpa argumen yang mengembalikan False selama komponen tahap ini masih
+                      dimuat (start di latar); None berarti tahap selalu siap
+        """
+        self.name = name
+        self.run = run
+        self.exit_confidence = exit_confidence
+        self.ready = ready
+        # Perkiraan biaya tahap (ms), diperbarui dengan rata-rata bergerak eksponensial
+        self.estimated_ms = None
+        self.errors = 0
+
+    def record(self, elapsed_ms):
+        self.estimated_ms = elapsed_ms if self.estimated_ms is None else 0.8 * self.estimated_ms + 0.2 * elapsed_ms
+
+    def decay(self):
+        """
+        Menurunkan perkiraan biaya tahap yang dilewati karena anggaran; perkiraan hanya diperbarui saat
+        tahap berjalan, jadi tanpa peluruhan tahap itu tidak akan pernah dicoba lagi.
+        """
+        self.estimated_ms *= SKIP_DECAY
+
+
+class CascadeResult:
+    def __init__(self, response, stage, confident, decisions, elapsed_ms):
+        """
+        Hasil kaskade: respons tahap yang menjawab beserta keputusan setiap tahap.
+
+        :param stage: Nama tahap yang menjawab, atau None jika tidak ada
+        :param confident: True jika tahap itu melewati exit_confidence-nya (bukan jawaban cadangan)
+        :param decisions: List dict {'stage', 'decision', 'confidence', 'ms'} sesuai urutan tahap
+        """
+        self.response = response
+        self.stage = stage
+        self.confident = confident
+        self.decisions = decisions
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def failed(self):
+        """
+        True jika ada tahap yang error: jawabannya (cadangan atau "tidak ada informasi") tidak boleh di-cache.
+        """
+        return any(decision["decision"] == "error" for decision in self.decisions)
+
+
+class CascadePlanner:
+    def __init__(self, stages, latency_budget_ms=5000.0):
+        """
+        Menjalankan tahap-tahap jawaban dari yang termurah dan berhenti di tahap pertama
+        yang cukup yakin, sehingga tahap mahal hanya dijalankan bila diperlukan.
+
+        Semua tahap menerima embedding query yang sama (dihitung sekali oleh pemanggil).
+        Tahap yang komponennya belum siap, atau yang perkiraan biayanya melebihi sisa anggaran waktu
+        request (``latency_budget_ms`` atau deadline pool inferensi, mana yang lebih dulu), dilewati. Jika tidak ada tahap yang
+        cukup yakin, hasil tahap pertama yang relevan dipakai sebagai jawaban cadangan.
+
+        :param stages: List CascadeStage, terurut dari yang termurah
+        """
+        self.stages = list(stages)
+        self.latency_budget_ms = latency_budget_ms
+        self._lock = threading.Lock()
+
+    def _remaining_ms(self, start):
+        remaining = self.latency_budget_ms - (time.perf_counter() - start) * 1000.0
+        deadline = current_deadline()
+        if deadline is not None:
+            remaining = min(remaining, (deadline - time.monotonic()) * 1000.0)
+        return remaining
+
+    def run(self, query, query_embedding=None, skip=()):
+        """
+        Menjalankan kaskade untuk satu query.
+
+        :param skip: Nama tahap yang tidak dijalankan (mis. tahap yang dijalankan pemanggil secara streaming)
+        :return: CascadeResult
+        """
+        start = time.perf_counter()
+        decisions = []
+        fallback = None  # (respons, nama tahap) dari tahap relevan pertama yang kurang yakin
+
+        for stage in self.stages:
+            if stage.name in skip:
+                continue
+            if stage.ready is not None and not stage.ready():
+                decisions.append({"stage": stage.name, "decision": "not_ready", "confidence": None, "ms": 0.0})
+                metrics.inc("cascade_stage_decisions_total", stage=stage.name, decision="not_ready")
+                continue
+            if stage.estimated_ms is not None and stage.estimated_ms > self._remaining_ms(start):
+                with self._lock:
+                    stage.decay()
+                decisions.append({"stage": stage.name, "decision": "skipped_budget", "confidence": None, "ms": 0.0})
+                metrics.inc("cascade_stage_decisions_total", stage=stage.name, decision="skipped_budget")
+                continue
+
+            stage_start = time.perf_counter()
+            try:
+                result = stage.run(query, query_embedding)
+                decision = None
+            except Exception as e:
+                logger.error(f"Error pada tahap kaskade {stage.name}: {e}")
+                result, decision = None, "error"
+            elapsed_ms = (time.perf_counter() - stage_start) * 1000.0
+            with self._lock:
+                stage.record(elapsed_ms)
+                if decision == "error":
+                    stage.errors += 1
+
+            confidence = None
+            if result is None:
+                decision = decision or "no_result"
+            else:
+                response, confidence = result
+                if stage.exit_confidence is None or confidence >= stage.exit_confidence:
+                    decision = "answered"
+                else:
+                    decision = "low_confidence"
+                    if fallback is None:
+                        fallback = (response, stage.name)
+
+            decisions.append({
+                "stage": stage.name,
+                "decision": decision,
+                "confidence": round(float(confidence), 4) if confidence is not None else None,
+                "ms": round(elapsed_ms, 3),
+            })
+            metrics.inc("cascade_stage_decisions_total", stage=stage.name, decision=decision)
+            if decision == "answered":
+                return self._finish(response, stage.name, True, decisions, start)
+
+        if fallback is not None:
+            return self._finish(fallback[0], fallback[1], False, decisions, start)
+        return self._finish(None, None, False, decisions, start)
+
+    @staticmethod
+    def _finish(response, stage, confident, decisions, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        logger.info(f"Kaskade dijawab oleh {stage or '-'} (yakin={confident}) dalam {elapsed_ms:.1f} ms: "
+                    + ", ".join(f"{d['stage']}={d['decision']}" for d in decisions))
+        return CascadeResult(response, stage, confident, decisions, round(elapsed_ms, 3))
+
+    def stats(self):
+        """
+        Melaporkan konfigurasi tahap dan perkiraan biayanya.
+        """
+        with self._lock:
+            return {
+                "latency_budget_ms": self.latency_budget_ms,
+                "stages": [
+                    {
+                        "name": stage.name,
+                        "exit_confidence": stage.exit_confidence,
+                        "estimated_ms": round(stage.estimated_ms, 3) if stage.estimated_ms is not None else None,
+                        "errors": stage.errors,
+                    }
+                    for stage in self.stages
+                ],
+            }
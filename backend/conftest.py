@@ -0,0 +1,28 @@
+import string
+import pytest
+import torch
+from transformers import AutoModelForSeq2SeqLM, BertTokenizerFast, T5Config
+
+
+@pytest.fixture(scope="session")
+def tiny_t5(tmp_path_factory):
+    """
+    Model T5 kecil berbobot acak dengan tokenizer WordPiece karakter, agar test generasi berjalan tanpa unduhan.
+
+    :return: Tuple (tokenizer, model)
+    """
+    characters = string.ascii_lowercase + string.digits
+    vocab = (["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list(characters) + list(string.punctuation)
+             + [f"##{character}" for character in characters] + ["question", "context"])
+    vocab_path = tmp_path_factory.mktemp("tiny_t5") / "vocab.txt"
+    vocab_path.write_text("\n".join(vocab), encoding="utf-8")
+    # T5 tidak menerima token_type_ids dari tokenizer BERT
+    tokenizer = BertTokenizerFast(str(vocab_path), model_input_names=["input_ids", "attention_mask"])
+
+    torch.manual_seed(0)
+    model = AutoModelForSeq2SeqLM.from_config(T5Config(
+        vocab_size=len(vocab), d_model=32, d_kv=8, d_ff=64, num_layers=2, num_heads=2,
+        pad_token_id=tokenizer.pad_token_id, eos_token_id=tokenizer.sep_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+    )).eval()
+    return tokenizer, model
@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+import time
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+from inference_pool import current_deadline
+from metrics import metrics
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Mode kebijakan decoding yang didukung
+DECODING_MODES = ("adaptive", "greedy", "beam")
+
+# Batas bucket confidence jawaban (rata-rata geometris probabilitas token)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+
+def select_rows(inputs, rows):
+    """
+    Mengambil sebagian baris dari masukan model.generate (tensor atau hidden state encoder).
+    """
+    selected = {}
+    for key, value in inputs.items():
+        if isinstance(value, BaseModelOutput):
+            selected[key] = BaseModelOutput(last_hidden_state=value.last_hidden_state[rows])
+        elif torch.is_tensor(value):
+            selected[key] = value[rows]
+        else:
+            selected[key] = value
+    return selected
+
+
+class DecodingPolicy:
+    def __init__(self, mode="adaptive", min_new_tokens=16, max_new_tokens=150, context_ratio=0.75,
+                 escalate_confidence=0.5, escalate_beams=2, assistant_model=None):
+        """
+        Kebijakan decoding untuk AnswerGenerator.
+
+        Mode ``adaptive`` men-decode greedy dengan batas token baru yang ketat (sebanding panjang
+        masukan), lalu hanya menjalankan ulang beam search untuk jawaban yang confidence-nya rendah
+        atau terpotong batas token. Mode ``greedy`` tidak pernah eskalasi, mode ``beam`` selalu
+        beam search seperti perilaku lama.
+
+        :param context_ratio: Batas token baru = ``context_ratio`` x jumlah token masukan,
+                              dibatasi ``min_new_tokens`` dan ``max_new_tokens``
+        :param escalate_confidence: Confidence (rata-rata geometris probabilitas token) di bawah nilai
+                                    ini memicu beam search
+        :param assistant_model: Model seq2seq kecil opsional (tokenizer sama) sebagai draft untuk
+                                assisted decoding pada langkah greedy
+        """
+        if mode not in DECODING_MODES:
+            raise ValueError(f"Mode decoding tidak dikenal: {mode} (pilihan: {', '.join(DECODING_MODES)})")
+        self.mode = mode
+        self.min_new_tokens = min_new_tokens
+        self.max_new_tokens = max_new_tokens
+        self.context_ratio = context_ratio
+        self.escalate_confidence = escalate_confidence
+        self.escalate_beams = escalate_beams
+        self.assistant_model = assistant_model
+
+        self._lock = threading.Lock()
+        self._stats = {}  # nama kebijakan -> [jumlah jawaban, total detik, total confidence]
+        self._escalations = {}  # alasan -> jumlah
+
+    def new_token_budget(self, attention_mask):
+        """
+        Batas token baru untuk satu batch, dari masukan terpanjang di batch tersebut.
+        """
+        input_length = int(attention_mask.sum(dim=1).max())
+        return max(self.min_new_tokens, min(self.max_new_tokens, math.ceil(input_length * self.context_ratio)))
+
+    def assistant_for(self, model, inputs):
+        """
+        Model draft untuk assisted decoding, atau None jika tidak bisa dipakai untuk masukan ini
+        (assisted decoding hanya untuk batch satu prompt ber-token, bukan hidden state dari cache encoder).
+        """
+        if self.assistant_model is None or "input_ids" not in inputs or len(inputs["input_ids"]) != 1:
+            return None
+        if self.assistant_model.device != model.device:
+            return None
+        return self.assistant_model
+
+    def _record(self, policy, count, seconds, confidences):
+        metrics.observe("decoding_latency_seconds", seconds, policy=policy)
+        for confidence in confidences:
+            metrics.observe("decoding_confidence", confidence, buckets=CONFIDENCE_BUCKETS, policy=policy)
+        with self._lock:
+            stats = self._stats.setdefault(policy, [0, 0.0, 0.0])
+            stats[0] += count
+            stats[1] += seconds
+            stats[2] += sum(confidences)
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        logger.info(f"Decoding {policy}: {count} jawaban dalam {seconds * 1000.0:.1f} ms, "
+                    f"confidence rata-rata {mean_confidence:.3f}")
+
+    def _escalate(self, reason, count):
+        metrics.inc("decoding_escalations_total", count, reason=reason)
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + count
+
+    @staticmethod
+    def _greedy_confidences(model, outputs):
+        """
+        Confidence dan status terpotong setiap jawaban greedy: rata-rata log-probabilitas token
+        sampai token EOS pertama, dikembalikan sebagai probabilitas rata-rata geometris.
+        """
+        scores = model.compute_transition_scores(outputs.sequences, outputs.scores, normalize_logits=True)
+        generated = outputs.sequences[:, -scores.shape[1]:]
+        eos_token_id = model.generation_config.eos_token_id
+        eos_token_ids = eos_token_id if isinstance(eos_token_id, (list, tuple)) else [eos_token_id]
+        is_eos = torch.isin(generated, torch.tensor(eos_token_ids, device=generated.device))
+        # Posisi sesudah EOS pertama hanya padding untuk jawaban yang sudah selesai
+        valid = (is_eos.cumsum(dim=1) - is_eos.long()) == 0
+        mean_log_prob = (scores * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)
+        return torch.exp(mean_log_prob).tolist(), (~is_eos.any(dim=1)).tolist()
+
+    def _beam(self, model, inputs, stopping_criteria):
+        start = time.perf_counter()
+        outputs = model.generate(
+            **inputs, max_new_tokens=self.max_new_tokens, num_beams=self.escalate_beams, early_stopping=True,
+            output_scores=True, return_dict_in_generate=True, stopping_criteria=stopping_criteria
+        )
+        confidences = torch.exp(outputs.sequences_scores).tolist()
+        self._record("beam", len(confidences), time.perf_counter() - start, confidences)
+        return list(outputs.sequences)
+
+    def generate(self, model, inputs, stopping_criteria=None):
+        """
+        Men-decode satu batch sesuai kebijakan.
+
+        :param inputs: Masukan model.generate (prompt ter-tokenize atau hidden state encoder + attention_mask)
+        :return: List tensor token jawaban, satu per baris masukan
+        """
+        if self.mode == "beam":
+            return self._beam(model, inputs, stopping_criteria)
+
+        assistant_model = self.assistant_for(model, inputs)
+        policy = "assisted" if assistant_model is not None else "greedy"
+        start = time.perf_counter()
+        outputs = model.generate(
+            **inputs, max_new_tokens=self.new_token_budget(inputs["attention_mask"]), num_beams=1,
+            do_sample=False, assistant_model=assistant_model, output_scores=True, return_dict_in_generate=True,
+            stopping_criteria=stopping_criteria
+        )
+        confidences, truncated = self._greedy_confidences(model, outputs)
+        self._record(policy, len(confidences), time.perf_counter() - start, confidences)
+        sequences = list(outputs.sequences)
+        if self.mode == "greedy":
+            return sequences
+
+        rows = [i for i, (confidence, cut) in enumerate(zip(confidences, truncated))
+                if cut or confidence < self.escalate_confidence]
+        if not rows:
+            return sequences
+        deadline = current_deadline()
+        if deadline is not None and time.monotonic() >= deadline:
+            # Beam search juga akan langsung berhenti oleh deadline, jadi jawaban greedy dipakai
+            self._escalate("skipped_deadline", len(rows))
+            return sequences
+
+        low_confidence = sum(1 for i in rows if not truncated[i])
+        if low_confidence:
+            self._escalate("low_confidence", low_confidence)
+        if len(rows) > low_confidence:
+            self._escalate("truncated", len(rows) - low_confidence)
+        for i, sequence in zip(rows, self._beam(model, select_rows(inputs, rows), stopping_criteria)):
+            sequences[i] = sequence
+        return sequences
+
+    def stream_kwargs(self, model, inputs):
+        """
+        Argumen generate untuk streaming: greedy (beam search baru tahu hasil akhirnya setelah selesai)
+        dengan batas token baru yang sama, memakai model draft bila tersedia.
+        """
+        max_new_tokens = self.max_new_tokens if self.mode == "beam" else self.new_token_budget(inputs["attention_mask"])
+        return {"max_new_tokens": max_new_tokens, "num_beams": 1, "assistant_model": self.assistant_for(model, inputs)}
+
+    def stats(self):
+        """
+        Melaporkan konfigurasi kebijakan serta latensi dan confidence rata-rata per kebijakan.
+        """
+        with self._lock:
+            policies = {
+                policy: {
+                    "answers": count,
+                    "mean_ms": round(seconds * 1000.0 / count, 3) if count else 0.0,
+                    "mean_confidence": round(total_confidence / count, 4) if count else 0.0,
+                }
+                for policy, (count, seconds, total_confidence) in self._stats.items()
+            }
+            escalations = dict(self._escalations)
+        return {
+            "mode": self.mode,
+            "min_new_tokens": self.min_new_tokens,
+            "max_new_tokens": self.max_new_tokens,
+            "context_ratio": self.context_ratio,
+            "escalate_confidence": self.escalate_confidence,
+            "escalate_beams": self.escalate_beams,
+            "assistant_model": getattr(getattr(self.assistant_model, "config", None), "name_or_path", None),
+            "policies": policies,
+            "escalations": escalations,
+        }
@@ -0,0 +1,185 @@
+from concurrent.futures import Future
+import bisect
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        """
+        Histogram sederhana dengan batas bucket kumulatif (gaya Prometheus).
+
+        :param buckets: Batas atas bucket, terurut naik
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Mencatat satu observasi.
+        """
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        """
+        Mengembalikan isi histogram sebagai dict yang bisa di-serialisasi ke JSON.
+        """
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in self.buckets] + ["le_inf"]
+            cumulative = list(itertools.accumulate(self.counts))
+            return {
+                "buckets": dict(zip(labels, cumulative)),
+                "count": self.count,
+                "sum": self.total,
+                "mean": self.total / self.count if self.count else 0.0,
+            }
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode_fn, max_batch_size=32, max_wait_ms=5.0, name="embedding"):
+        """
+        Antrian micro-batching di latar belakang untuk encoding query.
+
+        Query dari banyak request dikumpulkan selama paling lama ``max_wait_ms`` atau sampai
+        ``max_batch_size`` item, lalu di-encode dalam satu forward pass ber-padding. Hasil setiap
+        baris dikembalikan ke request yang menunggunya.
+
+        :param encode_fn: Fungsi yang menerima list teks dan mengembalikan array (n x dim)
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self.batch_size_histogram = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_wait_ms_histogram = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250])
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        """
+        Menjalankan thread worker secara lazy. Setelah fork (mis. worker gunicorn dengan
+        preload_app) thread tidak ikut tersalin, sehingga worker dan antriannya dibuat ulang.
+        """
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._worker.start()
+                self._worker_pid = os.getpid()
+
+    def submit(self, text):
+        """
+        Memasukkan satu teks ke antrian dan mengembalikan Future berisi vektor embedding-nya.
+        """
+        if self._closed:
+            raise RuntimeError(f"Batcher {self.name} sudah ditutup.")
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def encode(self, text, timeout=None):
+        """
+        Meng-encode satu teks melalui antrian batch (memblokir sampai hasil tersedia).
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def encode_many(self, texts, timeout=None):
+        """
+        Meng-encode beberapa teks melalui antrian batch dan mengembalikan matriks (n x dim).
+        """
+        futures = [self.submit(text) for text in texts]
+        return np.stack([future.result(timeout=timeout) for future in futures])
+
+    def _collect_batch(self):
+        """
+        Mengambil satu batch dari antrian: menunggu item pertama, lalu mengumpulkan item
+        tambahan sampai batas ukuran atau batas waktu tunggu item pertama tercapai.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """
+        Loop worker: menjalankan satu forward pass per batch dan membagikan hasilnya.
+        """
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            for _, _, enqueued in batch:
+                self.queue_wait_ms_histogram.observe((started - enqueued) * 1000.0)
+            self.batch_size_histogram.observe(len(batch))
+
+            try:
+                embeddings = self.encode_fn([text for text, _, _ in batch])
+                for (_, future, _), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                logger.error(f"Error saat encoding batch {self.name}: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        """
+        Melaporkan konfigurasi serta histogram ukuran batch dan waktu tunggu antrian.
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms_histogram.snapshot(),
+        }
+
+    def close(self):
+        """
+        Menghentikan worker setelah antrian yang tersisa diproses.
+        """
+        if not self._closed:
+            self._closed = True
+            if self._worker_pid == os.getpid():
+                self._queue.put(None)
+                self._worker.join()
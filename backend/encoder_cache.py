@@ -0,0 +1,86 @@
+from collections import OrderedDict
+import threading
+
+
+class EncoderCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=4096):
+        """
+        Cache keluaran encoder T5 per konteks, dengan eviksi LRU dan batas memori.
+
+        Konteks yang sering terambil (penyebab atau halaman PDF yang populer) cukup di-encode sekali;
+        pertanyaan berikutnya dengan konteks yang sama memakai ulang hidden state-nya.
+
+        :param max_bytes: Batas total ukuran tensor hidden state yang disimpan
+        :param max_entries: Batas jumlah konteks yang disimpan
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()  # kunci -> (hidden state panjang x d_model, ukuran_byte)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _estimate_size(states):
+        return states.numel() * states.element_size()
+
+    def get(self, key):
+        """
+        Mengambil hidden state konteks, atau None jika belum ada di cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, states):
+        """
+        Menyimpan hidden state konteks lalu mengeviksi entri LRU sampai batas jumlah dan memori terpenuhi.
+        """
+        size = self._estimate_size(states)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (states, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Mengosongkan seluruh cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Melaporkan jumlah hit, miss, eviksi dan penggunaan memori cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
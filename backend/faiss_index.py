@@ -1,45 +1,202 @@
 import faiss
 import numpy as np
+import hashlib
 import json
 import os
 import logging
-from transformers import AutoTokenizer, AutoModel
+import threading
+import time
 import torch
-from PyPDF2 import PdfReader
+from model_registry import registry, EMBEDDING_MODEL_NAME
+from embedding_batcher import EmbeddingBatcher
+from pdf_extraction import iter_batches, iter_knowledge_base, parse_page_entries
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from metrics import metrics
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SUPPORTED_INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+SUPPORTED_METRICS = {"ip": faiss.METRIC_INNER_PRODUCT, "l2": faiss.METRIC_L2}
+SUPPORTED_RETRIEVAL_MODES = ("dense", "hybrid")
+
+
+def create_faiss_index(index_type, embedding_dim, num_vectors=None, nlist=100, pq_m=8, pq_nbits=8, hnsw_m=32,
+                       metric="ip"):
+    """
+    Build an empty FAISS index of the requested type.
+
+    With ``metric="ip"`` and L2-normalized vectors the returned scores are cosine similarities
+    (higher is better); with ``metric="l2"`` they are squared L2 distances (lower is better).
+
+    IVF sizes are clamped to the amount of training data when ``num_vectors`` is known:
+    at most one list per 39 vectors (FAISS' minimum for k-means) and at most
+    ``log2(num_vectors)`` bits per PQ code.
+
+    :param index_type: One of SUPPORTED_INDEX_TYPES
+    :param num_vectors: Number of training vectors, if known
+    :param metric: "ip" (inner product) or "l2"
+    :return: faiss.Index (IVF indexes still need ``train``)
+    """
+    if metric not in SUPPORTED_METRICS:
+        raise ValueError(f"Unsupported metric {metric!r}, expected one of {tuple(SUPPORTED_METRICS)}")
+    metric_type = SUPPORTED_METRICS[metric]
+
+    if index_type == "flat":
+        return faiss.IndexFlatIP(embedding_dim) if metric == "ip" else faiss.IndexFlatL2(embedding_dim)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(embedding_dim, hnsw_m, metric_type)
+
+    if num_vectors:
+        nlist = max(1, min(nlist, num_vectors // 39))
+    if index_type == "ivf_flat":
+        return faiss.index_factory(embedding_dim, f"IVF{nlist},Flat", metric_type)
+    if index_type == "ivf_pq":
+        if embedding_dim % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide embedding_dim={embedding_dim}")
+        if num_vectors:
+            pq_nbits = max(1, min(pq_nbits, int(np.log2(num_vectors))))
+        return faiss.index_factory(embedding_dim, f"IVF{nlist},PQ{pq_m}x{pq_nbits}", metric_type)
+    raise ValueError(f"Unsupported index_type {index_type!r}, expected one of {SUPPORTED_INDEX_TYPES}")
+
+
+ENTRY_FIELDS = ("gejala", "penyebab", "solusi")
+
+
+def entry_id(entry, occurrence=0):
+    """
+    Stable 63-bit FAISS id for an entry, derived from its normalized content (gejala, penyebab and solusi).
+
+    :param occurrence: Number of identical entries before this one, so every copy keeps its own row
+    """
+    content = "\x1f".join(" ".join(str(entry.get(field) or "").lower().split()) for field in ENTRY_FIELDS)
+    digest = hashlib.sha1(f"{content}\x1f{occurrence}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def entry_ids(entries):
+    """
+    FAISS ids for entries in order. Entries sharing a gejala but not their penyebab or solusi get
+    different ids, and exact duplicates are numbered, so the index keeps the same rows as the KB artifact.
+    """
+    occurrences = {}
+    ids = []
+    for entry in entries:
+        key = entry_id(entry)
+        ids.append(entry_id(entry, occurrences.get(key, 0)))
+        occurrences[key] = occurrences.get(key, 0) + 1
+    return ids
+
+
+def entry_hash(entry):
+    """
+    Content hash of a ``gejala:penyebab`` entry, used to detect changed entries on re-ingest.
+    """
+    return hashlib.sha1(f"{entry['gejala']}\x1f{entry['penyebab']}".encode("utf-8")).hexdigest()[:16]
+
+
+def make_search_params(index, nprobe=None, ef_search=None, ids=None):
+    """
+    Build per-call search parameters (nprobe for IVF, efSearch for HNSW), or None for flat indexes.
+
+    :param ids: Optional entry ids to restrict the search to (an IDSelectorBatch prefilter)
+    """
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = index.index
+    index = faiss.downcast_index(index)
+    kwargs = {}
+    if ids is not None:
+        kwargs["sel"] = faiss.IDSelectorBatch(np.asarray(ids, dtype=np.int64))
+    if isinstance(index, faiss.IndexIVF) and (nprobe or kwargs):
+        return faiss.SearchParametersIVF(nprobe=min(nprobe or index.nprobe, index.nlist), **kwargs)
+    if isinstance(index, faiss.IndexHNSW) and (ef_search or kwargs):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch, **kwargs)
+    if kwargs:
+        return faiss.SearchParameters(**kwargs)
+    return None
+
+
 class FAISSIndexManager:
-    def __init__(self, index_path, knowledge_base_path, embedding_dim=384, model_name="sentence-transformers/all-MiniLM-L6-v2", device=None):
+    def __init__(self, index_path, knowledge_base_path, embedding_dim=384, model_name=EMBEDDING_MODEL_NAME, device=None,
+                 query_batch_max_size=32, query_batch_max_wait_ms=5.0,
+                 index_type="flat", nlist=100, pq_m=8, pq_nbits=8, hnsw_m=32, nprobe=8, ef_search=64,
+                 metric="ip", similarity_threshold=None, embedding_batch_size=64,
+                 retrieval_mode="hybrid", lexical_candidates=64, lexical_prefilter=True, lexical_min_coverage=0.6,
+                 rrf_k=60):
+        if index_type not in SUPPORTED_INDEX_TYPES:
+            raise ValueError(f"Unsupported index_type {index_type!r}, expected one of {SUPPORTED_INDEX_TYPES}")
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported metric {metric!r}, expected one of {tuple(SUPPORTED_METRICS)}")
+        if retrieval_mode not in SUPPORTED_RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval_mode {retrieval_mode!r}, expected one of {SUPPORTED_RETRIEVAL_MODES}")
+
         self.index_path = index_path
         self.knowledge_base_path = knowledge_base_path
         self.embedding_dim = embedding_dim
         self.index = None
+        self._index_mtime = None  # mtime of the index file this process last read or wrote
+        # Set when the loaded index cannot be synced incrementally (legacy ids or another metric)
+        self._rebuild_required = False
+
+        # Index type is chosen at build time; nprobe/efSearch are search-time defaults
+        self.index_type = index_type
+        self.index_params = {"nlist": nlist, "pq_m": pq_m, "pq_nbits": pq_nbits, "hnsw_m": hnsw_m, "metric": metric}
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+
+        # "ip" uses mask-aware mean pooling + L2 normalization so scores are cosine similarities;
+        # "l2" keeps the legacy unnormalized embeddings for indexes built before cosine mode.
+        self.metric = metric
+        self.normalize_embeddings = metric == "ip"
+        self.similarity_threshold = similarity_threshold
         self.device = device if device else "cuda" if torch.cuda.is_available() else "cpu"
+        self.embedding_batch_size = embedding_batch_size
+
+        # "hybrid" fuses BM25 over gejala+penyebab with the dense results (reciprocal-rank fusion);
+        # with lexical_prefilter the dense search only scores the lexical candidates when there are enough.
+        self.retrieval_mode = retrieval_mode
+        self.lexical_candidates = lexical_candidates
+        self.lexical_prefilter = lexical_prefilter
+        self.lexical_min_coverage = lexical_min_coverage
+        self.rrf_k = rrf_k
+
+        # Metadata cache in memory (columnar, keyed by content-hash id), reloaded only when the file changes
+        self.metadata_path = os.path.splitext(index_path)[0] + '_metadata.json'
+        self.changelog_path = os.path.splitext(index_path)[0] + '_changelog.jsonl'
+        self.metadata_version = 0
+        self._metadata_ids = []
+        self._metadata_gejala = []
+        self._metadata_penyebab = []
+        self._metadata_hashes = []
+        self._metadata_rows = {}
+        self.lexical_index = BM25Index([], [])
+        self._metadata_mtime = None
+        self._metadata_lock = threading.Lock()
+
+        # Shared tokenizer and encoder weights from the process-wide model registry
+        self.tokenizer, self.model = registry.get_encoder(model_name, self.device)
 
-        # Load model and tokenizer for embedding generation
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name).to(self.device)
+        # Concurrent search queries are coalesced into one padded forward pass
+        self.query_batcher = EmbeddingBatcher(
+            self.generate_embeddings, max_batch_size=query_batch_max_size,
+            max_wait_ms=query_batch_max_wait_ms, name="faiss-query"
+        )
 
     def load_knowledge_base_from_pdf(self):
         """
-        Load knowledge base from a PDF file.
+        Load knowledge base from a PDF file through the shared streaming ingestion pipeline
+        (pages are extracted in a process pool and parsed as they arrive).
 
         :return: List of knowledge base entries
         """
         if not os.path.exists(self.knowledge_base_path):
             raise FileNotFoundError(f"PDF file not found at {self.knowledge_base_path}")
 
-        knowledge_base = []
-        reader = PdfReader(self.knowledge_base_path)
-
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                entries = self.parse_pdf_text(text)
-                knowledge_base.extend(entries)
+        knowledge_base = [
+            {"gejala": entry["gejala"], "penyebab": entry["penyebab"], "solusi": entry["solusi"]}
+            for entry in iter_knowledge_base(self.knowledge_base_path)
+        ]
 
         if not knowledge_base:
             logger.warning("No valid entries found in the PDF file.")
@@ -56,56 +213,161 @@ class FAISSIndexManager:
         :param text: Raw text from PDF
         :return: List of parsed entries
         """
-        entries = []
-        lines = text.split("\n")
-        for line in lines:
-            parts = line.split(":")  # Assuming format "gejala:penyebab"
-            if len(parts) == 2:
-                gejala, penyebab = parts[0].strip(), parts[1].strip()
-                if gejala and penyebab:
-                    entries.append({"gejala": gejala, "penyebab": penyebab})
-        return entries
+        return [
+            {"gejala": entry["gejala"], "penyebab": entry["penyebab"], "solusi": entry["solusi"]}
+            for entry in parse_page_entries(text)
+        ]
 
     def load_or_create_index(self):
         """
         Load existing FAISS index or create a new one if it doesn't exist.
+
+        An index built with another metric (e.g. a legacy L2 index in "ip" mode) is never served, since
+        its scores would be compared against the cosine ``min_score``: it is rebuilt from the PDF.
+
+        :raises ValueError: if such an index cannot be rebuilt because the PDF is missing
         """
         if os.path.exists(self.index_path):
             self.index = faiss.read_index(self.index_path)
+            self._index_mtime = os.stat(self.index_path).st_mtime_ns
             logger.info(f"FAISS index loaded from {self.index_path}.")
+            if self.index.metric_type != SUPPORTED_METRICS[self.metric]:
+                self.index = self._create_id_index()
+                self._rebuild_required = True
+                if not os.path.exists(self.knowledge_base_path):
+                    raise ValueError(f"Index at {self.index_path} was not built with metric '{self.metric}' "
+                                     f"and {self.knowledge_base_path} is missing to rebuild it.")
+                logger.warning(f"Index at {self.index_path} was not built with metric '{self.metric}'; rebuilding it.")
+                self.add_to_index()
+            elif not isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+                logger.warning(f"Index at {self.index_path} has no entry ids; it will be rebuilt on the next add_to_index.")
         else:
-            self.index = faiss.IndexFlatL2(self.embedding_dim)
-            logger.info("New FAISS index created.")
+            self.index = self._create_id_index()
+            logger.info(f"New FAISS index created ({self.index_type}).")
 
-    def add_to_index(self):
+    def _create_id_index(self, num_vectors=None):
         """
-        Add entries from knowledge base to the FAISS index.
+        Create an empty index of the configured type wrapped in an IndexIDMap2 keyed by entry ids.
+        """
+        return faiss.IndexIDMap2(
+            create_faiss_index(self.index_type, self.embedding_dim, num_vectors=num_vectors, **self.index_params)
+        )
+
+    def add_to_index(self, knowledge_base=None):
         """
-        knowledge_base = self.load_knowledge_base_from_pdf()
+        Incrementally sync the FAISS index with the knowledge base PDF (or the given entries).
+
+        Entries are identified by a hash of their whole content (see entry_ids), so an edited entry
+        is a new id: only new entries are embedded, entries missing from the PDF (including the old
+        version of an edited entry) are removed, and unchanged entries are skipped. Each run is
+        appended to the change log next to the index.
+
+        :param knowledge_base: Optional list of {"gejala", "penyebab", "solusi"} entries to sync instead of the PDF
+        :return: Dict with the number of entries added, updated, removed and skipped
+        """
+        if knowledge_base is None:
+            knowledge_base = self.load_knowledge_base_from_pdf()
         if not knowledge_base:
             logger.error("No entries to add to the index.")
-            return
+            return {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
 
-        texts = [entry['gejala'] for entry in knowledge_base]
-        metadata = knowledge_base
+        incoming = dict(zip(entry_ids(knowledge_base), knowledge_base))
 
-        embeddings = self.generate_embeddings(texts)
-        self.index.add(embeddings)
-        logger.info(f"Added {len(texts)} entries to the index.")
+        with self._metadata_lock:
+            self._refresh_metadata(required=False)
+            if self._rebuild_required or not isinstance(self.index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+                logger.warning("Rebuilding legacy index from scratch.")
+                self.index = self._create_id_index()
+                self._set_metadata([])
+                self._rebuild_required = False
 
-        # Save metadata
-        metadata_path = self.index_path.replace('.index', '_metadata.json')
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                existing_metadata = json.load(f)
-        else:
-            existing_metadata = []
+            current_hashes = dict(zip(self._metadata_ids, self._metadata_hashes))
+            added = [i for i in incoming if i not in current_hashes]
+            updated = [i for i in incoming if i in current_hashes and current_hashes[i] != entry_hash(incoming[i])]
+            removed = [i for i in current_hashes if i not in incoming]
+            skipped = len(incoming) - len(added) - len(updated)
+
+            if removed or updated:
+                self._remove_ids(removed + updated)
+
+            changed = added + updated
+            if changed:
+                # Fixed-size batches keep tokenizer/activation memory flat for large manuals
+                embeddings = np.vstack([
+                    self.generate_embeddings(batch)
+                    for batch in iter_batches((incoming[i]['gejala'] for i in changed), self.embedding_batch_size)
+                ])
+                if not self.index.is_trained:
+                    self.train_index(embeddings)
+                self.index.add_with_ids(embeddings, np.asarray(changed, dtype=np.int64))
+
+            # Update the in-memory metadata in place, then persist it compactly
+            dropped = set(removed) | set(updated)
+            rows = [
+                {"id": i, "gejala": g, "penyebab": p, "hash": h}
+                for i, g, p, h in zip(self._metadata_ids, self._metadata_gejala,
+                                      self._metadata_penyebab, self._metadata_hashes)
+                if i not in dropped
+            ]
+            rows.extend(
+                {"id": i, "gejala": incoming[i]['gejala'], "penyebab": incoming[i]['penyebab'],
+                 "hash": entry_hash(incoming[i])}
+                for i in changed
+            )
+            self._set_metadata(rows)
+            if changed or removed:
+                # The metadata file is written last: other processes reload the index when it changes
+                self.save_index()
+                self._write_metadata()
+
+        report = {"added": len(added), "updated": len(updated), "removed": len(removed), "skipped": skipped}
+        self._append_changelog(report, added, updated, removed)
+        logger.info(
+            f"Index synced: {report['added']} added, {report['updated']} updated, "
+            f"{report['removed']} removed, {report['skipped']} skipped."
+        )
+        return report
+
+    def _remove_ids(self, ids):
+        """
+        Remove entry ids from the index. Index types without native removal (HNSW) are rebuilt
+        from the reconstructed vectors that remain.
+        """
+        id_array = np.asarray(ids, dtype=np.int64)
+        try:
+            self.index.remove_ids(id_array)
+        except RuntimeError:
+            drop = set(ids)
+            keep = [i for i in self._metadata_ids if i not in drop]
+            vectors = (
+                np.vstack([self.index.reconstruct(i) for i in keep])
+                if keep else np.zeros((0, self.embedding_dim), dtype=np.float32)
+            )
+            self.index = self._create_id_index(num_vectors=len(keep))
+            if not self.index.is_trained and len(keep):
+                self.index.train(vectors)
+            if len(keep):
+                self.index.add_with_ids(vectors, np.asarray(keep, dtype=np.int64))
+            logger.info(f"Rebuilt {self.index_type} index to remove {len(ids)} entries.")
 
-        existing_metadata.extend(metadata)
+    def _append_changelog(self, report, added, updated, removed):
+        """
+        Append one JSON line describing an ingest run to the change log.
+        """
+        record = dict(report, timestamp=time.time(), added_ids=added, updated_ids=updated, removed_ids=removed)
+        with open(self.changelog_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
 
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_metadata, f, ensure_ascii=False, indent=4)
-        logger.info(f"Metadata saved to {metadata_path}.")
+    def train_index(self, embeddings):
+        """
+        Train an empty IVF index, resizing nlist / PQ bits to the available training data.
+
+        :param embeddings: numpy array of training vectors
+        """
+        if self.index.ntotal == 0:
+            self.index = self._create_id_index(num_vectors=len(embeddings))
+        self.index.train(embeddings)
+        logger.info(f"Trained {self.index_type} index on {len(embeddings)} vectors.")
 
     def generate_embeddings(self, texts):
         """
@@ -117,48 +379,136 @@ class FAISSIndexManager:
         inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt").to(self.device)
         with torch.no_grad():
             outputs = self.model(**inputs)
-        embeddings = outputs.last_hidden_state.mean(dim=1).cpu().numpy()
-        return embeddings
+            if not self.normalize_embeddings:
+                return outputs.last_hidden_state.mean(dim=1).cpu().numpy()
+
+            # Mean over real tokens only, then L2-normalize so inner product == cosine
+            mask = inputs["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            embeddings = summed / mask.sum(dim=1).clamp(min=1e-9)
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.cpu().numpy().astype(np.float32)
 
-    def search_index(self, query_text, top_k=5):
+    def _dense_search(self, index, query_embedding, k, nprobe=None, ef_search=None, ids=None):
+        """
+        Run one FAISS search on ``index``, optionally restricted to ``ids``.
+
+        :return: Tuple (list of entry ids, list of scores) without the -1 padding
+        """
+        params = make_search_params(index, nprobe or self.nprobe, ef_search or self.ef_search, ids=ids)
+        distances, indices = index.search(query_embedding, k, params=params)
+        found = indices[0] >= 0  # fewer than k vectors in the index
+        return indices[0][found].tolist(), distances[0][found].tolist()
+
+    def search_index(self, query_text, top_k=5, nprobe=None, ef_search=None, min_score=None, mode=None,
+                     query_embedding=None):
         """
         Search the FAISS index for the most similar texts based on a query.
 
+        In "ip" mode matches whose cosine similarity is below ``min_score`` (defaults to the
+        manager's similarity_threshold) are dropped, so callers can skip work when nothing passes.
+
+        In "hybrid" mode the BM25 ranking and the dense ranking are fused with reciprocal-rank
+        fusion. A match is kept if its cosine passes ``min_score`` or if it covers at least
+        ``lexical_min_coverage`` of the query terms (idf-weighted), so exact part names such as
+        "aki" or "busi" are found even when the embedding match is weak.
+
         :param query_text: Text to search for in the index
         :param top_k: Number of nearest neighbors to return
-        :return: List of results and distances
+        :param nprobe: IVF lists to visit (defaults to the manager's nprobe)
+        :param ef_search: HNSW search breadth (defaults to the manager's ef_search)
+        :param min_score: Minimum cosine similarity to keep a match ("ip" mode only)
+        :param mode: "dense" or "hybrid" (defaults to the manager's retrieval_mode)
+        :param query_embedding: Normalized embedding of ``query_text`` from the same model, if the caller already has it
+        :return: List of results and their distances (L2) or cosine scores (IP); fused RRF scores in hybrid mode
         """
-        query_embedding = self.generate_embeddings([query_text])
-        distances, indices = self.index.search(query_embedding, top_k)
+        mode = mode or self.retrieval_mode
+        if query_embedding is None:
+            with metrics.span("query_encode"):
+                query_embedding = self.query_batcher.encode(query_text)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
 
-        # Load metadata
-        metadata_path = self.index_path.replace('.index', '_metadata.json')
-        if not os.path.exists(metadata_path):
-            raise FileNotFoundError(f"Metadata file not found at {metadata_path}")
+        with self._metadata_lock:
+            self._refresh_metadata(required=True)
+            rows, gejala, penyebab = self._metadata_rows, self._metadata_gejala, self._metadata_penyebab
+            lexical_index = self.lexical_index
+            index = self.index
 
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        min_score = self.similarity_threshold if min_score is None else min_score
+        if self.metric != "ip":
+            min_score = None
+
+        with metrics.span("faiss_search"):
+            if mode == "hybrid":
+                ranked = self._hybrid_search(
+                    index, query_text, query_embedding, top_k, nprobe, ef_search, min_score, lexical_index
+                )
+            else:
+                ranked = []
+                for idx, distance in zip(*self._dense_search(index, query_embedding, top_k, nprobe, ef_search)):
+                    if min_score is not None and distance < min_score:
+                        break  # results are sorted by descending similarity
+                    ranked.append((idx, distance))
 
         results = []
-        for idx in indices[0]:
-            if idx < len(metadata):
-                result = metadata[idx]
+        scores = []
+        for idx, score in ranked:
+            row = rows.get(int(idx))
+            if row is not None:
                 results.append({
-                    "gejala": result["gejala"],
-                    "penyebab": result["penyebab"]
+                    "gejala": gejala[row],
+                    "penyebab": penyebab[row]
                 })
+                scores.append(score)
             else:
-                logger.warning(f"Index {idx} out of metadata range.")
+                logger.warning(f"Index id {idx} not found in metadata.")
+
+        return results, np.asarray(scores, dtype=np.float32)
+
+    def _hybrid_search(self, index, query_text, query_embedding, top_k, nprobe, ef_search, min_score, lexical_index):
+        """
+        Fuse BM25 and dense rankings with reciprocal-rank fusion.
+
+        When BM25 finds at least ``top_k`` candidates and prefiltering is on, the dense search is
+        restricted to those candidates (IDSelectorBatch), so only they are scored; otherwise the dense
+        search runs over the whole index so queries without lexical overlap still get semantic matches.
+
+        :return: List of (entry id, fused score) that pass the relevance gate, best first
+        """
+        lexical_ids, _ = lexical_index.search(query_text, self.lexical_candidates)
+        lexical_ids = lexical_ids.tolist()
+        if self.lexical_prefilter and len(lexical_ids) >= top_k:
+            dense_ids, dense_scores = self._dense_search(
+                index, query_embedding, len(lexical_ids), nprobe, ef_search, ids=lexical_ids
+            )
+        else:
+            dense_ids, dense_scores = self._dense_search(
+                index, query_embedding, max(top_k, self.lexical_candidates), nprobe, ef_search
+            )
+
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids], k=self.rrf_k)
+        cosine = dict(zip(dense_ids, dense_scores))
+        coverage = lexical_index.coverage(query_text, [idx for idx, _ in fused])
 
-        return results, distances[0]
+        ranked = []
+        for idx, score in fused:
+            if min_score is None or cosine.get(idx, -np.inf) >= min_score \
+                    or coverage.get(idx, 0.0) >= self.lexical_min_coverage:
+                ranked.append((idx, score))
+                if len(ranked) == top_k:
+                    break
+        return ranked
 
     def save_index(self):
         """
-        Save the FAISS index to disk.
+        Save the FAISS index to disk (atomically, so other processes never read a partial file).
         """
         if self.index is None:
             raise ValueError("Index has not been created or loaded.")
-        faiss.write_index(self.index, self.index_path)
+        tmp_path = self.index_path + '.tmp'
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
         logger.info(f"Index saved to {self.index_path}.")
 
     def load_metadata(self):
@@ -167,12 +517,92 @@ class FAISSIndexManager:
 
         :return: List of metadata
         """
-        metadata_path = self.index_path.replace('.index', '_metadata.json')
-        if not os.path.exists(metadata_path):
-            logger.warning(f"Metadata file {metadata_path} does not exist.")
-            return []
+        with self._metadata_lock:
+            if not self._refresh_metadata(required=False):
+                logger.warning(f"Metadata file {self.metadata_path} does not exist.")
+                return []
+            return [
+                {"gejala": gejala, "penyebab": penyebab}
+                for gejala, penyebab in zip(self._metadata_gejala, self._metadata_penyebab)
+            ]
+
+    def get_metadata_version(self):
+        """
+        Current metadata version after a cheap mtime check; changes whenever the index content changes.
+        """
+        with self._metadata_lock:
+            self._refresh_metadata(required=False)
+            return self.metadata_version
+
+    def _refresh_metadata(self, required):
+        """
+        Reload the metadata cache only if the file's mtime changed since the last load.
+        Callers must hold ``_metadata_lock``.
+
+        :param required: Raise FileNotFoundError if no metadata exists on disk or in memory
+        :return: True if metadata is available
+        """
+        try:
+            mtime = os.stat(self.metadata_path).st_mtime_ns
+        except FileNotFoundError:
+            if self._metadata_mtime is None and required:
+                raise FileNotFoundError(f"Metadata file not found at {self.metadata_path}")
+            return self._metadata_mtime is not None
+
+        if mtime != self._metadata_mtime:
+            with metrics.span("metadata_load"):
+                # Another process re-synced the index: reload the vectors too, so ids match the metadata
+                self._refresh_index()
+                with open(self.metadata_path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                self._set_metadata(metadata)
+            self._metadata_mtime = mtime
+            self.metadata_version += 1
+            logger.info(f"Metadata loaded from {self.metadata_path} ({len(metadata)} entries).")
+        return True
 
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-        logger.info(f"Metadata loaded from {metadata_path}.")
-        return metadata
+    def _refresh_index(self):
+        """
+        Reload the FAISS index if its file changed since this process last read or wrote it.
+        Callers must hold ``_metadata_lock``.
+        """
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._index_mtime:
+            self.index = faiss.read_index(self.index_path)
+            self._index_mtime = mtime
+            logger.info(f"FAISS index reloaded from {self.index_path} ({self.index.ntotal} vectors).")
+
+    def _set_metadata(self, metadata):
+        """
+        Replace the columnar metadata cache. Legacy files without ids use the row position,
+        which matches the labels of indexes built before entry ids existed.
+        Callers must hold ``_metadata_lock``.
+        """
+        self._metadata_ids = [entry.get("id", row) for row, entry in enumerate(metadata)]
+        self._metadata_gejala = [entry["gejala"] for entry in metadata]
+        self._metadata_penyebab = [entry["penyebab"] for entry in metadata]
+        self._metadata_hashes = [entry.get("hash") or entry_hash(entry) for entry in metadata]
+        self._metadata_rows = {metadata_id: row for row, metadata_id in enumerate(self._metadata_ids)}
+        # BM25 is derived from the same rows, so it is rebuilt at ingest and whenever metadata reloads
+        self.lexical_index = BM25Index(
+            self._metadata_ids, [f"{g} {p}" for g, p in zip(self._metadata_gejala, self._metadata_penyebab)]
+        )
+
+    def _write_metadata(self):
+        """
+        Persist the in-memory metadata as compact JSON. Callers must hold ``_metadata_lock``.
+        """
+        metadata = [
+            {"id": i, "gejala": gejala, "penyebab": penyebab, "hash": h}
+            for i, gejala, penyebab, h in zip(self._metadata_ids, self._metadata_gejala,
+                                              self._metadata_penyebab, self._metadata_hashes)
+        ]
+        tmp_path = self.metadata_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.metadata_path)
+        self._metadata_mtime = os.stat(self.metadata_path).st_mtime_ns
+        self.metadata_version += 1
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+from transformers.modeling_outputs import BaseModelOutput
+from inference_pool import current_deadline
+from metrics import metrics
+from decoding import DecodingPolicy
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Jawaban pengganti yang dikembalikan ke pengguna bila generasi gagal
+GENERATION_ERROR_ANSWER = "Terjadi kesalahan saat menghasilkan jawaban."
+
+
+class GenerationError(RuntimeError):
+    """Generasi jawaban gagal; jawaban pengganti untuk request ini tidak boleh di-cache."""
+
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    def __init__(self, deadline):
+        """
+        Menghentikan generate begitu deadline request (time.monotonic) terlewati.
+        """
+        self.deadline = deadline
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return time.monotonic() >= self.deadline
+
+
+def deadline_criteria(deadline=None):
+    """
+    Membuat StoppingCriteriaList dari deadline eksplisit atau deadline pool inferensi thread ini.
+    """
+    deadline = deadline if deadline is not None else current_deadline()
+    if deadline is None:
+        return None
+    return StoppingCriteriaList([DeadlineStoppingCriteria(deadline)])
+
+
+class AnswerGenerator:
+    def __init__(self, tokenizer, model, max_input_length=512, encoder_cache=None, decoding_policy=None):
+        """
+        Pembungkus model generasi seq2seq (T5) yang dipakai bersama oleh RagPipeline dan QAModel.
+
+        :param encoder_cache: EncoderCache opsional. Jika diisi, pertanyaan dan konteks di-encode terpisah
+                              (gaya Fusion-in-Decoder: hidden state keduanya digabung sebagai masukan
+                              decoder), sehingga encoding konteks yang berulang diambil dari cache
+        :param decoding_policy: DecodingPolicy yang dipakai jika pemanggil tidak menetapkan max_length/num_beams;
+                                default greedy adaptif dengan eskalasi ke beam search
+        """
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_input_length = max_input_length
+        self.encoder_cache = encoder_cache
+        self.decoding_policy = decoding_policy or DecodingPolicy()
+
+    @staticmethod
+    def build_prompt(question, context):
+        """
+        Menyusun prompt T5 dari pertanyaan dan konteks.
+        """
+        return f"question: {question} context: {context}"
+
+    def _encode(self, texts):
+        """
+        Menjalankan encoder untuk banyak teks dalam satu batch ber-padding.
+
+        :return: List hidden state per teks tanpa padding (panjang x d_model)
+        """
+        inputs = self.tokenizer(
+            texts, return_tensors="pt", padding=True, max_length=self.max_input_length, truncation=True
+        ).to(self.model.device)
+        with torch.no_grad():
+            hidden = self.model.get_encoder()(**inputs).last_hidden_state
+        lengths = inputs["attention_mask"].sum(dim=1).tolist()
+        return [hidden[i, :length] for i, length in enumerate(lengths)]
+
+    def _cached_encoder_inputs(self, questions, contexts):
+        """
+        Menyusun masukan generate dari hidden state pertanyaan dan konteks yang di-encode terpisah.
+        Konteks yang sudah ada di cache tidak di-encode ulang; konteks baru di-encode sekali per batch.
+
+        :return: Dict {'encoder_outputs', 'attention_mask'} untuk model.generate
+        """
+        question_states = self._encode([f"question: {question}" for question in questions])
+
+        context_states = [None] * len(contexts)
+        missing = {}  # konteks -> posisi dalam batch
+        for i, context in enumerate(contexts):
+            states = self.encoder_cache.get((id(self.model), context))
+            if states is None:
+                missing.setdefault(context, []).append(i)
+            else:
+                context_states[i] = states
+        if missing:
+            texts = list(missing)
+            for context, states in zip(texts, self._encode([f"context: {text}" for text in texts])):
+                states = states.clone()  # lepas dari tensor batch ber-padding sebelum disimpan
+                self.encoder_cache.put((id(self.model), context), states)
+                for i in missing[context]:
+                    context_states[i] = states
+
+        sequences = [torch.cat([q, c]) for q, c in zip(question_states, context_states)]
+        max_length = max(len(sequence) for sequence in sequences)
+        hidden = sequences[0].new_zeros((len(sequences), max_length, sequences[0].shape[-1]))
+        attention_mask = torch.zeros((len(sequences), max_length), dtype=torch.long, device=hidden.device)
+        for i, sequence in enumerate(sequences):
+            hidden[i, :len(sequence)] = sequence
+            attention_mask[i, :len(sequence)] = 1
+        return {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden), "attention_mask": attention_mask}
+
+    def encoder_inputs(self, questions, contexts):
+        """
+        Masukan model.generate untuk satu batch: prompt gabungan yang di-tokenize, atau hidden state
+        encoder (sebagian dari cache) jika encoder_cache aktif.
+        """
+        if self.encoder_cache is not None:
+            with metrics.span("encode"):
+                return self._cached_encoder_inputs(questions, contexts)
+        with metrics.span("tokenize"):
+            return self.tokenizer(
+                [self.build_prompt(question, context) for question, context in zip(questions, contexts)],
+                return_tensors="pt", padding=True, max_length=self.max_input_length, truncation=True
+            ).to(self.model.device)
+
+    def generate_answers(self, questions, contexts, max_length=None, num_beams=None, batch_size=16):
+        """
+        Menghasilkan jawaban untuk banyak pasangan pertanyaan/konteks dengan generate ber-padding.
+
+        Prompt diurutkan berdasarkan panjangnya sebelum dibagi ke batch agar padding minimal,
+        lalu jawaban dikembalikan sesuai urutan masukan. Tanpa ``max_length``/``num_beams`` decoding
+        mengikuti ``decoding_policy``; jika salah satunya diisi, decoding tetap (default 150 dan 2 beam).
+
+        :return: List jawaban dengan panjang sama dengan ``questions``
+        """
+        if len(questions) != len(contexts):
+            raise ValueError("Jumlah pertanyaan dan konteks harus sama.")
+
+        prompts = [self.build_prompt(question, context) for question, context in zip(questions, contexts)]
+        order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+        answers = [None] * len(prompts)
+
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            inputs = self.encoder_inputs([questions[i] for i in batch_indices], [contexts[i] for i in batch_indices])
+
+            with metrics.span("generate"), torch.no_grad():
+                if max_length is None and num_beams is None:
+                    outputs = self.decoding_policy.generate(self.model, inputs, stopping_criteria=deadline_criteria())
+                else:
+                    outputs = self.model.generate(
+                        **inputs, max_length=max_length or 150, num_beams=num_beams or 2, early_stopping=True,
+                        stopping_criteria=deadline_criteria()
+                    )
+
+            with metrics.span("decode"):
+                decoded = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            for i, answer in zip(batch_indices, decoded):
+                answers[i] = answer
+
+        return answers
+
+    def stream_answer(self, question, context, max_length=None):
+        """
+        Menghasilkan jawaban token demi token (generator teks) saat model masih men-decode.
+
+        Streaming memakai greedy decoding karena beam search baru tahu hasil akhirnya setelah selesai;
+        tanpa ``max_length`` batas token baru dan model draft mengikuti ``decoding_policy``.
+
+        :raises GenerationError: jika generate gagal (setelah potongan yang sempat dihasilkan di-yield)
+        """
+        inputs = self.encoder_inputs([question], [context])
+        if max_length is None:
+            generate_kwargs = self.decoding_policy.stream_kwargs(self.model, inputs)
+        else:
+            generate_kwargs = {"max_length": max_length, "num_beams": 1}
+        streamer = TextIteratorStreamer(self.tokenizer, skip_special_tokens=True)
+        stopping_criteria = deadline_criteria()  # dibaca di thread pemanggil sebelum generate dipindah
+        errors = []
+
+        def run_generate():
+            try:
+                # Decode streaming terjadi di TextIteratorStreamer, jadi termasuk dalam span generate
+                with metrics.span("generate"), torch.no_grad():
+                    self.model.generate(
+                        **inputs, **generate_kwargs, streamer=streamer, stopping_criteria=stopping_criteria
+                    )
+            except Exception as e:
+                logger.error(f"Error saat streaming jawaban: {e}")
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=run_generate, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            thread.join()
+        if errors:
+            raise GenerationError(f"Streaming jawaban gagal: {errors[0]}") from errors[0]
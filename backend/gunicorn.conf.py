@@ -0,0 +1,27 @@
+# Konfigurasi gunicorn untuk mode produksi:
+#   gunicorn -c gunicorn.conf.py sistem_pakar_backend:app
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# preload_app memuat model dan indeks sekali di proses master sebelum fork, sehingga
+# bobot model dipakai bersama oleh seluruh worker lewat copy-on-write, bukan dimuat ulang.
+# STARTUP_MODE=background (port langsung dibuka, model dimuat di thread latar) tidak bisa memakai
+# preload karena thread warmup di master tidak ikut fork; setiap worker memuat modelnya sendiri.
+preload_app = os.environ.get("STARTUP_MODE", "eager") != "background"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# Thread per worker hanya melayani I/O request; inferensi dibatasi oleh InferencePool.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+# Harus lebih besar dari INFERENCE_TIMEOUT_SECONDS agar request lambat dijawab 504, bukan dibunuh.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # Terapkan ulang TORCH_NUM_THREADS / TORCH_INTEROP_THREADS di setiap worker dengan helper yang sama
+    # seperti saat startup, agar worker tidak saling berebut core CPU.
+    from model_registry import configure_torch_threads
+    server.log.info(f"Worker {worker.pid}: thread PyTorch {configure_torch_threads()}")
@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import logging
+import os
+import threading
+import time
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Deadline inferensi untuk thread yang sedang berjalan (dibaca oleh AnswerGenerator)
+_deadline = threading.local()
+
+
+def current_deadline():
+    """
+    Mengembalikan deadline (time.monotonic) untuk pekerjaan inferensi di thread ini, atau None.
+    """
+    return getattr(_deadline, "value", None)
+
+
+class PoolSaturatedError(RuntimeError):
+    """Antrian inferensi penuh; request sebaiknya ditolak dengan 503."""
+
+
+class InferenceTimeoutError(TimeoutError):
+    """Pekerjaan inferensi melewati batas waktu per request."""
+
+
+class Reservation:
+    def __init__(self, pool, deadline):
+        """
+        Slot pool yang dipesan untuk pekerjaan di luar executor (mis. streaming SSE).
+
+        Dipakai sebagai context manager di thread yang menjalankan inferensi untuk memasang
+        deadline; ``release`` aman dipanggil lebih dari sekali.
+        """
+        self.pool = pool
+        self.deadline = deadline
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _deadline.value = self.deadline
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _deadline.value = None
+        self.release()
+        return False
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.pool._release()
+
+
+class InferencePool:
+    def __init__(self, max_workers=2, max_queue=16, timeout_seconds=30.0):
+        """
+        Pool thread terbatas untuk inferensi model.
+
+        Paling banyak ``max_workers`` pekerjaan berjalan dan ``max_queue`` pekerjaan menunggu;
+        pekerjaan berikutnya langsung ditolak (backpressure). Setiap pekerjaan mendapat deadline
+        yang dipakai generate untuk berhenti ketika request sudah melewati batas waktunya.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_executor(self):
+        """
+        Membuat executor secara lazy, dan membuatnya ulang setelah fork (mis. worker gunicorn
+        dengan preload_app) karena thread tidak ikut tersalin ke proses anak.
+        """
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _acquire(self):
+        """
+        Mengambil satu slot tanpa menunggu; menolak dengan PoolSaturatedError jika penuh.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturatedError("Antrian inferensi penuh, coba lagi nanti.")
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def _record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    @staticmethod
+    def _call_with_deadline(deadline, fn, args, kwargs):
+        _deadline.value = deadline
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.value = None
+
+    def submit(self, fn, *args, timeout=None, **kwargs):
+        """
+        Menjadwalkan pekerjaan inferensi di pool.
+
+        :return: concurrent.futures.Future
+        :raises PoolSaturatedError: jika seluruh slot (berjalan + antrian) terpakai
+        """
+        self._acquire()
+        deadline = time.monotonic() + (timeout or self.timeout_seconds)
+        try:
+            future = self._get_executor().submit(self._call_with_deadline, deadline, fn, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Menjalankan pekerjaan di pool dan menunggu hasilnya (blocking).
+        """
+        timeout = timeout or self.timeout_seconds
+        future = self.submit(fn, *args, timeout=timeout, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._record_timeout()
+            raise InferenceTimeoutError(f"Inferensi melebihi batas waktu {timeout:.1f} detik.")
+
+    async def run_async(self, fn, *args, timeout=None, **kwargs):
+        """
+        Versi async dari run: handler menunggu hasil tanpa memblokir event loop.
+        """
+        timeout = timeout or self.timeout_seconds
+        future = self.submit(fn, *args, timeout=timeout, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._record_timeout()
+            raise InferenceTimeoutError(f"Inferensi melebihi batas waktu {timeout:.1f} detik.")
+
+    def reserve(self, timeout=None):
+        """
+        Memesan satu slot untuk pekerjaan yang berjalan di luar executor (mis. streaming).
+
+        :return: Reservation; gunakan ``with reservation:`` di thread yang menjalankan inferensi
+        :raises PoolSaturatedError: jika seluruh slot terpakai
+        """
+        self._acquire()
+        return Reservation(self, time.monotonic() + (timeout or self.timeout_seconds))
+
+    def stats(self):
+        """
+        Melaporkan konfigurasi dan penghitung pool.
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout_seconds,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
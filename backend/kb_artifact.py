@@ -0,0 +1,295 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from model_registry import registry, normalize_model_name, EMBEDDING_MODEL_NAME
+from pdf_extraction import EXTRACTION_VERSION, iter_batches, iter_knowledge_base
+
+try:
+    import fcntl
+except ImportError:  # fcntl tidak ada di Windows, build artefak berjalan tanpa kunci antarproses
+    fcntl = None
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Versi format artefak; dinaikkan bila struktur file berubah
+ARTIFACT_FORMAT_VERSION = 1
+
+# Kolom metadata entri, disimpan sebagai baris list (bukan dict) agar JSON ringkas
+METADATA_FIELDS = ("gejala", "penyebab", "solusi")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "build.lock"
+
+
+def file_sha256(path):
+    """
+    Menghitung hash sha256 isi file secara bertahap.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_version(pdf_sha256, model_name, precision):
+    """
+    Versi artefak ditentukan oleh isi PDF, model embedding, presisi dan versi ekstraksi.
+    """
+    key = "|".join([pdf_sha256, normalize_model_name(model_name), precision, EXTRACTION_VERSION,
+                    str(ARTIFACT_FORMAT_VERSION)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def current_artifact_path(artifact_dir):
+    """
+    Mengembalikan direktori versi artefak yang aktif (ditunjuk file CURRENT), atau None.
+    """
+    try:
+        with open(os.path.join(artifact_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(artifact_dir, version)
+    return path if os.path.isdir(path) else None
+
+
+@contextmanager
+def build_lock(artifact_dir):
+    """
+    Kunci eksklusif antarproses selama membangun artefak. Tanpa preload_app setiap worker gunicorn
+    memuat knowledge base sendiri, sehingga beberapa worker bisa membangun versi yang sama bersamaan.
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    with open(os.path.join(artifact_dir, LOCK_FILE), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Dilepas saat file ditutup
+        yield
+
+
+def read_manifest(path, version):
+    """
+    Membaca manifest direktori versi artefak yang sudah lengkap, atau None jika belum ada atau tidak cocok.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION or manifest.get("version") != version:
+        return None
+    if not all(os.path.isfile(os.path.join(path, name)) for name in (EMBEDDINGS_FILE, METADATA_FILE)):
+        return None
+    return manifest
+
+
+def build_artifact(pdf_path, artifact_dir, model_name=EMBEDDING_MODEL_NAME, batch_size=64, keep_versions=2):
+    """
+    Membangun artefak knowledge base: matriks embedding float32 (.npy, bisa di-mmap) dan metadata ringkas.
+
+    Artefak ditulis ke subdirektori versi lalu diaktifkan dengan mengganti file CURRENT secara atomik,
+    sehingga worker yang sedang berjalan tetap membaca versi lamanya sampai di-reload. Build berjalan
+    di bawah build_lock; jika versi yang sama sudah dibangun (mis. oleh worker lain), versi itu
+    langsung diaktifkan tanpa encode ulang.
+
+    :return: Dict manifest artefak yang baru
+    """
+    start = time.perf_counter()
+    pdf_sha256 = file_sha256(pdf_path)
+    precision = registry.precision
+    version = artifact_version(pdf_sha256, model_name, precision)
+    target = os.path.join(artifact_dir, version)
+
+    with build_lock(artifact_dir):
+        manifest = read_manifest(target, version)
+        if manifest is not None:
+            logger.info(f"Artefak knowledge base {version} sudah dibangun, dipakai ulang.")
+        else:
+            manifest = _write_version(pdf_path, target, version, pdf_sha256, precision, model_name, batch_size, start)
+            logger.info(f"Artefak knowledge base {version} dibangun ({manifest['count']} entri) "
+                        f"dalam {manifest['build_seconds']} detik.")
+
+        current_tmp = os.path.join(artifact_dir, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+        with open(current_tmp, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(artifact_dir, CURRENT_FILE))
+        prune_versions(artifact_dir, keep_versions)
+    return manifest
+
+
+def _write_version(pdf_path, target, version, pdf_sha256, precision, model_name, batch_size, start):
+    """
+    Mengekstrak PDF, meng-encode gejala dan menulis direktori versi ``target`` lewat direktori staging.
+    """
+    model = registry.get_sentence_transformer(model_name)
+    embedding_dim = model.get_sentence_embedding_dimension()
+
+    rows = []
+    batches = []
+    for batch in iter_batches(iter_knowledge_base(pdf_path), batch_size):
+        rows.extend([entry[field] for field in METADATA_FIELDS] for entry in batch)
+        batches.append(model.encode(
+            [entry["gejala"] for entry in batch],
+            batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32))
+    embeddings = np.vstack(batches) if batches else np.zeros((0, embedding_dim), dtype=np.float32)
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "version": version,
+        "model_name": normalize_model_name(model_name),
+        "precision": precision,
+        "extraction_version": EXTRACTION_VERSION,
+        "pdf_path": os.path.abspath(pdf_path),
+        "pdf_sha256": pdf_sha256,
+        "count": len(rows),
+        "embedding_dim": embedding_dim,
+        "dtype": "float32",
+        "created_at": time.time(),
+    }
+
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, EMBEDDINGS_FILE), np.ascontiguousarray(embeddings))
+    with open(os.path.join(staging, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"fields": METADATA_FIELDS, "rows": rows}, f, ensure_ascii=False, separators=(',', ':'))
+    manifest["build_seconds"] = round(time.perf_counter() - start, 3)
+    with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Sisa build yang terputus (tanpa manifest lengkap) diganti; build lain tidak berjalan selama kunci dipegang
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    return manifest
+
+
+def prune_versions(artifact_dir, keep_versions=2):
+    """
+    Menghapus versi artefak lama, menyisakan ``keep_versions`` versi terbaru (termasuk yang aktif).
+    """
+    current = current_artifact_path(artifact_dir)
+    versions = [
+        os.path.join(artifact_dir, name) for name in os.listdir(artifact_dir)
+        if os.path.isfile(os.path.join(artifact_dir, name, MANIFEST_FILE))
+    ]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep_versions:]:
+        if current is None or os.path.abspath(path) != os.path.abspath(current):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_artifact(artifact_dir, model_name=None, pdf_path=None):
+    """
+    Membuka artefak aktif. Matriks embedding dibuka dengan mmap read-only, sehingga worker
+    gunicorn yang membuka file yang sama berbagi halaman memori yang sama (page cache) tanpa salinan.
+
+    :param model_name: Jika diisi, artefak harus dibangun dengan model (dan presisi registry) ini
+    :param pdf_path: Jika diisi, artefak harus dibangun dari isi PDF ini
+    :return: Tuple (list entri, matriks embedding memmap n x dim, manifest)
+    :raises FileNotFoundError: jika belum ada artefak
+    :raises ValueError: jika artefak tidak cocok dengan model, presisi atau PDF
+    """
+    path = current_artifact_path(artifact_dir)
+    if path is None:
+        raise FileNotFoundError(f"Artefak knowledge base tidak ditemukan di {artifact_dir}")
+
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Format artefak {manifest.get('format_version')} tidak didukung.")
+    if model_name is not None:
+        if manifest["model_name"] != normalize_model_name(model_name) or manifest["precision"] != registry.precision:
+            raise ValueError(
+                f"Artefak dibangun dengan {manifest['model_name']} ({manifest['precision']}), "
+                f"bukan {normalize_model_name(model_name)} ({registry.precision})."
+            )
+    if pdf_path is not None and manifest["pdf_sha256"] != file_sha256(pdf_path):
+        raise ValueError(f"Artefak {manifest['version']} sudah usang terhadap {pdf_path}.")
+
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+    with open(os.path.join(path, METADATA_FILE), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    entries = [dict(zip(metadata["fields"], row)) for row in metadata["rows"]]
+    if embeddings.shape[0] != len(entries):
+        raise ValueError("Jumlah baris embedding dan metadata artefak tidak sama.")
+    return entries, embeddings, manifest
+
+
+class ArtifactWatcher:
+    def __init__(self, artifact_dir):
+        """
+        Membuka artefak aktif dan mendeteksi penggantiannya (mis. oleh ``kb_artifact.py build`` atau
+        worker lain) dengan satu stat file CURRENT, sehingga bisa diperiksa di setiap request.
+        """
+        self.artifact_dir = artifact_dir
+        self.version = None
+        self._mtime_ns = None
+        self._lock = threading.Lock()
+
+    def _current_mtime_ns(self):
+        try:
+            return os.stat(os.path.join(self.artifact_dir, CURRENT_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self, model_name=None, pdf_path=None):
+        """
+        Membuka artefak aktif seperti load_artifact dan mencatat versinya.
+        """
+        mtime_ns = self._current_mtime_ns()
+        entries, embeddings, manifest = load_artifact(self.artifact_dir, model_name, pdf_path)
+        with self._lock:
+            self.version = manifest["version"]
+            self._mtime_ns = mtime_ns
+        return entries, embeddings, manifest
+
+    def changed(self):
+        """
+        True (sekali per penggantian) jika file CURRENT kini menunjuk versi lain dari yang terakhir dibuka.
+        """
+        mtime_ns = self._current_mtime_ns()
+        with self._lock:
+            if mtime_ns == self._mtime_ns:
+                return False
+            self._mtime_ns = mtime_ns
+            path = current_artifact_path(self.artifact_dir)
+            return path is not None and os.path.basename(path) != self.version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Membangun atau memeriksa artefak knowledge base.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Ekstrak PDF, encode gejala, tulis artefak baru")
+    build.add_argument("--pdf", required=True)
+    build.add_argument("--out", required=True, help="Direktori artefak")
+    build.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    build.add_argument("--batch-size", type=int, default=64)
+    build.add_argument("--keep-versions", type=int, default=2)
+
+    info = subparsers.add_parser("info", help="Menampilkan manifest artefak aktif")
+    info.add_argument("--out", required=True, help="Direktori artefak")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        manifest = build_artifact(args.pdf, args.out, args.model, args.batch_size, args.keep_versions)
+    else:
+        _, _, manifest = load_artifact(args.out)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import math
+import re
+import numpy as np
+
+# Kata fungsi bahasa Indonesia yang tidak membedakan gejala satu dengan lainnya.
+# "tidak" sengaja dipertahankan karena mengubah makna gejala ("AC tidak dingin").
+STOPWORDS = frozenset("""
+    yang dan di ke dari pada untuk atau ini itu dengan saat ketika apa apakah adalah karena bisa dapat
+    akan juga sudah telah sering saya kami kamu anda ada kenapa mengapa bagaimana jika kalau agar
+    oleh sebagai dalam seperti lebih sangat the a of
+""".split())
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Memecah teks menjadi token huruf kecil tanpa tanda baca dan kata fungsi.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Menggabungkan beberapa daftar peringkat id dengan reciprocal-rank fusion: skor(id) = jumlah 1 / (k + peringkat).
+
+    :param rankings: List daftar id, masing-masing terurut dari yang paling relevan
+    :return: List (id, skor) terurut dari skor tertinggi
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    def __init__(self, ids, texts, k1=1.5, b=0.75):
+        """
+        Inverted index BM25 di memori untuk pencocokan istilah persis (mis. "aki", "busi", "alternator").
+
+        Setiap istilah menyimpan posting list berupa array NumPy (baris dokumen, frekuensi), sehingga
+        skor sebuah query hanya menyentuh dokumen yang memuat istilah query tersebut.
+
+        :param ids: Id dokumen (mis. id entri FAISS atau nomor halaman), sejajar dengan ``texts``
+        :param texts: Teks dokumen
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._rows_by_id = {int(doc_id): row for row, doc_id in enumerate(self.ids)}
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(row)
+                postings[token][1].append(count)
+
+        self.doc_lengths = lengths
+        self.avg_doc_length = float(lengths.mean()) if len(lengths) else 0.0
+        self.postings = {
+            token: (np.asarray(rows, dtype=np.int32), np.asarray(freqs, dtype=np.float32))
+            for token, (rows, freqs) in postings.items()
+        }
+        num_docs = len(texts)
+        self.idf = {
+            token: math.log(1.0 + (num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            for token, (rows, _) in self.postings.items()
+        }
+        # Istilah yang tidak dikenal diberi idf maksimum (seolah muncul di 0 dokumen)
+        self.max_idf = math.log(1.0 + (num_docs + 0.5) / 0.5) if num_docs else 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def score(self, query):
+        """
+        Menghitung skor BM25 query terhadap seluruh dokumen.
+
+        :return: Array skor per baris dokumen (sejajar dengan ``ids``)
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if not len(self.ids):
+            return scores
+        for term in dict.fromkeys(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, freqs = posting
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[rows] / max(self.avg_doc_length, 1e-6))
+            scores[rows] += self.idf[term] * freqs * (self.k1 + 1.0) / (freqs + norm)
+        return scores
+
+    def search(self, query, top_k=64):
+        """
+        Mengambil dokumen dengan skor BM25 tertinggi (hanya yang memuat minimal satu istilah query).
+
+        :return: Tuple (array id dokumen, array skor BM25) terurut dari skor tertinggi
+        """
+        scores = self.score(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return self.ids[matched], scores[matched]
+
+    def coverage(self, query, ids):
+        """
+        Proporsi bobot idf istilah query yang muncul di setiap dokumen (0..1).
+        Dipakai sebagai ambang relevansi leksikal yang tidak bergantung pada panjang query.
+
+        :return: Dict id dokumen -> cakupan
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        total = sum(self.idf.get(term, self.max_idf) for term in terms)
+        ids = [int(doc_id) for doc_id in ids if int(doc_id) in self._rows_by_id]
+        rows = np.asarray([self._rows_by_id[doc_id] for doc_id in ids], dtype=np.int32)
+        covered = np.zeros(len(rows), dtype=np.float32)
+        if total:
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    covered += self.idf[term] * np.isin(rows, posting[0])
+            covered /= total
+        return dict(zip(ids, covered.tolist()))
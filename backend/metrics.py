@@ -0,0 +1,211 @@
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from embedding_batcher import Histogram
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Awalan nama metrik Prometheus
+METRIC_PREFIX = "sistem_pakar"
+
+# Batas bucket latensi (detik), dari operasi numpy sampai generasi T5 beam search
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Keterangan (HELP) dan tipe setiap metrik yang diekspor di /metrics
+METRICS_HELP = {
+    "stage_latency_seconds": ("histogram", "Latensi per tahap kaskade (query_encode, kb_scan, rag_retrieve, "
+                                           "faiss_search, metadata_load, tokenize, encode, generate, decode)"),
+    "request_latency_seconds": ("histogram", "Latensi total pekerjaan inferensi per endpoint"),
+    "cascade_answers_total": ("counter", "Jumlah jawaban per cabang kaskade yang menjawab"),
+    "cascade_stage_decisions_total": ("counter", "Keputusan planner kaskade per tahap (answered, low_confidence, "
+                                                 "no_result, skipped_budget, not_ready, error)"),
+    "model_parameter_bytes": ("gauge", "Ukuran parameter dan buffer model yang dimuat"),
+    "model_load_seconds": ("gauge", "Waktu muat model"),
+    "process_resident_memory_bytes": ("gauge", "Resident set size proses"),
+    "knowledge_base_entries": ("gauge", "Jumlah entri knowledge base per sumber"),
+    "knowledge_base_embedding_bytes": ("gauge", "Ukuran matriks embedding knowledge base per sumber"),
+    "faiss_index_vectors": ("gauge", "Jumlah vektor di indeks FAISS"),
+    "faiss_index_file_bytes": ("gauge", "Ukuran file indeks FAISS di disk"),
+    "inference_pool_requests": ("gauge", "Pekerjaan di pool inferensi per status"),
+    "component_ready": ("gauge", "Kesiapan komponen backend setelah warmup (1 = siap)"),
+    "component_load_seconds": ("gauge", "Waktu muat komponen backend saat warmup"),
+    "decoding_latency_seconds": ("histogram", "Latensi generate per kebijakan decoding (greedy, assisted, beam)"),
+    "decoding_confidence": ("histogram", "Confidence jawaban (rata-rata geometris probabilitas token) per kebijakan decoding"),
+    "decoding_escalations_total": ("counter", "Jawaban greedy yang dijalankan ulang dengan beam search per alasan"),
+}
+
+_local = threading.local()
+
+
+def current_trace():
+    """
+    Mengembalikan trace request yang aktif di thread ini, atau None.
+    """
+    return getattr(_local, "trace", None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Trace:
+    def __init__(self, name):
+        """
+        Rekaman span satu request: nama tahap dan durasinya, sesuai urutan terjadinya.
+        """
+        self.name = name
+        self.spans = []
+        self.start = time.perf_counter()
+
+    def add(self, stage, seconds):
+        self.spans.append((stage, seconds))
+
+    def summary(self):
+        """
+        Ringkasan satu baris, mis. "query_encode=2.1ms kb_scan=0.1ms total=15.3ms".
+        """
+        parts = [f"{stage}={seconds * 1000.0:.1f}ms" for stage, seconds in self.spans]
+        parts.append(f"total={(time.perf_counter() - self.start) * 1000.0:.1f}ms")
+        return " ".join(parts)
+
+
+class MetricsRegistry:
+    def __init__(self, latency_buckets=LATENCY_BUCKETS):
+        """
+        Penampung metrik proses: histogram latensi, counter dan gauge (dibaca saat scrape),
+        yang dirender dalam format teks Prometheus.
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self._histograms = {}  # (nama, label) -> Histogram
+        self._counters = {}  # (nama, label) -> nilai
+        self._gauges = {}  # nama -> fungsi yang mengembalikan angka atau list (dict label, nilai)
+        self._lock = threading.Lock()
+
+    def histogram(self, name, buckets=None, **labels):
+        """
+        Mengambil (atau membuat) histogram untuk nama dan label tertentu.
+
+        :param buckets: Batas bucket untuk histogram bukan latensi; default bucket latensi
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets or self.latency_buckets)
+            return histogram
+
+    def observe(self, name, value, buckets=None, **labels):
+        self.histogram(name, buckets, **labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name, fn):
+        """
+        Mendaftarkan gauge yang nilainya dihitung ``fn`` setiap kali /metrics dibaca.
+        ``fn`` mengembalikan angka, atau list (dict label, nilai) untuk gauge berlabel.
+        """
+        with self._lock:
+            self._gauges[name] = fn
+
+    @contextmanager
+    def span(self, stage):
+        """
+        Mengukur satu tahap: durasinya masuk histogram stage_latency_seconds dan trace request aktif.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_latency_seconds", elapsed, stage=stage)
+            trace = current_trace()
+            if trace is not None:
+                trace.add(stage, elapsed)
+
+    @contextmanager
+    def trace(self, name):
+        """
+        Mengumpulkan span satu request di thread ini; ringkasannya dicatat ke log di akhir request
+        dan latensi totalnya masuk histogram request_latency_seconds.
+        """
+        previous = current_trace()
+        trace = _local.trace = Trace(name)
+        try:
+            yield trace
+        finally:
+            _local.trace = previous
+            self.observe("request_latency_seconds", time.perf_counter() - trace.start, endpoint=name)
+            logger.info(f"Trace {name}: {trace.summary()}")
+
+    def stage_summary(self):
+        """
+        Ringkasan histogram latensi per tahap untuk /debug.
+        """
+        with self._lock:
+            histograms = [(labels, histogram) for (name, labels), histogram in self._histograms.items()
+                          if name == "stage_latency_seconds"]
+        return {dict(labels)["stage"]: histogram.snapshot() for labels, histogram in histograms}
+
+    def _gauge_samples(self, fn):
+        value = fn()
+        if isinstance(value, (list, tuple)):
+            return [(tuple(sorted(labels.items())), sample) for labels, sample in value if sample is not None]
+        return [((), value)] if value is not None else []
+
+    def render_prometheus(self):
+        """
+        Merender seluruh metrik dalam format teks eksposisi Prometheus (versi 0.0.4).
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        samples = {}  # nama -> list baris sampel
+        for (name, labels), histogram in histograms:
+            snapshot = histogram.snapshot()
+            lines = samples.setdefault(name, [])
+            for bound, cumulative in zip(list(histogram.buckets) + [float("inf")], snapshot["buckets"].values()):
+                bucket_labels = _format_labels(labels + (("le", _format_value(float(bound))),))
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{_format_labels(labels)} {snapshot['count']}")
+        for (name, labels), value in counters:
+            samples.setdefault(name, []).append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, fn in gauges:
+            try:
+                gauge_samples = self._gauge_samples(fn)
+            except Exception as e:
+                logger.error(f"Error membaca gauge {name}: {e}")
+                continue
+            samples.setdefault(name, []).extend(
+                f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in gauge_samples
+            )
+
+        output = []
+        for name, lines in samples.items():
+            metric_type, help_text = METRICS_HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            output.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+# Registry metrik tunggal untuk seluruh proses
+metrics = MetricsRegistry()
@@ -0,0 +1,241 @@
+from sentence_transformers import CrossEncoder, SentenceTransformer
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import logging
+import os
+import threading
+import time
+import torch
+
+try:
+    import psutil
+except ImportError:  # psutil opsional, fallback ke modul resource
+    psutil = None
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Nama model bawaan yang dipakai bersama oleh seluruh komponen
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+GENERATION_MODEL_NAME = "google/flan-t5-small"
+# Cross-encoder multibahasa kecil (query Indonesia) untuk tahap reranking opsional
+RERANKER_MODEL_NAME = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+# Presisi model: "fp32" (bawaan) atau "int8" (kuantisasi dinamis untuk inferensi CPU)
+SUPPORTED_PRECISIONS = ("fp32", "int8")
+
+
+def get_device():
+    """
+    Mendapatkan perangkat yang tersedia (GPU atau CPU).
+    """
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def get_rss_bytes():
+    """
+    Mengembalikan resident set size proses saat ini dalam byte (None jika tidak tersedia).
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+        # ru_maxrss dalam KiB di Linux; ini nilai puncak, cukup sebagai perkiraan
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def configure_torch_threads(num_threads=None, interop_threads=None):
+    """
+    Mengatur jumlah thread intra-op dan inter-op PyTorch, dari argumen atau env
+    TORCH_NUM_THREADS / TORCH_INTEROP_THREADS. Nilai kosong membiarkan bawaan PyTorch.
+    """
+    num_threads = num_threads or os.environ.get("TORCH_NUM_THREADS")
+    interop_threads = interop_threads or os.environ.get("TORCH_INTEROP_THREADS")
+    if num_threads:
+        torch.set_num_threads(int(num_threads))
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(int(interop_threads))
+        except RuntimeError as e:
+            # Hanya bisa diatur sebelum pekerjaan paralel pertama dijalankan
+            logger.warning(f"Thread inter-op PyTorch tidak dapat diubah: {e}")
+    return {"num_threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()}
+
+
+def quantize_dynamic_int8(model):
+    """
+    Mengkuantisasi seluruh lapisan Linear model ke int8 secara dinamis (bobot int8,
+    aktivasi dikuantisasi per batch). Hanya untuk inferensi di CPU.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def normalize_model_name(model_name):
+    """
+    Menyamakan nama pendek SentenceTransformer (mis. 'all-MiniLM-L6-v2') dengan nama lengkapnya,
+    agar model yang sama tidak dimuat dua kali dengan kunci berbeda.
+    """
+    if model_name == EMBEDDING_MODEL_NAME.split("/", 1)[1]:
+        return EMBEDDING_MODEL_NAME
+    return model_name
+
+
+class ModelRegistry:
+    def __init__(self, precision=None):
+        """
+        Registry model tingkat proses: setiap tokenizer dan model dimuat secara lazy
+        tepat satu kali lalu dipakai bersama oleh RagPipeline, QAModel, FAISSIndexManager
+        dan endpoint Flask.
+
+        :param precision: Presisi bawaan model ("fp32" atau "int8"); default dari env MODEL_PRECISION
+        """
+        precision = (precision or os.environ.get("MODEL_PRECISION", "fp32")).lower()
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Presisi model tidak didukung: {precision}. Pilihan: {SUPPORTED_PRECISIONS}")
+        self.precision = precision
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def _get_or_load(self, key, loader):
+        """
+        Mengambil model dari registry atau memuatnya sekali sambil mencatat waktu muat dan RSS.
+        """
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+
+            rss_before = get_rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            rss_after = get_rss_bytes()
+
+            self._models[key] = model
+            self._stats[key] = {
+                "kind": key[0],
+                "name": key[1],
+                "precision": key[3] if len(key) > 3 else None,
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                "parameter_bytes": self._parameter_bytes(model),
+            }
+            logger.info(f"Model {key[1]} ({key[0]}) dimuat dalam {load_seconds:.2f} detik.")
+            return model
+
+    @staticmethod
+    def _parameter_bytes(model):
+        """
+        Menghitung ukuran bobot model dalam byte (None untuk tokenizer).
+
+        Dihitung dari state_dict agar bobot int8 terkuantisasi (packed params, bukan
+        parameter biasa) ikut terhitung.
+        """
+        if not isinstance(model, torch.nn.Module):
+            return None
+
+        def tensor_bytes(value):
+            if isinstance(value, torch.Tensor):
+                return value.numel() * value.element_size()
+            if isinstance(value, (tuple, list)):
+                return sum(tensor_bytes(item) for item in value)
+            return 0
+
+        return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+    def resolve_precision(self, precision, device):
+        """
+        Menentukan presisi efektif; kuantisasi int8 dinamis hanya berjalan di CPU.
+        """
+        precision = (precision or self.precision).lower()
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Presisi model tidak didukung: {precision}. Pilihan: {SUPPORTED_PRECISIONS}")
+        if precision == "int8" and device != "cpu":
+            logger.warning(f"Kuantisasi int8 hanya untuk CPU, model di {device} tetap fp32.")
+            return "fp32"
+        return precision
+
+    def get_sentence_transformer(self, model_name=EMBEDDING_MODEL_NAME, device=None, precision=None):
+        """
+        Mengambil model SentenceTransformer bersama, dikuantisasi int8 bila presisinya "int8".
+        """
+        model_name = normalize_model_name(model_name)
+        device = device if device else get_device()
+        precision = self.resolve_precision(precision, device)
+
+        def load():
+            model = SentenceTransformer(model_name, device=device)
+            if precision == "int8":
+                quantize_dynamic_int8(model[0].auto_model)
+            return model
+
+        return self._get_or_load(("sentence_transformer", model_name, device, precision), load)
+
+    def get_encoder(self, model_name=EMBEDDING_MODEL_NAME, device=None, precision=None):
+        """
+        Mengambil tokenizer dan model transformer dasar (AutoModel) dari SentenceTransformer bersama,
+        sehingga pemakai HF mentah seperti FAISSIndexManager tidak memuat bobot yang sama lagi.
+
+        :return: Tuple (tokenizer, model)
+        """
+        sentence_transformer = self.get_sentence_transformer(model_name, device, precision)
+        return sentence_transformer.tokenizer, sentence_transformer[0].auto_model
+
+    def get_cross_encoder(self, model_name=RERANKER_MODEL_NAME, device=None, precision=None):
+        """
+        Mengambil model CrossEncoder (reranker) bersama, dikuantisasi int8 bila presisinya "int8".
+        """
+        device = device if device else get_device()
+        precision = self.resolve_precision(precision, device)
+
+        def load():
+            model = CrossEncoder(model_name, num_labels=1, device=device)
+            if precision == "int8":
+                quantize_dynamic_int8(model.model)
+            return model
+
+        return self._get_or_load(("cross_encoder", model_name, device, precision), load)
+
+    def get_tokenizer(self, model_name=GENERATION_MODEL_NAME):
+        """
+        Mengambil tokenizer bersama.
+        """
+        return self._get_or_load(
+            ("tokenizer", model_name),
+            lambda: AutoTokenizer.from_pretrained(model_name),
+        )
+
+    def get_seq2seq_model(self, model_name=GENERATION_MODEL_NAME, device=None, precision=None):
+        """
+        Mengambil model generasi seq2seq (T5) bersama dalam mode evaluasi,
+        dikuantisasi int8 bila presisinya "int8".
+        """
+        device = device if device else get_device()
+        precision = self.resolve_precision(precision, device)
+
+        def load():
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(device).eval()
+            if precision == "int8":
+                quantize_dynamic_int8(model)
+            return model
+
+        return self._get_or_load(("seq2seq", model_name, device, precision), load)
+
+    def report(self):
+        """
+        Melaporkan model yang sudah dimuat beserta waktu muat dan memori residen.
+        """
+        with self._lock:
+            models = [dict(stats) for stats in self._stats.values()]
+        return {
+            "precision": self.precision,
+            "torch_threads": {"num_threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()},
+            "models": models,
+            "process_rss_bytes": get_rss_bytes(),
+        }
+
+
+# Registry tunggal untuk seluruh proses
+registry = ModelRegistry()
@@ -1,59 +1,178 @@
-import pdfplumber
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import logging
+import multiprocessing
+import os
 import re
+import pdfplumber
 
-def extract_text_from_pdf(pdf_path):
-    """
-    Fungsi untuk mengekstrak teks dari file PDF dan membersihkan karakter yang tidak diinginkan.
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
-    :param pdf_path: Path file PDF
-    :return: List of dictionaries dengan struktur {'page': nomor_halaman, 'content': teks_halaman}
+# Versi ekstraksi; ikut dalam kunci cache embedding agar cache lama tidak dipakai bila hasil ekstraksi berubah
+EXTRACTION_VERSION = "pdfplumber-1"
+
+# Pemisah solusi opsional di dalam baris "gejala: penyebab Solusi: ..."
+SOLUSI_PATTERN = re.compile(r'\s*\bsolusi\s*:\s*', re.IGNORECASE)
+
+
+def _extract_page_range(pdf_path, start, end):
     """
-    extracted_pages = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
-            # Ekstrak teks dari halaman
+    Mengekstrak teks halaman [start, end) dari PDF. Dijalankan di proses worker,
+    sehingga setiap worker membuka PDF sendiri dan hanya menyimpan halamannya.
+    """
+    pages = []
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            page_num = page.page_number
             page_text = page.extract_text()
-            
+            page.close()  # Membuang cache objek halaman agar memori tetap datar
+
             if page_text:  # Jika halaman mengandung teks
-                # Membersihkan teks dari karakter yang tidak perlu
-                cleaned_text = re.sub(r'\s+', ' ', page_text).strip()
-                # Menambahkan teks halaman ke dalam daftar
-                extracted_pages.append({
+                pages.append({
                     "page": page_num,
-                    "content": cleaned_text
+                    "text": page_text,
+                    # Teks tanpa spasi/baris berlebih untuk retrieval per halaman
+                    "content": re.sub(r'\s+', ' ', page_text).strip()
                 })
+    return pages
+
+
+def count_pages(pdf_path):
+    """
+    Menghitung jumlah halaman PDF.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def get_extraction_workers(workers=None):
+    """
+    Menentukan jumlah proses worker ekstraksi (argumen, env PDF_EXTRACTION_WORKERS, atau jumlah CPU maks. 4).
+    """
+    if workers is None:
+        workers = os.environ.get("PDF_EXTRACTION_WORKERS") or min(4, os.cpu_count() or 1)
+    return max(1, int(workers))
+
+
+def iter_pages(pdf_path, workers=None, pages_per_task=8, max_in_flight=None):
+    """
+    Menghasilkan halaman PDF secara berurutan sebagai generator, diekstrak paralel di process pool.
+
+    Paling banyak ``max_in_flight`` potongan halaman (bawaan 2 x jumlah worker) dikerjakan atau
+    menunggu diambil sekaligus, sehingga memori puncak tidak bergantung pada tebal PDF dan
+    pemakai (mis. embedder) sudah bisa bekerja saat halaman berikutnya masih diekstrak.
+
+    :param pdf_path: Path file PDF
+    :return: Generator dict {'page': nomor_halaman, 'text': teks_mentah, 'content': teks_bersih}
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"File PDF tidak ditemukan: {pdf_path}")
+
+    num_pages = count_pages(pdf_path)
+    ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+    workers = get_extraction_workers(workers)
+
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield from _extract_page_range(pdf_path, start, end)
+        return
+
+    # Bukan fork: pemanggil (Flask/gunicorn) sudah menjalankan thread micro-batcher, pool inferensi dan
+    # PyTorch, dan fork proses multithread bisa deadlock pada lock yang sedang dipegang thread itu.
+    # Forkserver mem-fork worker dari proses server bersih yang hanya mengimpor ulang modul __main__
+    # sekali (sistem_pakar_backend melewati warmup model bila diimpor sebagai __mp_main__).
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    max_in_flight = max_in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+        pending = deque()
+        remaining = iter(ranges)
+        for start, end in itertools.islice(remaining, max_in_flight):
+            pending.append(executor.submit(_extract_page_range, pdf_path, start, end))
+
+        try:
+            while pending:
+                pages = pending.popleft().result()
+                # Slot yang kosong langsung diisi potongan berikutnya sebelum hasil ini diproses
+                for start, end in itertools.islice(remaining, 1):
+                    pending.append(executor.submit(_extract_page_range, pdf_path, start, end))
+                yield from pages
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def parse_page_entries(text, page=None):
+    """
+    Mengurai baris berformat "gejala: penyebab" (opsional diikuti "Solusi: ...") dari teks satu halaman.
+
+    :return: List dict {'gejala', 'penyebab', 'solusi', 'page'}
+    """
+    entries = []
+    for line in text.split("\n"):
+        if ":" not in line:  # Deteksi gejala dan penyebab berdasarkan pemisah ':'
+            continue
+        gejala, penyebab = line.split(":", 1)
+        parts = SOLUSI_PATTERN.split(penyebab, maxsplit=1)
+        penyebab, solusi = parts[0], parts[1] if len(parts) > 1 else ""
+        gejala, penyebab, solusi = gejala.strip(), penyebab.strip(), solusi.strip()
+        if gejala and penyebab and ":" not in penyebab:
+            entries.append({"gejala": gejala, "penyebab": penyebab, "solusi": solusi, "page": page})
+    return entries
+
+
+def iter_entries(pages):
+    """
+    Menghasilkan entri knowledge base dari aliran halaman (generator).
+    """
+    for page in pages:
+        yield from parse_page_entries(page.get("text", page["content"]), page.get("page"))
+
+
+def iter_batches(items, batch_size):
+    """
+    Mengelompokkan aliran item menjadi list berukuran tetap (batch terakhir boleh lebih kecil).
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_knowledge_base(pdf_path, workers=None):
+    """
+    Pipeline lengkap: halaman diekstrak paralel lalu diurai menjadi entri knowledge base (generator).
+    """
+    return iter_entries(iter_pages(pdf_path, workers=workers))
+
+
+def extract_text_from_pdf(pdf_path):
+    """
+    Fungsi untuk mengekstrak teks dari file PDF dan membersihkan karakter yang tidak diinginkan.
+
+    :param pdf_path: Path file PDF
+    :return: List of dictionaries dengan struktur {'page': nomor_halaman, 'text': teks_mentah, 'content': teks_halaman}
+    """
+    return list(iter_pages(pdf_path))
 
-    return extracted_pages
 
 def parse_extracted_text_to_knowledge_base(extracted_pages):
     """
     Memproses teks yang diekstrak dari PDF menjadi format yang dapat digunakan untuk basis pengetahuan.
 
-    :param extracted_pages: List of dictionaries dengan struktur {'page': nomor_halaman, 'content': teks_halaman}
-    :return: List of dictionaries dengan struktur basis pengetahuan {'gejala': teks, 'penyebab': teks}
-    """
-    knowledge_base = []
-    for page in extracted_pages:
-        # Split teks berdasarkan pola khusus, sesuaikan pola ini dengan struktur PDF
-        lines = page["content"].split('. ')
-        for line in lines:
-            if ":" in line:  # Deteksi gejala dan penyebab berdasarkan pemisah ':'
-                try:
-                    gejala, penyebab = line.split(":", 1)
-                    knowledge_base.append({
-                        "gejala": gejala.strip(),
-                        "penyebab": penyebab.strip()
-                    })
-                except ValueError:
-                    # Jika format tidak sesuai, lewati
-                    continue
-    return knowledge_base
+    :param extracted_pages: List of dictionaries dari extract_text_from_pdf
+    :return: List of dictionaries dengan struktur basis pengetahuan {'gejala', 'penyebab', 'solusi', 'page'}
+    """
+    return list(iter_entries(extracted_pages))
+
 
 # Contoh penggunaan
 if __name__ == "__main__":
     pdf_path = "path/to/your/pdf_file.pdf"  # Ganti dengan path file PDF
-    extracted_pages = extract_text_from_pdf(pdf_path)
-    knowledge_base = parse_extracted_text_to_knowledge_base(extracted_pages)
-    
-    # Menampilkan hasil
-    print(knowledge_base)
+    for batch in iter_batches(iter_knowledge_base(pdf_path), 32):
+        # Menampilkan hasil per batch
+        print(batch)
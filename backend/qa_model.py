@@ -1,35 +1,51 @@
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-from sentence_transformers import SentenceTransformer
-import json
-import torch
 import logging
-from rag_pipeline import RagPipeline  # Integrasi RAG pipeline
 from faiss_index import FAISSIndexManager  # Import FAISS index manager
+from model_registry import registry, get_device, EMBEDDING_MODEL_NAME  # Registry model bersama
+from generation import AnswerGenerator, GenerationError, GENERATION_ERROR_ANSWER
+from reranker import Reranker  # Reranking cross-encoder opsional
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class QAModel:
-    def __init__(self, generation_model_name, pdf_path, faiss_index_path, retrieval_model_name="sentence-transformers/all-MiniLM-L6-v2", similarity_threshold=0.5):
+    def __init__(self, generation_model_name, pdf_path, faiss_index_path, retrieval_model_name=EMBEDDING_MODEL_NAME, similarity_threshold=0.5,
+                 query_batch_max_size=32, query_batch_max_wait_ms=5.0, faiss_index_options=None, reranker_options=None,
+                 encoder_cache=None, decoding_policy=None):
         """
         Inisialisasi model QA dengan model pre-trained dan knowledge base.
+
+        :param reranker_options: Argumen Reranker (mis. model_name, top_n, latency_budget_ms, margin);
+                                 None menonaktifkan tahap reranking
+        :param encoder_cache: EncoderCache opsional untuk memakai ulang encoding penyebab yang sering terambil
+        :param decoding_policy: DecodingPolicy generator jawaban; None memakai greedy adaptif default
         """
         try:
-            # Memuat model generasi jawaban dan tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(generation_model_name)
-            self.generation_model = AutoModelForSeq2SeqLM.from_pretrained(generation_model_name).to(self.get_device())
+            # Memuat model generasi jawaban dan tokenizer (dipakai bersama lewat registry)
+            self.tokenizer = registry.get_tokenizer(generation_model_name)
+            self.generation_model = registry.get_seq2seq_model(generation_model_name, self.get_device())
+            self.generator = AnswerGenerator(
+                self.tokenizer, self.generation_model, encoder_cache=encoder_cache, decoding_policy=decoding_policy
+            )
 
             # Memuat model retrieval berbasis dense (SentenceTransformer)
-            self.retrieval_model = SentenceTransformer(retrieval_model_name)
+            self.retrieval_model = registry.get_sentence_transformer(retrieval_model_name)
 
             # Inisialisasi FAISS Index Manager
-            self.faiss_index_manager = FAISSIndexManager(index_path=faiss_index_path, knowledge_base_path=pdf_path)
+            self.faiss_index_manager = FAISSIndexManager(
+                index_path=faiss_index_path, knowledge_base_path=pdf_path, model_name=retrieval_model_name,
+                embedding_dim=self.retrieval_model.get_sentence_embedding_dimension(),
+                query_batch_max_size=query_batch_max_size, query_batch_max_wait_ms=query_batch_max_wait_ms,
+                similarity_threshold=similarity_threshold, **(faiss_index_options or {})
+            )
             self.faiss_index_manager.load_or_create_index()
 
             # Threshold untuk kesamaan cosine
             self.similarity_threshold = similarity_threshold
 
+            # Tahap reranking opsional atas top-N kandidat FAISS
+            self.reranker = Reranker(**reranker_options) if reranker_options is not None else None
+
             logger.info("Model QA, pipeline RAG, FAISS index, dan knowledge base berhasil diinisialisasi.")
         except Exception as e:
             logger.error(f"Kesalahan saat inisialisasi: {e}")
@@ -40,59 +56,116 @@ class QAModel:
         """
         Mendapatkan perangkat yang tersedia (GPU atau CPU).
         """
-        return "cuda" if torch.cuda.is_available() else "cpu"
+        return get_device()
 
-    def retrieve_relevant_info(self, query):
+    def retrieve_relevant_info(self, query, query_embedding=None):
         """
         Mengambil informasi relevan dari knowledge base menggunakan FAISS index.
+
+        Jika reranker aktif, top-N kandidat dinilai ulang oleh cross-encoder sebelum hasil terbaik dipilih.
+
+        :return: Penyebab dari hasil terbaik, atau None jika tidak ada hasil di atas similarity_threshold
+        """
+        return self.retrieve_scored_info(query, query_embedding)[0]
+
+    def retrieve_scored_info(self, query, query_embedding=None):
+        """
+        Seperti retrieve_relevant_info, ditambah skor hasil terbaik (skor FAISS, atau skor
+        cross-encoder bila reranker aktif).
+
+        :param query_embedding: Embedding query dari model retrieval yang sama (opsional), agar tidak di-encode ulang
+        :return: Tuple (penyebab, skor), atau (None, None) jika tidak ada hasil
         """
         try:
             logger.info("Mencari informasi relevan menggunakan FAISS index...")
-            faiss_results, _ = self.faiss_index_manager.search_index(query)
+            top_k = self.reranker.top_n if self.reranker is not None else 5
+            faiss_results, scores = self.faiss_index_manager.search_index(
+                query, top_k=top_k, query_embedding=query_embedding
+            )
+            if faiss_results and self.reranker is not None:
+                faiss_results, scores, info = self.reranker.rerank(query, faiss_results, scores)
+                logger.info(f"Reranking: {info}")
             if faiss_results:
                 logger.info("Informasi relevan ditemukan di FAISS index.")
-                return faiss_results[0]["penyebab"]
+                return faiss_results[0]["penyebab"], float(scores[0])
             else:
                 logger.warning("Tidak ada informasi relevan ditemukan di FAISS index.")
-                return "Tidak ada informasi relevan ditemukan."
+                return None, None
         except Exception as e:
             logger.error(f"Kesalahan saat mengambil informasi relevan: {e}")
-            return "Tidak ada informasi relevan ditemukan."
+            return None, None
 
     def generate_answer(self, question, context):
         """
         Menghasilkan jawaban menggunakan model generasi berdasarkan konteks yang diperoleh.
+
+        :return: Jawaban, atau None jika generasi gagal
         """
         try:
-            input_text = f"question: {question} context: {context}"
-            inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True).to(self.get_device())
-
             # Menghasilkan jawaban dengan model generasi
-            outputs = self.generation_model.generate(**inputs, max_length=150, num_beams=2, early_stopping=True)
-            answer = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            answer = self.generator.generate_answers([question], [context])[0]
 
             logger.info("Jawaban berhasil dihasilkan.")
             return answer
         except Exception as e:
             logger.error(f"Kesalahan saat menghasilkan jawaban: {e}")
-            return "Terjadi kesalahan saat menghasilkan jawaban."
+            return None
 
-    def answer_question(self, question):
+    def generate_answers(self, questions, contexts, batch_size=16):
         """
-        Menjawab pertanyaan dengan mengambil konteks relevan dan menggunakan model QA.
+        Menghasilkan jawaban untuk banyak pasangan pertanyaan/konteks dalam batch ber-padding.
         """
         try:
-            # Mengambil informasi relevan
-            relevant_info = self.retrieve_relevant_info(question)
-
-            # Menghasilkan jawaban
-            answer = self.generate_answer(question, relevant_info)
+            answers = self.generator.generate_answers(questions, contexts, batch_size=batch_size)
+            logger.info(f"{len(answers)} jawaban berhasil dihasilkan.")
+            return answers
+        except Exception as e:
+            logger.error(f"Kesalahan saat menghasilkan jawaban batch: {e}")
+            return [GENERATION_ERROR_ANSWER] * len(questions)
 
-            return answer
+    def answer_question(self, question, query_embedding=None):
+        """
+        Menjawab pertanyaan dengan mengambil konteks relevan dan menggunakan model QA.
+        """
+        try:
+            answer, _ = self.answer_with_score(question, query_embedding)
+            # Tidak ada konteks yang cukup mirip: generasi T5 yang mahal sudah dilewati
+            return answer if answer is not None else "Tidak ada informasi relevan ditemukan."
+        except GenerationError:
+            return GENERATION_ERROR_ANSWER
         except Exception as e:
             logger.error(f"Kesalahan saat menjawab pertanyaan: {e}")
             return "Terjadi kesalahan dalam menjawab pertanyaan."
 
+    def answer_with_score(self, question, query_embedding=None):
+        """
+        Menjawab pertanyaan dan mengembalikan skor retrieval konteks yang dipakai.
+
+        :return: Tuple (jawaban, skor), atau (None, None) tanpa generasi jika tidak ada konteks relevan
+        :raises GenerationError: jika generasi gagal
+        """
+        # Mengambil informasi relevan
+        relevant_info, score = self.retrieve_scored_info(question, query_embedding)
+        if relevant_info is None:
+            return None, None
+
+        # Menghasilkan jawaban
+        answer = self.generate_answer(question, relevant_info)
+        if answer is None:
+            raise GenerationError("Generasi jawaban QA model gagal.")
+        return answer, score
+
+    def stream_answer(self, question):
+        """
+        Menjawab pertanyaan secara streaming; potongan teks di-yield begitu dihasilkan model.
+        """
+        relevant_info = self.retrieve_relevant_info(question)
+        if relevant_info is None:
+            # Tidak ada konteks yang cukup mirip: lewati generasi T5 yang mahal
+            yield "Tidak ada informasi relevan ditemukan."
+            return
+        yield from self.generator.stream_answer(question, relevant_info)
+
 # Penggunaan contoh
 if __name__ == "__main__":
     model = QAModel(
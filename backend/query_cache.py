@@ -0,0 +1,265 @@
+from collections import OrderedDict
+import json
+import logging
+import re
+import threading
+import time
+import numpy as np
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """
+    Menormalkan query untuk kunci cache: huruf kecil, tanpa tanda baca, spasi tunggal.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class QueryCache:
+    def __init__(self, max_entries=1024, ttl_seconds=3600, max_bytes=4 * 1024 * 1024):
+        """
+        Cache jawaban berdasarkan query yang dinormalkan, dengan eviksi LRU, TTL dan batas memori.
+
+        Cache dikosongkan otomatis ketika versi knowledge base/indeks yang diberikan berubah.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # kunci -> (nilai, waktu_kedaluwarsa, ukuran_byte)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _estimate_size(key, value):
+        """
+        Perkiraan ukuran entri dalam byte (kunci + nilai yang diserialisasi ke JSON).
+        """
+        return len(key.encode("utf-8")) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _check_version(self, version):
+        """
+        Mengosongkan cache jika versi sumber data berubah. Pemanggil harus memegang lock.
+        """
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info("Cache query dikosongkan karena knowledge base atau indeks berubah.")
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _pop(self, key):
+        """
+        Menghapus satu entri dan memperbarui ukuran total. Pemanggil harus memegang lock.
+        """
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, query, version=None):
+        """
+        Mengambil jawaban dari cache, atau None jika tidak ada / kedaluwarsa.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] < time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query, value, version=None):
+        """
+        Menyimpan jawaban ke cache lalu mengeviksi entri LRU sampai batas jumlah dan memori terpenuhi.
+        """
+        key = normalize_query(query)
+        size = self._estimate_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        Mengosongkan seluruh cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Melaporkan jumlah hit, miss, eviksi dan penggunaan memori cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class SemanticQueryCache:
+    def __init__(self, embedding_dim, capacity=512, max_distance=0.05, ttl_seconds=3600):
+        """
+        Cache tingkat kedua berbasis embedding query: query baru yang jarak cosine-nya ke query
+        yang pernah dijawab tidak lebih dari ``max_distance`` memakai jawaban yang sama.
+
+        Embedding disimpan dalam satu matriks NumPy berkapasitas tetap, sehingga pencarian
+        cukup satu perkalian matriks; slot yang paling lama tidak dipakai dieviksi lebih dulu.
+        """
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+
+        self._embeddings = np.zeros((capacity, embedding_dim), dtype=np.float32)
+        self._values = [None] * capacity
+        self._occupied = np.zeros(capacity, dtype=bool)
+        self._expires_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        """
+        Mengosongkan cache jika versi sumber data berubah. Pemanggil harus memegang lock.
+        """
+        if version != self._version:
+            if self._occupied.any():
+                self.invalidations += 1
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        """
+        Menghapus seluruh slot. Pemanggil harus memegang lock.
+        """
+        self._occupied[:] = False
+        self._values = [None] * self.capacity
+
+    def _best_slot(self, embedding, now):
+        """
+        Mencari slot aktif dengan kemiripan cosine tertinggi. Pemanggil harus memegang lock.
+
+        :return: Tuple (indeks slot, kemiripan) atau (None, None) jika cache kosong
+        """
+        active = self._occupied & (self._expires_at >= now)
+        if not active.any():
+            return None, None
+        scores = self._embeddings @ embedding
+        scores[~active] = -np.inf
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    @staticmethod
+    def _normalize(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def get(self, embedding, version=None):
+        """
+        Mengambil jawaban dari query tersimpan yang cukup mirip, atau None.
+        """
+        embedding = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            slot, similarity = self._best_slot(embedding, now)
+            if slot is None or 1.0 - similarity > self.max_distance:
+                self.misses += 1
+                return None
+            self._last_used[slot] = now
+            self.hits += 1
+            return self._values[slot]
+
+    def put(self, embedding, value, version=None):
+        """
+        Menyimpan jawaban untuk embedding query; menimpa slot yang hampir identik,
+        memakai slot kosong/kedaluwarsa, atau mengeviksi slot LRU.
+        """
+        embedding = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            slot, similarity = self._best_slot(embedding, now)
+            if slot is None or 1.0 - similarity > self.max_distance:
+                free = np.flatnonzero(~self._occupied | (self._expires_at < now))
+                if len(free):
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+
+            self._embeddings[slot] = embedding
+            self._values[slot] = value
+            self._occupied[slot] = True
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_used[slot] = now
+
+    def invalidate(self):
+        """
+        Mengosongkan seluruh cache.
+        """
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Melaporkan jumlah hit, miss, eviksi dan tingkat hit cache semantik.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._occupied.sum()),
+                "capacity": self.capacity,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,70 +1,324 @@
-from sentence_transformers import util, SentenceTransformer
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import hashlib
 import logging
-import PyPDF2
-import torch
+import os
+import re
+import numpy as np
+from model_registry import registry, EMBEDDING_MODEL_NAME, GENERATION_MODEL_NAME
+from generation import AnswerGenerator, GENERATION_ERROR_ANSWER
+from pdf_extraction import EXTRACTION_VERSION, iter_batches, iter_pages
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from metrics import metrics
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+WORD_PATTERN = re.compile(r'\S+')
+
+
+def chunk_spans(text, chunk_words=96, overlap_words=24):
+    """
+    Memotong teks menjadi jendela geser berisi ``chunk_words`` kata yang saling tumpang tindih
+    ``overlap_words`` kata.
+
+    :return: List (offset_awal, offset_akhir) karakter di dalam ``text``
+    """
+    words = [match.span() for match in WORD_PATTERN.finditer(text)]
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap_words)
+    spans = []
+    for start in range(0, len(words), step):
+        window = words[start:start + chunk_words]
+        spans.append((window[0][0], window[-1][1]))
+        if start + chunk_words >= len(words):
+            break
+    return spans
+
+
 class KnowledgeBaseRetriever:
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, model_name=EMBEDDING_MODEL_NAME, cache_dir=None, batch_size=32,
+                 retrieval_mode="hybrid", lexical_candidates=32, lexical_min_coverage=0.6, rrf_k=60,
+                 chunk_words=96, chunk_overlap_words=24):
         """
         Inisialisasi retriever untuk mengambil informasi relevan dari basis pengetahuan PDF.
+
+        Setiap halaman dipotong menjadi potongan (chunk) jendela geser berukuran ``chunk_words`` kata
+        yang muat di panjang maksimum MiniLM; chunk menyimpan nomor halaman dan offset karakternya.
+        Embedding chunk dihitung sekali (dalam batch) lalu disimpan ke disk, dengan kunci hash
+        konten PDF, sehingga restart tidak perlu meng-encode ulang.
+        Pada mode "hybrid" peringkat dense digabung dengan peringkat BM25 per chunk.
         """
         try:
-            # Memuat knowledge base dari file PDF
-            self.knowledge_base = self.load_pdf(pdf_path)
+            self.pdf_path = pdf_path
+            self.model_name = model_name
+            self.cache_dir = cache_dir if cache_dir else os.path.dirname(os.path.abspath(pdf_path))
+            self.chunk_words = chunk_words
+            self.chunk_overlap_words = chunk_overlap_words
+
+            # Model SentenceTransformer bersama dari registry proses
+            self.model = registry.get_sentence_transformer(model_name)
+
+            # Teks halaman, metadata chunk {'page', 'start', 'end'} dan teksnya,
+            # serta matriks embedding chunk yang sudah dinormalisasi (n_chunk x dim)
+            self.page_texts = {}
+            self.chunks, self.embeddings = self.load_or_compute_embeddings(batch_size=batch_size)
+            self.knowledge_base = [self.chunk_text(chunk) for chunk in self.chunks]
+
+            # Inverted index BM25 per chunk (id dokumen = posisi chunk)
+            self.retrieval_mode = retrieval_mode
+            self.lexical_candidates = lexical_candidates
+            self.lexical_min_coverage = lexical_min_coverage
+            self.rrf_k = rrf_k
+            self.lexical_index = BM25Index(range(len(self.knowledge_base)), self.knowledge_base)
             logger.info("Knowledge base berhasil dimuat dari PDF.")
         except Exception as e:
             logger.error(f"Error saat memuat knowledge base: {e}")
             raise
 
+    def iter_chunks(self, pages):
+        """
+        Memotong aliran halaman menjadi chunk dan mencatat teks halaman untuk penggabungan konteks.
+        """
+        for page in pages:
+            self.page_texts[page["page"]] = page["content"]
+            for start, end in chunk_spans(page["content"], self.chunk_words, self.chunk_overlap_words):
+                yield {"page": page["page"], "start": start, "end": end}
+
+    def chunk_text(self, chunk):
+        """
+        Teks sebuah chunk (atau gabungan chunk) diambil dari teks halamannya berdasarkan offset.
+        """
+        return self.page_texts[chunk["page"]][chunk["start"]:chunk["end"]]
+
     @staticmethod
     def load_pdf(pdf_path):
         """
-        Membaca dan memuat konten dari file PDF.
+        Membaca dan memuat konten setiap halaman dari file PDF.
         """
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                knowledge_base = []
-
-                for page in reader.pages:
-                    text = page.extract_text().strip()
-                    if text:
-                        knowledge_base.append(text)
-
-                return knowledge_base
+            return [page["content"] for page in iter_pages(pdf_path)]
         except Exception as e:
             logger.error(f"Kesalahan saat membaca PDF dari {pdf_path}: {e}")
             raise
 
-    def retrieve(self, query, threshold=0.5):
+    def get_cache_path(self):
         """
-        Mencari informasi relevan dari knowledge base menggunakan kesamaan cosine.
+        Menentukan lokasi file cache embedding berdasarkan hash konten PDF, nama model, presisi
+        dan ukuran chunk.
+        """
+        digest = hashlib.sha256()
+        with open(self.pdf_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(self.model_name.encode('utf-8'))
+        digest.update(EXTRACTION_VERSION.encode('utf-8'))
+        digest.update(f"chunk{self.chunk_words}-{self.chunk_overlap_words}".encode('utf-8'))
+        if registry.precision != "fp32":
+            # Embedding model terkuantisasi sedikit berbeda, jadi tidak berbagi cache dengan fp32
+            digest.update(registry.precision.encode('utf-8'))
+
+        base_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
+        return os.path.join(self.cache_dir, f"{base_name}_{digest.hexdigest()[:16]}_embeddings.npy")
+
+    def load_or_compute_embeddings(self, batch_size=32):
+        """
+        Memuat chunk halaman beserta embedding-nya dari cache disk, atau menghitungnya sekali.
+
+        Tanpa cache, chunk di-encode per batch berukuran tetap begitu halamannya tiba dari pipeline
+        ekstraksi, sementara halaman berikutnya masih diekstrak di process pool.
+
+        :return: Tuple (list metadata chunk, matriks embedding float32 n_chunk x dim)
         """
+        cache_path = self.get_cache_path()
+        if os.path.exists(cache_path):
+            embeddings = None
+            try:
+                embeddings = np.load(cache_path)
+            except Exception as e:
+                logger.warning(f"Cache embedding tidak dapat dibaca ({e}), menghitung ulang.")
+            if embeddings is not None:
+                chunks = list(self.iter_chunks(iter_pages(self.pdf_path)))
+                if embeddings.shape[0] == len(chunks):
+                    logger.info(f"Embedding chunk dimuat dari cache {cache_path}.")
+                    return chunks, embeddings
+                logger.warning("Ukuran cache embedding tidak sesuai, menghitung ulang.")
+
+        self.page_texts = {}
+        chunks = []
+        batches = []
+        for batch in iter_batches(self.iter_chunks(iter_pages(self.pdf_path)), batch_size):
+            chunks.extend(batch)
+            batches.append(self.model.encode(
+                [self.chunk_text(chunk) for chunk in batch],
+                batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+            ).astype(np.float32))
+        if batches:
+            embeddings = np.vstack(batches)
+        else:
+            embeddings = np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
         try:
-            # Inisialisasi model SentenceTransformer untuk pencarian berbasis semantik
-            model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+            np.save(cache_path, embeddings)
+            logger.info(f"Embedding chunk disimpan ke cache {cache_path}.")
+        except OSError as e:
+            logger.warning(f"Gagal menyimpan cache embedding ke {cache_path}: {e}")
+        return chunks, embeddings
+
+    def retrieve_top_k(self, query, top_k=1, threshold=0.5, mode=None):
+        """
+        Mengambil top-k chunk paling relevan beserta skornya.
+
+        :return: List of (teks_chunk, skor) terurut dari yang paling relevan
+        """
+        return self.retrieve_top_k_batch([query], top_k=top_k, threshold=threshold, mode=mode)[0]
+
+    def retrieve_top_k_batch(self, queries, top_k=1, threshold=0.5, mode=None):
+        """
+        Mengambil top-k chunk untuk banyak query sekaligus (satu encode dan satu matmul).
+
+        Pada mode "hybrid" urutan ditentukan reciprocal-rank fusion peringkat cosine dan BM25;
+        chunk lolos jika cosine-nya di atas threshold atau cakupan istilah query-nya
+        (berbobot idf) minimal ``lexical_min_coverage``.
+
+        :return: List hasil per query, masing-masing list of (teks_chunk, skor_cosine)
+        """
+        return [
+            [(self.knowledge_base[i], score) for i, score in ranked]
+            for ranked in self.rank_chunks(queries, top_k=top_k, threshold=threshold, mode=mode)
+        ]
+
+    def rank_chunks(self, queries, top_k=1, threshold=0.5, mode=None, query_embeddings=None):
+        """
+        Memeringkat chunk untuk banyak query sekaligus.
+
+        :param query_embeddings: Embedding query ternormalisasi dari model yang sama (opsional);
+                                 jika None, query di-encode di sini
+        :return: List hasil per query, masing-masing list of (indeks_chunk, skor_cosine)
+        """
+        mode = mode or self.retrieval_mode
+        if len(self.knowledge_base) == 0 or not queries:
+            return [[] for _ in queries]
+
+        if query_embeddings is None:
+            query_embeddings = self.model.encode(
+                list(queries), convert_to_numpy=True, normalize_embeddings=True
+            ).astype(np.float32)
+
+        # Satu perkalian matriks untuk seluruh chunk (embedding sudah dinormalisasi)
+        scores = query_embeddings @ self.embeddings.T
+
+        if mode == "hybrid":
+            return [self._fuse(query, row, top_k, threshold) for query, row in zip(queries, scores)]
+
+        top_k = min(top_k, scores.shape[1])
+        results = []
+        for row in scores:
+            candidates = np.argpartition(-row, top_k - 1)[:top_k]
+            candidates = candidates[np.argsort(-row[candidates])]
+            results.append([(int(i), float(row[i])) for i in candidates if row[i] > threshold])
+        return results
+
+    def _fuse(self, query, row, top_k, threshold):
+        """
+        Menggabungkan peringkat cosine (satu baris skor) dan BM25 satu query dengan reciprocal-rank fusion.
+        """
+        num_dense = min(max(top_k, self.lexical_candidates), len(row))
+        dense = np.argpartition(-row, num_dense - 1)[:num_dense]
+        dense = dense[np.argsort(-row[dense])]
+        lexical, _ = self.lexical_index.search(query, self.lexical_candidates)
+
+        fused = reciprocal_rank_fusion([dense.tolist(), lexical.tolist()], k=self.rrf_k)
+        coverage = self.lexical_index.coverage(query, [i for i, _ in fused])
+        results = []
+        for i, _ in fused:
+            if row[i] > threshold or coverage.get(i, 0.0) >= self.lexical_min_coverage:
+                results.append((int(i), float(row[i])))
+                if len(results) == top_k:
+                    break
+        return results
+
+    def pack_context(self, ranked, count_tokens, token_budget):
+        """
+        Menyusun konteks dari chunk terurut relevansi sampai anggaran token habis.
+
+        Chunk yang tumpang tindih dengan chunk terpilih di halaman yang sama digabung menjadi satu
+        rentang (bersama semua rentang terpilih yang ditumpanginya), sehingga teks overlap jendela
+        geser tidak masuk dua kali.
+
+        :param ranked: List (indeks_chunk, skor) terurut dari yang paling relevan
+        :param count_tokens: Fungsi penghitung token tokenizer generator
+        :return: Teks konteks, atau None jika tidak ada chunk yang muat
+        """
+        selected = []  # list [chunk_span, jumlah_token]
+        used = 0
+        for i, _ in ranked:
+            chunk = self.chunks[i]
+            overlapping = [
+                item for item in selected
+                if item[0]["page"] == chunk["page"] and chunk["start"] < item[0]["end"] and item[0]["start"] < chunk["end"]
+            ]
+            if overlapping:
+                # Chunk bisa menjembatani beberapa rentang terpilih: semuanya dilebur menjadi satu rentang
+                span = {
+                    "page": chunk["page"],
+                    "start": min([chunk["start"]] + [item[0]["start"] for item in overlapping]),
+                    "end": max([chunk["end"]] + [item[0]["end"] for item in overlapping]),
+                }
+                tokens = count_tokens(self.chunk_text(span))
+                if used - sum(item[1] for item in overlapping) + tokens <= token_budget:
+                    position = selected.index(overlapping[0])
+                    selected = [item for item in selected if all(item is not other for other in overlapping)]
+                    selected.insert(position, [span, tokens])
+                    used = sum(item[1] for item in selected)
+                continue
 
-            # Menghitung embedding untuk query
-            query_embedding = model.encode([query], convert_to_tensor=True)
+            tokens = count_tokens(self.chunk_text(chunk))
+            if not selected and tokens > token_budget:
+                # Chunk terbaik lebih panjang dari anggaran: dipotong sebanding agar konteks tidak kosong
+                chunk = dict(chunk, end=chunk["start"] + (chunk["end"] - chunk["start"]) * token_budget // tokens)
+                tokens = count_tokens(self.chunk_text(chunk))
+            if used + tokens <= token_budget or not selected:
+                selected.append([chunk, tokens])
+                used += tokens
 
-            # Menghitung similarity dengan setiap entri di knowledge base
-            similarities = []
-            for text in self.knowledge_base:
-                text_embedding = model.encode([text], convert_to_tensor=True)
-                similarity = util.pytorch_cos_sim(query_embedding, text_embedding)[0][0].item()
-                similarities.append((text, similarity))
+        if not selected:
+            return None
+        return "\n".join(self.chunk_text(span) for span, _ in selected)
+
+    def retrieve_contexts(self, queries, count_tokens, token_budget=384, top_k=8, threshold=0.5, query_embeddings=None):
+        """
+        Mengambil konteks ter-pack untuk banyak query: top-k chunk per query dirangkai sampai ``token_budget``.
 
-            # Urutkan berdasarkan similarity tertinggi
-            similarities = sorted(similarities, key=lambda x: x[1], reverse=True)
+        :return: List teks konteks (atau None) per query
+        """
+        return [
+            context for context, _ in self.retrieve_scored_contexts(
+                queries, count_tokens, token_budget, top_k, threshold, query_embeddings
+            )
+        ]
+
+    def retrieve_scored_contexts(self, queries, count_tokens, token_budget=384, top_k=8, threshold=0.5,
+                                 query_embeddings=None):
+        """
+        Seperti retrieve_contexts, ditambah skor cosine chunk teratas sebagai ukuran keyakinan.
+
+        :return: List tuple (teks konteks atau None, skor cosine chunk teratas atau None) per query
+        """
+        return [
+            (self.pack_context(ranked, count_tokens, token_budget), ranked[0][1] if ranked else None)
+            for ranked in self.rank_chunks(queries, top_k=top_k, threshold=threshold, query_embeddings=query_embeddings)
+        ]
 
-            # Ambil entri dengan similarity tertinggi jika lebih besar dari threshold
-            if similarities and similarities[0][1] > threshold:
-                return similarities[0][0]
+    def retrieve(self, query, threshold=0.5):
+        """
+        Mencari informasi relevan dari knowledge base menggunakan kesamaan cosine.
+        """
+        try:
+            # Ambil chunk dengan peringkat tertinggi yang lolos threshold
+            results = self.retrieve_top_k(query, top_k=1, threshold=threshold)
+            if results:
+                return results[0][0]
             else:
                 return None
         except Exception as e:
@@ -73,75 +327,150 @@ class KnowledgeBaseRetriever:
 
 
 class RagPipeline:
-    def __init__(self, pdf_path, generation_model_name="google/flan-t5-small"):
+    def __init__(self, pdf_path, generation_model_name=GENERATION_MODEL_NAME, retrieval_model_name=EMBEDDING_MODEL_NAME,
+                 context_token_budget=384, context_top_k=8, encoder_cache=None, decoding_policy=None):
         """
         Inisialisasi pipeline RAG dengan retriever dan model generasi jawaban.
+
+        Konteks untuk generator disusun dari ``context_top_k`` chunk teratas sampai
+        ``context_token_budget`` token, menyisakan ruang untuk pertanyaan di input 512 token T5.
+
+        :param encoder_cache: EncoderCache opsional untuk memakai ulang encoding konteks yang berulang
+        :param decoding_policy: DecodingPolicy generator jawaban; None memakai greedy adaptif default
         """
         try:
             # Memuat retriever dari KnowledgeBaseRetriever
-            self.retriever = KnowledgeBaseRetriever(pdf_path)
+            self.retriever = KnowledgeBaseRetriever(pdf_path, model_name=retrieval_model_name)
 
-            # Memuat model T5 untuk generasi jawaban dan tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(generation_model_name)
-            self.generation_model = AutoModelForSeq2SeqLM.from_pretrained(generation_model_name)
+            # Memuat model T5 untuk generasi jawaban dan tokenizer (dipakai bersama lewat registry)
+            self.tokenizer = registry.get_tokenizer(generation_model_name)
+            self.generation_model = registry.get_seq2seq_model(generation_model_name)
+            self.generator = AnswerGenerator(
+                self.tokenizer, self.generation_model, encoder_cache=encoder_cache, decoding_policy=decoding_policy
+            )
+            self.context_token_budget = context_token_budget
+            self.context_top_k = context_top_k
 
             logger.info("Pipeline RAG berhasil diinisialisasi.")
         except Exception as e:
             logger.error(f"Error saat inisialisasi RAG: {e}")
             raise
 
-    def retrieve_relevant_info(self, query):
+    def count_tokens(self, text):
+        """
+        Menghitung jumlah token teks menurut tokenizer generator (tanpa token spesial).
+        """
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def retrieve_relevant_info(self, query, query_embedding=None):
         """
-        Mencari informasi relevan dari basis pengetahuan menggunakan retriever.
+        Mencari informasi relevan dari basis pengetahuan menggunakan retriever: chunk teratas
+        dirangkai menjadi satu konteks dalam anggaran token.
+
+        :return: Teks konteks, atau None jika tidak ada chunk yang relevan
+        """
+        return self.retrieve_scored_context(query, query_embedding)[0]
+
+    def retrieve_scored_context(self, query, query_embedding=None):
+        """
+        Mengambil konteks relevan beserta skor cosine chunk teratasnya.
+
+        :param query_embedding: Embedding query dari model retrieval yang sama (opsional), agar tidak di-encode ulang
+        :return: Tuple (teks konteks atau None, skor cosine atau None)
         """
         try:
-            # Gunakan retriever untuk mendapatkan dokumen relevan
-            relevant_info = self.retriever.retrieve(query)
+            # Gunakan retriever untuk mendapatkan chunk relevan yang muat dalam anggaran token
+            with metrics.span("rag_retrieve"):
+                relevant_info, score = self.retriever.retrieve_scored_contexts(
+                    [query], self.count_tokens, token_budget=self.context_token_budget, top_k=self.context_top_k,
+                    query_embeddings=None if query_embedding is None else query_embedding[np.newaxis, :]
+                )[0]
             if not relevant_info:
                 logger.warning("Tidak ada informasi relevan yang ditemukan.")
-                return "Maaf, saya tidak dapat menemukan informasi yang relevan."
+                return None, None
             logger.info("Informasi relevan ditemukan.")
-            return relevant_info
+            return relevant_info, score
         except Exception as e:
             logger.error(f"Error saat mencari informasi relevan: {e}")
-            return "Maaf, saya tidak dapat menemukan informasi yang relevan."
+            return None, None
 
-    def generate_answer(self, question, context, max_length=150, num_beams=2):
+    def generate_answer(self, question, context, max_length=None, num_beams=None):
         """
-        Menghasilkan jawaban menggunakan model T5.
+        Menghasilkan jawaban menggunakan model T5 (decoding mengikuti kebijakan generator
+        kecuali ``max_length``/``num_beams`` diisi).
+
+        :return: Jawaban, atau None jika generasi gagal
         """
         try:
-            input_text = f"question: {question} context: {context}"
-            inputs = self.tokenizer(input_text, return_tensors="pt", max_length=512, truncation=True)
-
             # Menghasilkan jawaban
-            outputs = self.generation_model.generate(
-                **inputs, max_length=max_length, num_beams=num_beams, early_stopping=True
-            )
-            answer = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            answer = self.generator.generate_answers(
+                [question], [context], max_length=max_length, num_beams=num_beams
+            )[0]
 
             logger.info("Jawaban berhasil dihasilkan.")
             return answer
         except Exception as e:
             logger.error(f"Error saat menghasilkan jawaban: {e}")
-            return "Terjadi kesalahan saat menghasilkan jawaban."
+            return None
+
+    def generate_answers(self, questions, contexts, max_length=None, num_beams=None, batch_size=16):
+        """
+        Menghasilkan jawaban untuk banyak pertanyaan sekaligus dengan generate ber-padding.
+        """
+        try:
+            answers = self.generator.generate_answers(
+                questions, contexts, max_length=max_length, num_beams=num_beams, batch_size=batch_size
+            )
+            logger.info(f"{len(answers)} jawaban berhasil dihasilkan.")
+            return answers
+        except Exception as e:
+            logger.error(f"Error saat menghasilkan jawaban batch: {e}")
+            return [GENERATION_ERROR_ANSWER] * len(questions)
 
     def answer_question(self, query):
         """
         Menjawab pertanyaan dengan mengintegrasikan retrieval dan generation.
+
+        :return: Jawaban, atau None jika pipeline gagal (jawaban seperti itu tidak boleh di-cache)
         """
         try:
             # Langkah 1: Cari informasi relevan
             relevant_info = self.retrieve_relevant_info(query)
 
             # Langkah 2: Hasilkan jawaban berdasarkan informasi relevan
-            context = relevant_info if isinstance(relevant_info, str) else ""
+            context = relevant_info or "Maaf, saya tidak dapat menemukan informasi yang relevan."
 
             answer = self.generate_answer(query, context)
             return answer
         except Exception as e:
             logger.error(f"Error pada pipeline RAG: {e}")
-            return "Terjadi kesalahan pada pipeline RAG."
+            return None
+
+    def stream_answer(self, query):
+        """
+        Menjawab pertanyaan secara streaming: retrieval dulu, lalu potongan teks jawaban
+        di-yield begitu dihasilkan model.
+        """
+        relevant_info = self.retrieve_relevant_info(query)
+        context = relevant_info or "Maaf, saya tidak dapat menemukan informasi yang relevan."
+        yield from self.generator.stream_answer(query, context)
+
+    def answer_questions(self, queries, batch_size=16):
+        """
+        Menjawab banyak pertanyaan: retrieval dalam satu batch lalu generasi ber-padding.
+        """
+        try:
+            with metrics.span("rag_retrieve"):
+                contexts = [
+                    context or "Maaf, saya tidak dapat menemukan informasi yang relevan."
+                    for context in self.retriever.retrieve_contexts(
+                        queries, self.count_tokens, token_budget=self.context_token_budget, top_k=self.context_top_k
+                    )
+                ]
+            return self.generate_answers(queries, contexts, batch_size=batch_size)
+        except Exception as e:
+            logger.error(f"Error pada pipeline RAG batch: {e}")
+            return ["Terjadi kesalahan pada pipeline RAG."] * len(queries)
 
 
 # Contoh penggunaan untuk menguji pipeline
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+import numpy as np
+from model_registry import registry, RERANKER_MODEL_NAME
+from embedding_batcher import Histogram
+from inference_pool import current_deadline
+
+# Faktor peluruhan perkiraan biaya per pasangan setiap kali reranking dilewati karena anggaran,
+# agar satu panggilan lambat tidak mematikan reranker selamanya
+SKIP_DECAY = 0.5
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def candidate_text(candidate):
+    """
+    Teks dokumen kandidat FAISS yang dinilai cross-encoder.
+    """
+    return f"{candidate['gejala']}: {candidate['penyebab']}"
+
+
+class Reranker:
+    def __init__(self, model_name=RERANKER_MODEL_NAME, top_n=10, latency_budget_ms=150.0, margin=0.25,
+                 batch_size=32, device=None):
+        """
+        Tahap reranking opsional: top-N kandidat retrieval dinilai ulang oleh cross-encoder
+        dalam satu panggilan ber-batch.
+
+        Tahap ini melewati dirinya sendiri bila peringkat pertama sudah jelas (selisih relatif
+        skor top-1 dan top-2 minimal ``margin``) atau bila perkiraan waktu reranking melebihi
+        ``latency_budget_ms`` maupun sisa deadline request di pool inferensi.
+
+        :param top_n: Jumlah kandidat maksimum yang dinilai ulang
+        :param latency_budget_ms: Batas waktu reranking per query; jumlah kandidat dikurangi agar muat
+        :param margin: Selisih relatif (s1 - s2) / |s1| skor tahap pertama yang dianggap sudah pasti
+        """
+        self.model = registry.get_cross_encoder(model_name, device)
+        self.model_name = model_name
+        self.top_n = top_n
+        self.latency_budget_ms = latency_budget_ms
+        self.margin = margin
+        self.batch_size = batch_size
+
+        # Perkiraan biaya per pasangan (ms), diperbarui dengan rata-rata bergerak eksponensial;
+        # panggilan predict pertama (model dingin, inisialisasi device) tidak ikut dihitung
+        self._ms_per_pair = None
+        self._warmed_up = False
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "reranked": 0, "skipped_margin": 0, "skipped_budget": 0, "top1_changed": 0}
+        self.latency_ms_histogram = Histogram([1, 2, 5, 10, 25, 50, 100, 250, 500])
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _budget_candidates(self, num_candidates):
+        """
+        Menentukan jumlah kandidat yang muat dalam anggaran waktu dan sisa deadline request.
+        """
+        budget_ms = self.latency_budget_ms
+        deadline = current_deadline()
+        if deadline is not None:
+            budget_ms = min(budget_ms, (deadline - time.monotonic()) * 1000.0)
+        if self._ms_per_pair is None:
+            return num_candidates if budget_ms > 0 else 0
+        return min(num_candidates, int(budget_ms // max(self._ms_per_pair, 1e-6)))
+
+    def should_skip(self, scores):
+        """
+        True jika selisih relatif skor top-1 dan top-2 sudah mencapai ``margin``.
+        """
+        if len(scores) < 2:
+            return True
+        top, second = float(scores[0]), float(scores[1])
+        return top != 0 and (top - second) / abs(top) >= self.margin
+
+    def rerank(self, query, candidates, scores, text_fn=candidate_text):
+        """
+        Menilai ulang kandidat teratas dan mengurutkannya menurut skor cross-encoder.
+
+        :param candidates: Kandidat terurut dari tahap retrieval
+        :param scores: Skor tahap retrieval (cosine atau skor fusi), sejajar dengan ``candidates``
+        :return: Tuple (kandidat terurut ulang, skor, info {'reranked', 'reason', 'candidates', 'ms'})
+        """
+        self._count("calls")
+        scores = np.asarray(scores, dtype=np.float32)
+        if self.should_skip(scores):
+            self._count("skipped_margin")
+            return candidates, scores, {"reranked": False, "reason": "margin", "candidates": 0, "ms": 0.0}
+
+        num_candidates = self._budget_candidates(min(self.top_n, len(candidates)))
+        if num_candidates < 2:
+            with self._lock:
+                self.counts["skipped_budget"] += 1
+                # Perkiraan hanya diperbarui saat reranking berjalan; tanpa peluruhan tidak akan pulih
+                if self._ms_per_pair is not None:
+                    self._ms_per_pair *= SKIP_DECAY
+            return candidates, scores, {"reranked": False, "reason": "budget", "candidates": 0, "ms": 0.0}
+
+        head = candidates[:num_candidates]
+        start = time.perf_counter()
+        rerank_scores = np.asarray(self.model.predict(
+            [(query, text_fn(candidate)) for candidate in head],
+            batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+        ), dtype=np.float32).reshape(-1)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+        with self._lock:
+            per_pair = elapsed_ms / len(head)
+            if not self._warmed_up:
+                self._warmed_up = True
+            elif self._ms_per_pair is None:
+                self._ms_per_pair = per_pair
+            else:
+                self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * per_pair
+            self.counts["reranked"] += 1
+        self.latency_ms_histogram.observe(elapsed_ms)
+
+        order = np.argsort(-rerank_scores, kind="stable")
+        if order[0] != 0:
+            self._count("top1_changed")
+        reranked = [head[i] for i in order] + list(candidates[num_candidates:])
+        new_scores = np.concatenate([rerank_scores[order], scores[num_candidates:]])
+        return reranked, new_scores, {
+            "reranked": True, "reason": "ok", "candidates": len(head), "ms": round(elapsed_ms, 3)
+        }
+
+    def stats(self):
+        """
+        Melaporkan jumlah panggilan, lewatan (margin/anggaran), perubahan top-1 dan histogram latensi.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+            ms_per_pair = self._ms_per_pair
+        return dict(
+            counts,
+            model=self.model_name,
+            top_n=self.top_n,
+            latency_budget_ms=self.latency_budget_ms,
+            margin=self.margin,
+            ms_per_pair=round(ms_per_pair, 3) if ms_per_pair is not None else None,
+            latency_ms=self.latency_ms_histogram.snapshot(),
+        )
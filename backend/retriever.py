@@ -1,20 +1,20 @@
-from sentence_transformers import SentenceTransformer
 import json
 import logging
 from faiss_index import FAISSIndexManager
 from pdf_extraction import extract_paragraphs_from_pdf  # Pastikan pdf_extraction.py sudah ada
+from model_registry import registry, EMBEDDING_MODEL_NAME
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class KnowledgeBaseRetriever:
-    def __init__(self, pdf_path, model_name="sentence-transformers/all-MiniLM-L6-v2", faiss_index_path="faiss_index.index"):
+    def __init__(self, pdf_path, model_name=EMBEDDING_MODEL_NAME, faiss_index_path="faiss_index.index"):
         """
         Inisialisasi retriever dengan model SentenceTransformer dan indeks FAISS.
         """
         try:
-            self.retrieval_model = SentenceTransformer(model_name)
+            self.retrieval_model = registry.get_sentence_transformer(model_name)
             self.faiss_manager = FAISSIndexManager(faiss_index_path)
             self.pdf_path = pdf_path
 
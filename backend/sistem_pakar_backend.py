@@ -1,11 +1,16 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-from sentence_transformers import SentenceTransformer, util
+import json
 import logging
-from rag_pipeline import RagPipeline  # Untuk pipeline RAG
-from qa_model import QAModel  # Impor model QA dari qa_model.py
-from pdf_extraction import extract_text_from_pdf  # Untuk ekstraksi PDF
+import os
+import numpy as np
+from embedding_batcher import EmbeddingBatcher  # Micro-batching encoding query
+from query_cache import QueryCache, SemanticQueryCache  # Cache jawaban /ask dan /rag
+from inference_pool import InferencePool, PoolSaturatedError, InferenceTimeoutError  # Pool inferensi terbatas
+from metrics import metrics  # Span per tahap, histogram latensi dan counter untuk /metrics
+from cascade import CascadePlanner, CascadeStage  # Planner kaskade /ask dengan early exit
+from encoder_cache import EncoderCache  # Cache hidden state encoder T5 per konteks
+from warmup import Warmup, ComponentNotReadyError  # Pemuatan model dan indeks saat start (eager atau di latar)
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,79 +24,476 @@ app = Flask(__name__)
 # Menambahkan CORS untuk mengizinkan permintaan dari frontend
 CORS(app)
 
-# Konfigurasi file dan model
-generation_model_name = "google/flan-t5-small"
-pdf_path = "C:/Users/thejo/OneDrive/Desktop/sistem_pakar_baru/backend/penyakit_telinga.pdf"  # Lokasi PDF
-faiss_index_path = "C:/Users/thejo/OneDrive/Desktop/sistem_pakar_baru/backend/faiss_index"  # Lokasi FAISS Index
+# Mode start: "eager" memuat seluruh model dan indeks saat impor (port baru dibuka setelah semuanya siap),
+# "background" langsung membuka port dan memuat komponen di thread latar; selama warmup setiap tahap
+# dilayani begitu komponennya siap dan request yang belum bisa dilayani dijawab 503
+startup_mode = os.environ.get("STARTUP_MODE", "eager")
+warmup = Warmup()
 
-# Inisialisasi RagPipeline
-rag_pipeline = RagPipeline(pdf_path=pdf_path)
+# Konfigurasi file dan model (bisa diganti lewat env, mis. model lokal kecil untuk benchmark);
+# nama bawaan dari model_registry diisi saat warmup karena impornya memuat torch dan transformers
+generation_model_name = os.environ.get("GENERATION_MODEL")
+embedding_model_name = os.environ.get("EMBEDDING_MODEL")
 
-# Inisialisasi model QA
-qa_model = QAModel(
-    generation_model_name=generation_model_name,
-    pdf_path=pdf_path,
-    faiss_index_path=faiss_index_path
+# Konfigurasi micro-batching encoding query (ukuran batch maksimum dan waktu tunggu maksimum)
+embedding_batch_max_size = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "32"))
+embedding_batch_max_wait_ms = float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Konfigurasi tipe indeks FAISS (flat, ivf_flat, ivf_pq, hnsw) dan parameter pencariannya
+faiss_index_options = {
+    "index_type": os.environ.get("FAISS_INDEX_TYPE", "flat"),
+    "nlist": int(os.environ.get("FAISS_NLIST", "100")),
+    "nprobe": int(os.environ.get("FAISS_NPROBE", "8")),
+    "ef_search": int(os.environ.get("FAISS_EF_SEARCH", "64")),
+    # "hybrid" menggabungkan BM25 dan FAISS (reciprocal-rank fusion), "dense" hanya FAISS
+    "retrieval_mode": os.environ.get("RETRIEVAL_MODE", "hybrid"),
+}
+
+# Reranking cross-encoder opsional atas kandidat FAISS (aktif jika RERANKER_MODEL diisi)
+reranker_options = {
+    "model_name": os.environ["RERANKER_MODEL"],
+    "top_n": int(os.environ.get("RERANKER_TOP_N", "10")),
+    "latency_budget_ms": float(os.environ.get("RERANKER_LATENCY_BUDGET_MS", "150")),
+    "margin": float(os.environ.get("RERANKER_MARGIN", "0.25")),
+} if os.environ.get("RERANKER_MODEL") else None
+
+# Cache encoder T5 per konteks (bersama RagPipeline dan QAModel); 0 = nonaktif, prompt gabungan seperti biasa
+encoder_cache_max_bytes = int(os.environ.get("ENCODER_CACHE_MAX_BYTES", "0"))
+encoder_cache = EncoderCache(max_bytes=encoder_cache_max_bytes) if encoder_cache_max_bytes > 0 else None
+
+# Kebijakan decoding T5 (bersama RagPipeline dan QAModel): greedy dengan batas token dari panjang masukan,
+# eskalasi ke beam search jika confidence rendah; DECODING_MODE=beam mengembalikan perilaku lama
+decoding_options = {
+    "mode": os.environ.get("DECODING_MODE", "adaptive"),
+    "min_new_tokens": int(os.environ.get("DECODING_MIN_NEW_TOKENS", "16")),
+    "max_new_tokens": int(os.environ.get("DECODING_MAX_NEW_TOKENS", "150")),
+    "context_ratio": float(os.environ.get("DECODING_CONTEXT_RATIO", "0.75")),
+    "escalate_confidence": float(os.environ.get("DECODING_ESCALATE_CONFIDENCE", "0.5")),
+    "escalate_beams": int(os.environ.get("DECODING_ESCALATE_BEAMS", "2")),
+}
+# Model draft opsional untuk assisted decoding (dimuat terakhir; sebelum siap decoding berjalan tanpa draft)
+assistant_model_name = os.environ.get("GENERATION_ASSISTANT_MODEL")
+
+# Konfigurasi cache jawaban /ask (LRU + TTL + batas memori)
+query_cache = QueryCache(
+    max_entries=int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "3600")),
+    max_bytes=int(os.environ.get("QUERY_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+)
+
+# Pool inferensi terbatas: request di luar kapasitas ditolak 503, yang melewati batas waktu 504
+inference_pool = InferencePool(
+    max_workers=int(os.environ.get("INFERENCE_MAX_WORKERS", "2")),
+    max_queue=int(os.environ.get("INFERENCE_MAX_QUEUE", "16")),
+    timeout_seconds=float(os.environ.get("INFERENCE_TIMEOUT_SECONDS", "30"))
+)
+
+pdf_path = os.environ.get(
+    "PDF_PATH", "C:/Users/thejo/OneDrive/Desktop/sistem_pakar_baru/backend/penyakit_telinga.pdf"
+)  # Lokasi PDF
+faiss_index_path = os.environ.get(
+    "FAISS_INDEX_PATH", "C:/Users/thejo/OneDrive/Desktop/sistem_pakar_baru/backend/faiss_index"
+)  # Lokasi FAISS Index
+
+# Cache semantik tingkat kedua untuk parafrase query yang sudah pernah dijawab
+semantic_cache_capacity = int(os.environ.get("SEMANTIC_CACHE_CAPACITY", "512"))
+semantic_cache_max_distance = float(os.environ.get("SEMANTIC_CACHE_MAX_DISTANCE", "0.05"))
+
+# Threshold relevansi untuk jawaban langsung dari knowledge base
+kb_similarity_threshold = 0.8
+# Kecocokan knowledge base di bawah threshold tetapi di atas batas ini hanya dipakai sebagai jawaban cadangan
+kb_fallback_threshold = 0.6
+
+# Planner kaskade /ask: anggaran waktu per request dan skor cosine minimum agar konteks RAG langsung dipakai
+cascade_latency_budget_ms = float(os.environ.get("CASCADE_LATENCY_BUDGET_MS", "5000"))
+rag_exit_confidence = float(os.environ.get("RAG_EXIT_CONFIDENCE", "0.6"))
+
+# Direktori artefak knowledge base (embedding ter-mmap + metadata), dibangun dengan kb_artifact.py
+kb_artifact_dir = os.environ.get(
+    "KB_ARTIFACT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb_artifact")
 )
 
-# Inisialisasi model embedding
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+# Komponen yang diisi warmup; bernilai None (atau kosong) selama komponennya belum siap
+model_registry = None
+decoding_policy = None
+embedding_model = None
+embedding_batcher = None
+ask_semantic_cache = None
+rag_semantic_cache = None
+knowledge_base, knowledge_base_embeddings = [], None
+knowledge_base_artifact = None  # ArtifactWatcher atas kb_artifact_dir
+knowledge_base_version = None  # Versi artefak yang sedang dilayani
+rag_pipeline = None
+qa_model = None
+# Embedding query dari embedding_batcher hanya dipakai ulang oleh tahap yang memakai model yang sama
+# (RagPipeline memakai SentenceTransformer yang sama; FAISS memakai mean pooling atas transformer dasarnya)
+rag_shares_query_embedding = False
+faiss_shares_query_embedding = False
 
-# Fungsi untuk memuat dan memproses basis pengetahuan dari PDF
-def preprocess_knowledge_base():
+def load_runtime():
+    """
+    Mengimpor pustaka model (torch, transformers, sentence-transformers), mengatur thread PyTorch
+    (TORCH_NUM_THREADS / TORCH_INTEROP_THREADS; presisi model lewat MODEL_PRECISION=int8)
+    dan menyiapkan kebijakan decoding.
+    """
+    global model_registry, generation_model_name, embedding_model_name, decoding_policy
+    import model_registry as registry_module
+    from decoding import DecodingPolicy
+
+    registry_module.configure_torch_threads()
+    model_registry = registry_module.registry
+    generation_model_name = generation_model_name or registry_module.GENERATION_MODEL_NAME
+    embedding_model_name = embedding_model_name or registry_module.EMBEDDING_MODEL_NAME
+    decoding_policy = DecodingPolicy(**decoding_options)
+
+def load_embedding_model():
+    """
+    Memuat model embedding bersama (instance yang sama dengan RagPipeline dan QAModel),
+    antrian batch encoding query dan cache semantik yang bergantung pada dimensinya.
+    """
+    global embedding_model, embedding_batcher, ask_semantic_cache, rag_semantic_cache
+    embedding_model = model_registry.get_sentence_transformer(embedding_model_name)
+
+    # Antrian batch untuk query yang datang bersamaan dari banyak request
+    embedding_batcher = EmbeddingBatcher(
+        lambda texts: embedding_model.encode(
+            texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32),
+        max_batch_size=embedding_batch_max_size,
+        max_wait_ms=embedding_batch_max_wait_ms,
+        name="query-embedding"
+    )
+
+    ask_semantic_cache = SemanticQueryCache(
+        embedding_model.get_sentence_embedding_dimension(),
+        capacity=semantic_cache_capacity,
+        max_distance=semantic_cache_max_distance,
+        ttl_seconds=query_cache.ttl_seconds
+    )
+    rag_semantic_cache = SemanticQueryCache(
+        embedding_model.get_sentence_embedding_dimension(),
+        capacity=semantic_cache_capacity,
+        max_distance=semantic_cache_max_distance,
+        ttl_seconds=query_cache.ttl_seconds
+    )
+
+def load_rag_pipeline():
+    """
+    Inisialisasi RagPipeline (praproses PDF, embedding chunk dan model T5).
+    """
+    global rag_pipeline, rag_shares_query_embedding
+    from rag_pipeline import RagPipeline  # Untuk pipeline RAG
+
+    rag_pipeline = RagPipeline(
+        pdf_path=pdf_path, generation_model_name=generation_model_name, retrieval_model_name=embedding_model_name,
+        encoder_cache=encoder_cache, decoding_policy=decoding_policy
+    )
+    rag_shares_query_embedding = rag_pipeline.retriever.model is embedding_model
+
+def load_qa_model():
+    """
+    Inisialisasi model QA (model T5, indeks FAISS dan reranker opsional).
+    """
+    global qa_model, faiss_shares_query_embedding
+    from qa_model import QAModel  # Impor model QA dari qa_model.py
+
+    qa_model = QAModel(
+        generation_model_name=generation_model_name,
+        pdf_path=pdf_path,
+        faiss_index_path=faiss_index_path,
+        retrieval_model_name=embedding_model_name,
+        query_batch_max_size=embedding_batch_max_size,
+        query_batch_max_wait_ms=embedding_batch_max_wait_ms,
+        faiss_index_options=faiss_index_options,
+        reranker_options=reranker_options,
+        encoder_cache=encoder_cache,
+        decoding_policy=decoding_policy
+    )
+    faiss_shares_query_embedding = (
+        qa_model.faiss_index_manager.model is embedding_model[0].auto_model
+        and qa_model.faiss_index_manager.normalize_embeddings
+    )
+
+def load_assistant_model():
+    """
+    Memuat model draft untuk assisted decoding ke kebijakan decoding bersama.
+    """
+    decoding_policy.assistant_model = model_registry.get_seq2seq_model(assistant_model_name)
+
+# Fungsi untuk memuat basis pengetahuan dari artefak yang sudah dibangun
+def load_knowledge_base():
+    """
+    Membuka artefak knowledge base: matriks embedding dibuka dengan mmap read-only sehingga
+    seluruh worker berbagi halaman memori yang sama. Jika artefak belum ada, usang terhadap PDF,
+    atau dibangun dengan model lain, artefak dibangun sekali dari PDF lalu dibuka.
+
+    :return: Tuple (list metadata entri, matriks embedding ternormalisasi float32 n x dim, versi artefak atau None)
+    """
+    global knowledge_base_artifact
+    from kb_artifact import ArtifactWatcher, build_artifact  # Artefak knowledge base (embedding mmap)
+    if knowledge_base_artifact is None:
+        knowledge_base_artifact = ArtifactWatcher(kb_artifact_dir)
     try:
-        text = extract_text_from_pdf(pdf_path)
-        logger.info("Teks PDF berhasil diekstraksi.")
-        
-        knowledge_base = []
-        for entry in text:
-            gejala = entry.get("gejala", "").strip()
-            penyebab = entry.get("penyebab", "").strip()
-            solusi = entry.get("solusi", "").strip()
-            
-            if gejala:
-                embedding = embedding_model.encode(gejala, convert_to_tensor=True)
-                knowledge_base.append({
-                    "gejala": gejala,
-                    "penyebab": penyebab,
-                    "solusi": solusi,
-                    "embedding": embedding
-                })
-        logger.info("Knowledge base berhasil diproses dengan embedding.")
-        return knowledge_base
+        # Kesegaran artefak hanya dicek jika PDF sumbernya tersedia di mesin ini
+        source_pdf = pdf_path if os.path.exists(pdf_path) else None
+        entries = None
+        try:
+            entries, embeddings, manifest = knowledge_base_artifact.load(embedding_model_name, source_pdf)
+        except (FileNotFoundError, ValueError) as e:
+            logger.warning(f"Artefak knowledge base tidak dipakai ({e}), membangun dari PDF.")
+
+        if entries is None:
+            build_artifact(pdf_path, kb_artifact_dir, embedding_model_name)
+            entries, embeddings, manifest = knowledge_base_artifact.load()
+
+        logger.info(f"Knowledge base dimuat dari artefak {manifest['version']} ({len(entries)} entri).")
+        return entries, embeddings, manifest['version']
     except Exception as e:
-        logger.error(f"Error memproses knowledge base: {e}")
-        return []
+        logger.error(f"Error memuat knowledge base: {e}")
+        return [], np.zeros((0, embedding_model.get_sentence_embedding_dimension()), dtype=np.float32), None
 
-# Memuat basis pengetahuan
-knowledge_base = preprocess_knowledge_base()
+def load_knowledge_base_component():
+    """
+    Memuat basis pengetahuan: metadata entri dan matriks embedding yang sejajar barisnya.
+    """
+    global knowledge_base, knowledge_base_embeddings, knowledge_base_version
+    knowledge_base, knowledge_base_embeddings, knowledge_base_version = load_knowledge_base()
 
-# Fungsi untuk pencarian jawaban dari knowledge base
-def get_answer_from_knowledge_base(query):
+# Urutan warmup: tahap murah dulu agar /ask bisa dijawab dari knowledge base secepat mungkin
+warmup.add("runtime", load_runtime)
+warmup.add("embedding_model", load_embedding_model, requires=("runtime",))
+warmup.add("knowledge_base", load_knowledge_base_component, requires=("embedding_model",))
+warmup.add("rag_pipeline", load_rag_pipeline, requires=("embedding_model",))
+warmup.add("qa_model", load_qa_model, requires=("embedding_model",))
+if assistant_model_name:
+    warmup.add("assistant_model", load_assistant_model, requires=("runtime",))
+warmup.register_metrics()
+
+def refresh_knowledge_base():
+    """
+    Membuka artefak knowledge base yang baru diaktifkan (mis. oleh `kb_artifact.py build` atau worker lain).
+    Versinya bagian dari versi cache, jadi jawaban dari knowledge base lama tidak dipakai lagi.
+    """
+    global knowledge_base, knowledge_base_embeddings, knowledge_base_version
+    if not warmup.is_ready("knowledge_base") or not knowledge_base_artifact.changed():
+        return
     try:
-        query_embedding = embedding_model.encode(query, convert_to_tensor=True)
-        max_similarity = 0
-        best_match = None
-
-        for entry in knowledge_base:
-            similarity = util.pytorch_cos_sim(query_embedding, entry['embedding'])[0][0].item()
-            if similarity > 0.8 and similarity > max_similarity:  # Threshold relevansi
-                max_similarity = similarity
-                best_match = entry
-
-        if best_match:
-            return {
-                "gejala": best_match['gejala'],
-                "penyebab": best_match['penyebab'],
-                "solusi": best_match.get('solusi', 'Solusi tidak tersedia')
-            }
-        return None
+        entries, embeddings, manifest = knowledge_base_artifact.load(embedding_model_name)
+    except (FileNotFoundError, ValueError) as e:
+        logger.warning(f"Artefak knowledge base baru tidak dipakai ({e}).")
+        return
+    knowledge_base, knowledge_base_embeddings = entries, embeddings
+    knowledge_base_version = manifest['version']
+    logger.info(f"Knowledge base dimuat ulang dari artefak {manifest['version']} ({len(entries)} entri).")
+
+def get_cache_version():
+    """
+    Versi gabungan knowledge base, metadata indeks FAISS dan warmup; perubahan salah satunya membatalkan
+    cache, sehingga jawaban yang dibuat sebelum semua tahap siap tidak dipakai lagi setelahnya.
+    Artefak knowledge base yang diganti dibuka ulang lebih dulu.
+    """
+    refresh_knowledge_base()
+    faiss_version = qa_model.faiss_index_manager.get_metadata_version() if warmup.is_ready("qa_model") else None
+    return (knowledge_base_version, faiss_version, warmup.version)
+
+# Fungsi untuk pencarian entri terdekat di knowledge base untuk sekumpulan query sekaligus
+def match_knowledge_base(queries, query_embeddings=None):
+    """
+    Mencocokkan banyak query terhadap knowledge base dengan satu perkalian matriks.
+
+    :param queries: List query
+    :param query_embeddings: Embedding query yang sudah dihitung (opsional)
+    :return: List tuple (entri terdekat, skor cosine) per query, atau None jika knowledge base kosong
+    """
+    if not queries or len(knowledge_base) == 0:
+        return [None] * len(queries)
+
+    if query_embeddings is None:
+        with metrics.span("query_encode"):
+            query_embeddings = embedding_batcher.encode_many(queries)
+
+    # Skor cosine seluruh query terhadap seluruh entri (m x n)
+    with metrics.span("kb_scan"):
+        similarities = query_embeddings @ knowledge_base_embeddings.T
+        best_indices = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(queries)), best_indices]
+
+    return [
+        ({
+            "gejala": knowledge_base[best_index]['gejala'],
+            "penyebab": knowledge_base[best_index]['penyebab'],
+            "solusi": knowledge_base[best_index].get('solusi') or 'Solusi tidak tersedia'
+        }, float(best_score))
+        for best_index, best_score in zip(best_indices, best_scores)
+    ]
+
+# Fungsi untuk pencarian jawaban dari knowledge base untuk sekumpulan query sekaligus
+def get_answers_from_knowledge_base(queries, query_embeddings=None):
+    """
+    Jawaban knowledge base untuk banyak query; hanya kecocokan di atas kb_similarity_threshold yang dipakai.
+
+    :return: List jawaban (dict) atau None untuk query yang tidak melewati threshold
+    """
+    try:
+        return [
+            match[0] if match is not None and match[1] > kb_similarity_threshold else None  # Threshold relevansi
+            for match in match_knowledge_base(queries, query_embeddings)
+        ]
     except Exception as e:
         logger.error(f"Error mencari di knowledge base: {e}")
+        return [None] * len(queries)
+
+# Fungsi untuk pencarian jawaban dari knowledge base
+def get_answer_from_knowledge_base(query, query_embedding=None):
+    query_embeddings = None if query_embedding is None else query_embedding[np.newaxis, :]
+    return get_answers_from_knowledge_base([query], query_embeddings)[0]
+
+def format_kb_answer(kb_answer):
+    return {
+        'answer': f"<b>Gejala:</b> {kb_answer['gejala']}<br>"
+                  f"<b>Penyebab:</b> {kb_answer['penyebab']}<br>"
+                  f"<b>Solusi:</b> {kb_answer['solusi']}<br>",
+        'follow_up': "Apakah jawaban ini memadai? 😊"
+    }
+
+def knowledge_base_stage(query, query_embedding):
+    """
+    Tahap 1: entri knowledge base terdekat (skor cosine). Kecocokan lemah tidak dipakai sama sekali.
+    """
+    query_embeddings = None if query_embedding is None else query_embedding[np.newaxis, :]
+    match = match_knowledge_base([query], query_embeddings)[0]
+    if match is None or match[1] < kb_fallback_threshold:
         return None
+    return format_kb_answer(match[0]), match[1]
+
+def rag_stage(query, query_embedding):
+    """
+    Tahap 2: konteks chunk PDF yang relevan (skor cosine chunk teratas).
+    """
+    context, score = rag_pipeline.retrieve_scored_context(
+        query, query_embedding if rag_shares_query_embedding else None
+    )
+    if context is None:
+        return None
+    return {
+        'answer': f"<b>Informasi Relevan:</b> {context}<br>",
+        'follow_up': "Apakah jawaban ini memadai? 😊"
+    }, score if score is not None else 0.0
+
+def qa_model_stage(query, query_embedding):
+    """
+    Tahap 3: jawaban generatif QA model dari entri FAISS terbaik; generasi dilewati jika tidak ada entri relevan.
+    """
+    answer, score = qa_model.answer_with_score(query, query_embedding if faiss_shares_query_embedding else None)
+    if answer is None:
+        return None
+    return {'answer': answer, 'follow_up': "Apakah jawaban ini memadai? 😊"}, score
+
+ask_cascade = CascadePlanner([
+    CascadeStage("knowledge_base", knowledge_base_stage, exit_confidence=kb_similarity_threshold,
+                 ready=lambda: warmup.is_ready("knowledge_base")),
+    CascadeStage("rag", rag_stage, exit_confidence=rag_exit_confidence, ready=lambda: warmup.is_ready("rag_pipeline")),
+    CascadeStage("qa_model", qa_model_stage, ready=lambda: warmup.is_ready("qa_model")),
+], latency_budget_ms=cascade_latency_budget_ms)
+
+def no_answer_response():
+    return {'answer': "Tidak ada informasi relevan ditemukan.", 'follow_up': "Apakah jawaban ini memadai? 😊"}
+
+def error_response():
+    return {'answer': "Terjadi kesalahan dalam menjawab pertanyaan.", 'follow_up': "Apakah jawaban ini memadai? 😊"}
+
+def cascade_response(result):
+    """
+    Respons /ask dari hasil kaskade beserta nama tahap yang menjawab. Tanpa jawaban, kaskade dengan tahap
+    yang error dijawab pesan kesalahan, bukan "tidak ada informasi relevan".
+    """
+    return dict(result.response or (error_response() if result.failed else no_answer_response()), stage=result.stage)
+
+def require_cascade_answer(result, not_ready=()):
+    """
+    Kaskade tanpa jawaban sementara sebagian tahapnya belum siap berarti "belum bisa menjawab",
+    bukan "tidak ada informasi relevan": request dijawab 503 dan hasilnya tidak di-cache.
+    """
+    not_ready = [d['stage'] for d in result.decisions if d['decision'] == 'not_ready'] + list(not_ready)
+    if result.response is None and not_ready:
+        raise ComponentNotReadyError(not_ready)
+
+def run_cascade(query, query_embedding=None):
+    """
+    Menjalankan kaskade /ask (knowledge base, RAG pipeline, QA model) dengan satu embedding query bersama;
+    berhenti di tahap pertama yang cukup yakin.
+
+    :return: Tuple (respons dengan nama tahap yang menjawab, CascadeResult)
+    """
+    if query_embedding is None:
+        with metrics.span("query_encode"):
+            query_embedding = embedding_batcher.encode(query)
+    result = ask_cascade.run(query, query_embedding)
+    require_cascade_answer(result)
+    metrics.inc("cascade_answers_total", branch=result.stage or "none")
+    return cascade_response(result), result
+
+def answer_query(query, query_embedding=None):
+    """
+    Menjawab query /ask lewat kaskade tanpa cache. Respons memuat nama tahap yang menjawab.
+    """
+    return run_cascade(query, query_embedding)[0]
+
+def resolve_query(query, cache_version):
+    """
+    Menjawab query /ask yang tidak ada di cache persis: cache semantik, lalu kaskade lengkap.
+    Dijalankan di pool inferensi; span setiap tahap dicatat dalam satu trace.
+    """
+    with metrics.trace("ask"):
+        # Parafrase dari query yang pernah dijawab diambil dari cache semantik
+        with metrics.span("query_encode"):
+            query_embedding = embedding_batcher.encode(query)
+        cached_response = ask_semantic_cache.get(query_embedding, cache_version)
+        if cached_response is not None:
+            logger.info("Jawaban diambil dari cache semantik.")
+            metrics.inc("cascade_answers_total", branch="semantic_cache")
+            query_cache.put(query, cached_response, cache_version)
+            return cached_response
+
+        response, result = run_cascade(query, query_embedding)
+        if result.failed:
+            # Jawaban dari kaskade yang sebagian tahapnya gagal tidak disimpan: request berikutnya mencoba lagi
+            logger.warning("Jawaban tidak di-cache karena ada tahap kaskade yang gagal.")
+            return response
+        query_cache.put(query, response, cache_version)
+        ask_semantic_cache.put(query_embedding, response, cache_version)
+        return response
+
+def resolve_rag_question(question, cache_version):
+    """
+    Menjawab pertanyaan /rag melalui cache semantik atau pipeline RAG. Dijalankan di pool inferensi.
+    """
+    with metrics.trace("rag"):
+        with metrics.span("query_encode"):
+            question_embedding = embedding_batcher.encode(question)
+        answer = rag_semantic_cache.get(question_embedding, cache_version)
+        if answer is not None:
+            logger.info("Jawaban RAG diambil dari cache semantik.")
+            return answer
+        answer = rag_pipeline.answer_question(question)
+        if answer is None:
+            # Kegagalan tidak di-cache: request berikutnya mencoba lagi
+            return "Terjadi kesalahan pada pipeline RAG."
+        rag_semantic_cache.put(question_embedding, answer, cache_version)
+        return answer
+
+def overloaded_response(error):
+    """
+    Respons 503 (antrian penuh atau komponen masih dimuat) atau 504 (batas waktu) untuk pekerjaan inferensi.
+    """
+    if isinstance(error, PoolSaturatedError):
+        return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+    if isinstance(error, ComponentNotReadyError):
+        return jsonify({'error': str(error), 'components': error.components}), 503, {'Retry-After': '5'}
+    return jsonify({'error': str(error)}), 504
 
 @app.route('/ask', methods=['POST'])
-def ask():
+async def ask():
     try:
         data = request.get_json()  # Mengambil data JSON dari request
         if not isinstance(data, dict):
@@ -103,36 +505,120 @@ def ask():
 
         logger.info(f"Query diterima: {query}")
 
-        # Mencari jawaban dari knowledge base
-        kb_answer = get_answer_from_knowledge_base(query)
-
-        if kb_answer:
-            return jsonify({
-                'answer': f"<b>Gejala:</b> {kb_answer['gejala']}<br>"
-                          f"<b>Penyebab:</b> {kb_answer['penyebab']}<br>"
-                          f"<b>Solusi:</b> {kb_answer['solusi']}<br>",
-                'follow_up': "Apakah jawaban ini memadai? 😊"
-            })
-        else:
-            # Jika tidak ada jawaban dari knowledge base, fallback ke RAG atau QA model
-            logger.info("Tidak ada jawaban dari knowledge base, menggunakan RAG pipeline.")
-            rag_answer = rag_pipeline.retrieve_relevant_info(query)
-            if rag_answer:
-                return jsonify({
-                    'answer': f"<b>Informasi Relevan:</b> {rag_answer}<br>",
-                    'follow_up': "Apakah jawaban ini memadai? 😊"
-                })
-
-            logger.info("Fallback ke QA model.")
-            qa_answer = qa_model.answer_question(query)
-            return jsonify({'answer': qa_answer, 'follow_up': "Apakah jawaban ini memadai? 😊"})
+        # Query yang sama (setelah normalisasi) dijawab langsung dari cache tanpa memakai pool
+        cache_version = get_cache_version()
+        cached_response = query_cache.get(query, cache_version)
+        if cached_response is not None:
+            logger.info("Jawaban diambil dari cache.")
+            metrics.inc("cascade_answers_total", branch="cache")
+            return jsonify(cached_response)
+
+        warmup.require("embedding_model")
+        response = await inference_pool.run_async(resolve_query, query, cache_version)
+        return jsonify(response)
 
+    except (PoolSaturatedError, InferenceTimeoutError, ComponentNotReadyError) as e:
+        logger.warning(f"Endpoint /ask ditolak: {e}")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error pada endpoint /ask: {e}")
         return jsonify({'error': str(e)}), 500
 
+def sse_event(data, event=None):
+    """
+    Memformat satu event Server-Sent Events dengan payload JSON.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events, reservation):
+    """
+    Membungkus generator event menjadi respons text/event-stream tanpa buffering proxy.
+    Slot pool inferensi dilepas ketika respons ditutup, termasuk bila klien memutus koneksi.
+    """
+    response = Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(reservation.release)
+    return response
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """
+    Versi streaming dari /ask: jawaban dari cache, knowledge base atau RAG dikirim sebagai satu
+    event, sedangkan fallback QA model dikirim token demi token. Event terakhir bernama "done".
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Data yang diterima bukan format JSON yang valid.'}), 400
+
+    query = data.get('query', '').strip()
+    if not query:
+        return jsonify({'error': 'Query tidak boleh kosong.'}), 400
+
+    logger.info(f"Query streaming diterima: {query}")
+    try:
+        warmup.require("embedding_model")
+        reservation = inference_pool.reserve()
+    except (PoolSaturatedError, ComponentNotReadyError) as e:
+        logger.warning(f"Endpoint /ask/stream ditolak: {e}")
+        return overloaded_response(e)
+
+    def events():
+        try:
+            with reservation:
+                cache_version = get_cache_version()
+                response = query_cache.get(query, cache_version)
+                query_embedding = None
+                if response is not None:
+                    metrics.inc("cascade_answers_total", branch="cache")
+                else:
+                    with metrics.span("query_encode"):
+                        query_embedding = embedding_batcher.encode(query)
+                    response = ask_semantic_cache.get(query_embedding, cache_version)
+                    if response is not None:
+                        metrics.inc("cascade_answers_total", branch="semantic_cache")
+
+                if response is None:
+                    # Tahap QA model tidak dijalankan planner karena jawabannya di-stream di sini
+                    result = ask_cascade.run(query, query_embedding, skip=("qa_model",))
+                    qa_model_ready = warmup.is_ready("qa_model")
+                    relevant_info = None
+                    if not result.confident and qa_model_ready:
+                        relevant_info = qa_model.retrieve_relevant_info(
+                            query, query_embedding if faiss_shares_query_embedding else None
+                        )
+                    if relevant_info is not None:
+                        logger.info("Fallback ke QA model (streaming).")
+                        metrics.inc("cascade_answers_total", branch="qa_model")
+                        tokens = []
+                        for token in qa_model.generator.stream_answer(query, relevant_info):
+                            tokens.append(token)
+                            yield sse_event({'token': token})
+                        response = {
+                            'answer': "".join(tokens), 'follow_up': "Apakah jawaban ini memadai? 😊", 'stage': "qa_model"
+                        }
+                    else:
+                        require_cascade_answer(result, () if qa_model_ready else ("qa_model",))
+                        metrics.inc("cascade_answers_total", branch=result.stage or "none")
+                        response = cascade_response(result)
+
+                    # Streaming QA model yang gagal sudah keluar lewat exception; kaskade yang error tidak di-cache
+                    if not result.failed:
+                        query_cache.put(query, response, cache_version)
+                        ask_semantic_cache.put(query_embedding, response, cache_version)
+
+                yield sse_event(response, event='done')
+        except Exception as e:
+            logger.error(f"Error pada endpoint /ask/stream: {e}")
+            yield sse_event({'error': str(e)}, event='error')
+
+    return sse_response(events(), reservation)
+
 @app.route('/rag', methods=['POST'])
-def rag_query():
+async def rag_query():
     try:
         data = request.json  # Mengambil data JSON dari request
         if not isinstance(data, dict):
@@ -142,21 +628,188 @@ def rag_query():
         if not question:
             return jsonify({'error': 'Pertanyaan tidak boleh kosong'}), 400
 
-        answer = rag_pipeline.answer_question(question)
+        warmup.require("embedding_model", "rag_pipeline")
+        answer = await inference_pool.run_async(resolve_rag_question, question, get_cache_version())
         return jsonify({'question': question, 'answer': answer})
+    except (PoolSaturatedError, InferenceTimeoutError, ComponentNotReadyError) as e:
+        logger.warning(f"Endpoint /rag ditolak: {e}")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error pada endpoint /rag: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/rag/stream', methods=['POST'])
+def rag_stream():
+    """
+    Versi streaming dari /rag: setiap potongan jawaban dikirim sebagai event SSE begitu dihasilkan.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Data yang diterima bukan format JSON yang valid.'}), 400
+
+    question = data.get('question', '')
+    if not question:
+        return jsonify({'error': 'Pertanyaan tidak boleh kosong'}), 400
+
+    try:
+        warmup.require("embedding_model", "rag_pipeline")
+        reservation = inference_pool.reserve()
+    except (PoolSaturatedError, ComponentNotReadyError) as e:
+        logger.warning(f"Endpoint /rag/stream ditolak: {e}")
+        return overloaded_response(e)
+
+    def events():
+        try:
+            with reservation:
+                cache_version = get_cache_version()
+                question_embedding = embedding_batcher.encode(question)
+                answer = rag_semantic_cache.get(question_embedding, cache_version)
+                if answer is None:
+                    tokens = []
+                    for token in rag_pipeline.stream_answer(question):
+                        tokens.append(token)
+                        yield sse_event({'token': token})
+                    answer = "".join(tokens)
+                    rag_semantic_cache.put(question_embedding, answer, cache_version)
+                yield sse_event({'question': question, 'answer': answer}, event='done')
+        except Exception as e:
+            logger.error(f"Error pada endpoint /rag/stream: {e}")
+            yield sse_event({'error': str(e)}, event='error')
+
+    return sse_response(events(), reservation)
+
+@app.route('/rag/batch', methods=['POST'])
+async def rag_batch_query():
+    try:
+        data = request.get_json(silent=True)  # Mengambil data JSON dari request
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Data yang diterima bukan format JSON yang valid.'}), 400
+
+        questions = data.get('questions')
+        if not isinstance(questions, list) or not questions:
+            return jsonify({'error': 'Field questions harus berupa list yang tidak kosong.'}), 400
+        if not all(isinstance(question, str) and question.strip() for question in questions):
+            return jsonify({'error': 'Setiap pertanyaan harus berupa teks yang tidak kosong.'}), 400
+
+        warmup.require("rag_pipeline")
+        # Batas waktu batch diskalakan dengan jumlah batch generasi (16 pertanyaan per batch)
+        timeout = inference_pool.timeout_seconds * max(1, -(-len(questions) // 16))
+        answers = await inference_pool.run_async(
+            rag_pipeline.answer_questions, [question.strip() for question in questions], timeout=timeout
+        )
+        return jsonify({'questions': questions, 'answers': answers})
+    except (PoolSaturatedError, InferenceTimeoutError, ComponentNotReadyError) as e:
+        logger.warning(f"Endpoint /rag/batch ditolak: {e}")
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error pada endpoint /rag/batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def model_gauge(field):
+    """
+    Gauge berlabel per model yang dimuat registry (mis. parameter_bytes, load_seconds).
+    """
+    return lambda: [
+        ({'model': stats['name'], 'kind': stats['kind'], 'precision': stats['precision'] or ''}, stats[field])
+        for stats in model_registry.report()['models']
+    ] if model_registry is not None else None
+
+def faiss_index_file_bytes():
+    if not warmup.is_ready("qa_model"):
+        return None
+    path = qa_model.faiss_index_manager.index_path
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+# Ukuran model dan indeks dibaca saat /metrics di-scrape (kosong selama komponennya belum siap)
+metrics.gauge("model_parameter_bytes", model_gauge('parameter_bytes'))
+metrics.gauge("model_load_seconds", model_gauge('load_seconds'))
+metrics.gauge("process_resident_memory_bytes",
+              lambda: model_registry.report()['process_rss_bytes'] if model_registry is not None else None)
+metrics.gauge("knowledge_base_entries", lambda: [
+    ({'source': 'artifact'}, len(knowledge_base) if warmup.is_ready("knowledge_base") else None),
+    ({'source': 'rag_chunks'}, len(rag_pipeline.retriever.chunks) if warmup.is_ready("rag_pipeline") else None),
+])
+metrics.gauge("knowledge_base_embedding_bytes", lambda: [
+    ({'source': 'artifact'}, knowledge_base_embeddings.nbytes if warmup.is_ready("knowledge_base") else None),
+    ({'source': 'rag_chunks'},
+     rag_pipeline.retriever.embeddings.nbytes if warmup.is_ready("rag_pipeline") else None),
+])
+metrics.gauge("faiss_index_vectors",
+              lambda: qa_model.faiss_index_manager.index.ntotal if warmup.is_ready("qa_model") else None)
+metrics.gauge("faiss_index_file_bytes", faiss_index_file_bytes)
+metrics.gauge("inference_pool_requests", lambda: [
+    ({'status': status}, value) for status, value in inference_pool.stats().items()
+    if status in ('in_flight', 'completed', 'rejected', 'timeouts')
+])
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Metrik dalam format teks Prometheus: histogram latensi per tahap dan per endpoint,
+    counter cabang kaskade, serta ukuran model dan indeks.
+    """
+    try:
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error(f"Error pada endpoint /metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/debug', methods=['GET'])
 def debug():
     try:
         logger.info("Endpoint debug diakses.")
-        return jsonify({'status': 'Sistem berjalan dengan baik.', 'model': generation_model_name})
+        startup = warmup.status()
+        embedding_ready = warmup.is_ready("embedding_model")
+        qa_model_ready = warmup.is_ready("qa_model")
+        return jsonify({
+            'status': 'Sistem berjalan dengan baik.' if startup['ready'] else 'Sistem sedang memuat komponen.',
+            'startup': dict(startup, mode=startup_mode),
+            'model': generation_model_name,
+            'models': model_registry.report() if model_registry is not None else None,
+            'inference_pool': inference_pool.stats(),
+            'reranker': qa_model.reranker.stats() if qa_model_ready and qa_model.reranker is not None else None,
+            'stage_latency_seconds': metrics.stage_summary(),
+            'cascade': ask_cascade.stats(),
+            'query_cache': query_cache.stats(),
+            'encoder_cache': encoder_cache.stats() if encoder_cache is not None else None,
+            'decoding': decoding_policy.stats() if decoding_policy is not None else None,
+            'semantic_cache': {
+                'ask': ask_semantic_cache.stats() if embedding_ready else None,
+                'rag': rag_semantic_cache.stats() if embedding_ready else None
+            },
+            'embedding_batching': {
+                'query_embedding': embedding_batcher.stats() if embedding_ready else None,
+                'faiss_query': qa_model.faiss_index_manager.query_batcher.stats() if qa_model_ready else None
+            }
+        })
     except Exception as e:
         logger.error(f"Error pada endpoint /debug: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Health check ringan yang langsung dijawab sejak port dibuka, juga selama warmup;
+    'ready' bernilai true setelah seluruh komponen dimuat.
+    """
+    startup = warmup.status()
+    return jsonify({
+        'status': 'ok',
+        'ready': startup['ready'],
+        'components': {name: component['state'] for name, component in startup['components'].items()}
+    })
+
+if __name__ == '__mp_main__':
+    # Proses worker multiprocessing (spawn/forkserver, mis. ekstraksi PDF) mengimpor ulang modul ini
+    # sebagai __mp_main__ dan tidak membutuhkan model
+    pass
+elif startup_mode == "background":
+    # Dengan gunicorn, mode ini mematikan preload_app (lihat gunicorn.conf.py): thread warmup tidak ikut fork
+    warmup.start()
+else:
+    warmup.run(raise_on_error=True)
+
 if __name__ == '__main__':
+    # Mode produksi: gunicorn -c gunicorn.conf.py sistem_pakar_backend:app
     logger.info("Sistem pakar backend berjalan pada mode debug.")
     app.run(host='0.0.0.0', port=5000, debug=True)
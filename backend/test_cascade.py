@@ -0,0 +1,27 @@
+import time
+from cascade import CascadePlanner, CascadeStage
+
+
+def test_slow_sample_does_not_disable_stage():
+    calls = []
+
+    def slow_once(query, query_embedding):
+        # Panggilan pertama lambat (model masih dingin), berikutnya cepat
+        if not calls:
+            time.sleep(0.2)
+        calls.append(query)
+        return {"answer": query}, 1.0
+
+    planner = CascadePlanner([
+        CascadeStage("cheap", lambda query, query_embedding: None),
+        CascadeStage("expensive", slow_once),
+    ], latency_budget_ms=50.0)
+
+    assert planner.run("pertama").stage == "expensive"
+    decisions = [planner.run(f"q{i}").decisions[-1]["decision"] for i in range(10)]
+
+    assert decisions[0] == "skipped_budget"
+    assert "answered" in decisions
+    # Setelah sampel cepat masuk, perkiraan biaya tetap di bawah anggaran
+    assert decisions[-1] == "answered"
+    assert len(calls) > 1
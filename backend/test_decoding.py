@@ -0,0 +1,64 @@
+import time
+import pytest
+import torch
+from decoding import DecodingPolicy
+from inference_pool import InferencePool
+
+
+def prompt_inputs(tokenizer, texts):
+    return tokenizer(texts, return_tensors="pt", padding=True)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        DecodingPolicy(mode="sampling")
+
+
+def test_new_token_budget_follows_the_input_length():
+    policy = DecodingPolicy(min_new_tokens=4, max_new_tokens=20, context_ratio=0.5)
+
+    assert policy.new_token_budget(torch.ones(2, 3)) == 4
+    # Masukan terpanjang di batch yang menentukan
+    assert policy.new_token_budget(torch.tensor([[1] * 5 + [0] * 7, [1] * 12])) == 6
+    assert policy.new_token_budget(torch.ones(1, 100)) == 20
+
+
+def test_greedy_mode_never_escalates(tiny_t5):
+    tokenizer, model = tiny_t5
+    policy = DecodingPolicy(mode="greedy", min_new_tokens=2, max_new_tokens=4, escalate_confidence=1.1)
+
+    sequences = policy.generate(model, prompt_inputs(tokenizer, ["aki lemah", "rem aus"]))
+
+    assert len(sequences) == 2
+    stats = policy.stats()
+    assert stats["escalations"] == {}
+    assert list(stats["policies"]) == ["greedy"]
+
+
+def test_low_confidence_answers_are_rerun_with_beam_search(tiny_t5):
+    tokenizer, model = tiny_t5
+    # Confidence tidak pernah di atas 1, jadi setiap jawaban greedy dieskalasi
+    policy = DecodingPolicy(min_new_tokens=2, max_new_tokens=4, escalate_confidence=1.1, escalate_beams=2)
+    inputs = prompt_inputs(tokenizer, ["aki lemah", "rem aus"])
+
+    sequences = policy.generate(model, inputs)
+
+    beam = model.generate(**inputs, max_new_tokens=4, num_beams=2, early_stopping=True)
+    assert [sequence.tolist() for sequence in sequences] == beam.tolist()
+    stats = policy.stats()
+    assert stats["policies"]["greedy"]["answers"] == 2
+    assert stats["policies"]["beam"]["answers"] == 2
+    assert sum(stats["escalations"].values()) == 2
+
+
+def test_escalation_is_skipped_after_the_request_deadline(tiny_t5):
+    tokenizer, model = tiny_t5
+    policy = DecodingPolicy(min_new_tokens=2, max_new_tokens=4, escalate_confidence=1.1)
+
+    with InferencePool(max_workers=1, max_queue=0).reserve(timeout=0.001):
+        time.sleep(0.01)
+        policy.generate(model, prompt_inputs(tokenizer, ["aki lemah"]))
+
+    stats = policy.stats()
+    assert stats["escalations"] == {"skipped_deadline": 1}
+    assert "beam" not in stats["policies"]
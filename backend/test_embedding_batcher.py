@@ -0,0 +1,69 @@
+import threading
+import numpy as np
+import pytest
+from embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[float(text.split()[-1])] for text in texts], dtype=np.float32)
+
+
+def encode_concurrently(batcher, count):
+    results = {}
+    barrier = threading.Barrier(count)
+
+    def request(i):
+        barrier.wait()
+        results[i] = batcher.encode(f"query {i}", timeout=5)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_queries_share_a_batch_and_get_their_own_rows():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=200.0)
+    try:
+        results = encode_concurrently(batcher, 8)
+    finally:
+        batcher.close()
+
+    assert {i: float(vector[0]) for i, vector in results.items()} == {i: float(i) for i in range(8)}
+    assert len(encoder.batches) < 8
+    assert batcher.stats()["batch_size"]["count"] == len(encoder.batches)
+
+
+def test_batches_do_not_exceed_max_batch_size():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=3, max_wait_ms=200.0)
+    try:
+        matrix = batcher.encode_many([f"query {i}" for i in range(7)], timeout=5)
+    finally:
+        batcher.close()
+
+    np.testing.assert_array_equal(matrix[:, 0], np.arange(7, dtype=np.float32))
+    assert [len(batch) for batch in encoder.batches] == [3, 3, 1]
+
+
+def test_encode_error_reaches_every_waiting_request():
+    def failing(texts):
+        raise RuntimeError("encoder gagal")
+
+    batcher = EmbeddingBatcher(failing, max_wait_ms=50.0)
+    futures = [batcher.submit(f"query {i}") for i in range(3)]
+    batcher.close()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="encoder gagal"):
+            future.result(timeout=5)
+    with pytest.raises(RuntimeError):
+        batcher.submit("query 4")
@@ -0,0 +1,52 @@
+import torch
+from encoder_cache import EncoderCache
+from generation import AnswerGenerator
+
+
+def states(rows, d_model=4):
+    # float32: 16 byte per baris
+    return torch.zeros(rows, d_model)
+
+
+def test_least_recently_used_context_is_evicted_first():
+    cache = EncoderCache(max_entries=2)
+    cache.put("a", states(1))
+    cache.put("b", states(1))
+    assert cache.get("a") is not None  # "b" sekarang yang paling lama tidak dipakai
+
+    cache.put("c", states(1))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_budget_bounds_the_cache():
+    cache = EncoderCache(max_bytes=64)
+    cache.put("a", states(2))
+    cache.put("b", states(2))
+    cache.put("c", states(1))
+    cache.put("besar", states(5))  # lebih besar dari seluruh anggaran: tidak disimpan
+
+    stats = cache.stats()
+    assert stats["bytes"] == 48
+    assert stats["entries"] == 2
+    assert cache.get("a") is None and cache.get("besar") is None
+
+
+def test_repeated_context_is_encoded_once(tiny_t5):
+    tokenizer, model = tiny_t5
+    cache = EncoderCache()
+    generator = AnswerGenerator(tokenizer, model, encoder_cache=cache)
+    encoded = []
+    encode = generator._encode
+    generator._encode = lambda texts: encoded.extend(texts) or encode(texts)
+    context = "aki lemah karena alternator rusak"
+
+    first = generator.generate_answers(["kenapa aki lemah"], [context], max_length=8, num_beams=1)
+    second = generator.generate_answers(["kenapa aki lemah", "aki mati"], [context, context], max_length=8, num_beams=1)
+
+    # Konteks di-encode sekali; pertanyaan selalu di-encode
+    assert [text for text in encoded if text.startswith("context:")] == [f"context: {context}"]
+    assert cache.stats()["hits"] == 2
+    assert second[0] == first[0]
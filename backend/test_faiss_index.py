@@ -0,0 +1,159 @@
+import hashlib
+import faiss
+import numpy as np
+import pytest
+import faiss_index
+from faiss_index import FAISSIndexManager
+
+
+def fake_embeddings(texts):
+    # Vektor ternormalisasi yang deterministik per teks
+    vectors = np.stack([
+        np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8)[:8].astype(np.float32) + 1.0
+        for text in texts
+    ])
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def make_manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(faiss_index.registry, "get_encoder", lambda *args, **kwargs: (None, None))
+    managers = []
+
+    def make(pdf_entries=None, **kwargs):
+        kwargs.setdefault("retrieval_mode", "dense")
+        manager = FAISSIndexManager(
+            index_path=str(tmp_path / "faiss_index"), knowledge_base_path=str(tmp_path / "kb.pdf"),
+            embedding_dim=8, **kwargs
+        )
+        manager.generate_embeddings = fake_embeddings
+        if pdf_entries is not None:
+            (tmp_path / "kb.pdf").write_bytes(b"%PDF-1.4")
+            manager.load_knowledge_base_from_pdf = lambda: list(pdf_entries)
+        manager.load_or_create_index()
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.query_batcher.close()
+
+
+def test_entries_sharing_a_gejala_keep_their_own_rows(make_manager):
+    manager = make_manager()
+    entries = [
+        {"gejala": "aki cepat habis", "penyebab": "alternator lemah", "solusi": "ganti alternator"},
+        {"gejala": "aki cepat habis", "penyebab": "aki aus", "solusi": "ganti aki"},
+        {"gejala": "aki cepat habis", "penyebab": "aki aus", "solusi": "ganti aki"},
+    ]
+
+    report = manager.add_to_index(entries)
+
+    assert report["added"] == 3
+    assert manager.index.ntotal == 3
+    results, _ = manager.search_index("aki", top_k=3, min_score=-1.0, query_embedding=fake_embeddings(["aki"])[0])
+    assert sorted(result["penyebab"] for result in results) == ["aki aus", "aki aus", "alternator lemah"]
+
+    # Sinkronisasi ulang tanpa perubahan tidak menambah atau menghapus apa pun
+    assert manager.add_to_index(entries) == {"added": 0, "updated": 0, "removed": 0, "skipped": 3}
+
+
+ENTRIES = [
+    {"gejala": "aki cepat habis", "penyebab": "alternator lemah", "solusi": "ganti alternator"},
+    {"gejala": "rem berdecit", "penyebab": "kampas rem aus", "solusi": "ganti kampas rem"},
+    {"gejala": "mesin bergetar", "penyebab": "busi kotor", "solusi": "bersihkan busi"},
+]
+
+
+def test_index_with_another_metric_is_rebuilt(make_manager):
+    legacy = make_manager(metric="l2")
+    legacy.add_to_index(ENTRIES)
+    assert legacy.index.metric_type == faiss.METRIC_L2
+
+    manager = make_manager(metric="ip", pdf_entries=ENTRIES)
+
+    assert manager.index.metric_type == faiss.METRIC_INNER_PRODUCT
+    assert manager.index.ntotal == len(ENTRIES)
+    query = fake_embeddings([ENTRIES[1]["gejala"]])[0]
+    results, scores = manager.search_index("rem", top_k=3, min_score=0.999, query_embedding=query)
+    assert [result["penyebab"] for result in results] == ["kampas rem aus"]
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_index_with_another_metric_is_not_served_without_pdf(make_manager):
+    make_manager(metric="l2").add_to_index(ENTRIES)
+
+    with pytest.raises(ValueError):
+        make_manager(metric="ip")
+
+
+def test_index_resynced_by_another_process_is_reloaded(make_manager):
+    writer = make_manager()
+    reader = make_manager()
+    writer.add_to_index(ENTRIES[:2])
+    query = fake_embeddings([ENTRIES[0]["gejala"]])[0]
+    results, _ = reader.search_index("aki", top_k=1, min_score=0.999, query_embedding=query)
+    assert [result["penyebab"] for result in results] == ["alternator lemah"]
+
+    # Proses lain menambahkan entri baru: vektor dan metadata harus dimuat ulang bersamaan
+    writer.add_to_index(ENTRIES)
+    query = fake_embeddings([ENTRIES[2]["gejala"]])[0]
+    results, scores = reader.search_index("mesin", top_k=1, min_score=0.999, query_embedding=query)
+
+    assert reader.index.ntotal == len(ENTRIES)
+    assert [result["penyebab"] for result in results] == ["busi kotor"]
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_ivf_sizes_are_clamped_to_the_training_data():
+    ivf = faiss.downcast_index(faiss_index.create_faiss_index("ivf_flat", 8, num_vectors=100, nlist=100))
+    pq = faiss.downcast_index(faiss_index.create_faiss_index("ivf_pq", 8, num_vectors=100, pq_m=4, pq_nbits=8))
+
+    assert isinstance(ivf, faiss.IndexIVFFlat)
+    assert ivf.nlist == 2
+    assert isinstance(pq, faiss.IndexIVFPQ)
+    assert pq.pq.M == 4 and pq.pq.nbits == 6
+    assert isinstance(faiss_index.create_faiss_index("hnsw", 8), faiss.IndexHNSWFlat)
+    assert faiss_index.create_faiss_index("flat", 8, metric="l2").metric_type == faiss.METRIC_L2
+    with pytest.raises(ValueError):
+        faiss_index.create_faiss_index("ivf_pq", 8, pq_m=3)
+    with pytest.raises(ValueError):
+        faiss_index.create_faiss_index("lsh", 8)
+
+
+def test_search_params_follow_the_index_type():
+    ivf = faiss_index.create_faiss_index("ivf_flat", 8, num_vectors=100)
+    hnsw = faiss_index.create_faiss_index("hnsw", 8)
+
+    assert faiss_index.make_search_params(faiss_index.create_faiss_index("flat", 8), nprobe=8) is None
+    # nprobe tidak boleh melebihi jumlah list IVF
+    assert faiss_index.make_search_params(ivf, nprobe=8).nprobe == 2
+    assert faiss_index.make_search_params(faiss.IndexIDMap2(hnsw), ef_search=16).efSearch == 16
+
+
+# IVF-PQ tidak diuji di sini: kode PQ dari tiga vektor latih terlalu kasar untuk kecocokan persis
+@pytest.mark.parametrize("index_type, index_class", [
+    ("flat", faiss.IndexFlatIP), ("ivf_flat", faiss.IndexIVFFlat), ("hnsw", faiss.IndexHNSWFlat),
+])
+def test_every_index_type_finds_an_exact_match(make_manager, index_type, index_class):
+    manager = make_manager(index_type=index_type)
+    manager.add_to_index(ENTRIES)
+
+    query = fake_embeddings([ENTRIES[2]["gejala"]])[0]
+    results, _ = manager.search_index("mesin", top_k=1, min_score=-1.0, query_embedding=query)
+
+    assert isinstance(faiss.downcast_index(manager.index.index), index_class)
+    assert [result["penyebab"] for result in results] == ["busi kotor"]
+
+
+def test_hybrid_faiss_search_keeps_exact_term_matches(make_manager):
+    manager = make_manager(retrieval_mode="hybrid")
+    manager.add_to_index(ENTRIES)
+    # Embedding query sengaja menunjuk entri lain; hanya istilahnya yang cocok dengan "busi kotor"
+    query = fake_embeddings([ENTRIES[0]["gejala"]])[0]
+
+    dense, _ = manager.search_index("busi kotor", top_k=3, min_score=0.999, query_embedding=query, mode="dense")
+    hybrid, _ = manager.search_index("busi kotor", top_k=3, min_score=0.999, query_embedding=query)
+
+    assert [result["penyebab"] for result in dense] == ["alternator lemah"]
+    assert sorted(result["penyebab"] for result in hybrid) == ["alternator lemah", "busi kotor"]
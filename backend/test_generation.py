@@ -0,0 +1,59 @@
+import pytest
+import torch
+from generation import AnswerGenerator
+
+
+class FakeTokenizer:
+    """Tokenizer tiruan: setiap prompt menjadi satu token berisi posisinya di daftar ``texts``."""
+
+    def __init__(self):
+        self.texts = []
+        self.batches = []
+
+    def __call__(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        ids = []
+        for text in texts:
+            self.texts.append(text)
+            ids.append([len(self.texts) - 1])
+        return FakeEncoding(input_ids=torch.tensor(ids), attention_mask=torch.ones(len(ids), 1, dtype=torch.long))
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [self.texts[int(sequence[0])] for sequence in sequences]
+
+
+class FakeEncoding(dict):
+    def to(self, device):
+        return self
+
+
+class EchoModel:
+    """Model tiruan yang "menjawab" dengan prompt-nya sendiri."""
+
+    device = "cpu"
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        return input_ids
+
+
+def test_batched_answers_come_back_in_input_order():
+    tokenizer = FakeTokenizer()
+    generator = AnswerGenerator(tokenizer, EchoModel())
+    questions = ["q-panjang sekali", "q", "q-sedang"]
+    contexts = ["konteks yang cukup panjang", "k", "konteks"]
+
+    answers = generator.generate_answers(questions, contexts, max_length=20, num_beams=1, batch_size=2)
+
+    assert answers == [AnswerGenerator.build_prompt(q, c) for q, c in zip(questions, contexts)]
+    # Prompt diurutkan menurut panjang sebelum dibagi ke batch agar padding minimal
+    assert tokenizer.batches == [
+        [AnswerGenerator.build_prompt("q", "k"), AnswerGenerator.build_prompt("q-sedang", "konteks")],
+        [AnswerGenerator.build_prompt(questions[0], contexts[0])],
+    ]
+
+
+def test_questions_and_contexts_must_pair_up():
+    generator = AnswerGenerator(FakeTokenizer(), EchoModel())
+
+    with pytest.raises(ValueError):
+        generator.generate_answers(["q1", "q2"], ["k1"], max_length=20)
@@ -0,0 +1,50 @@
+import threading
+import time
+import pytest
+from inference_pool import InferencePool, InferenceTimeoutError, PoolSaturatedError, current_deadline
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    pool = InferencePool(max_workers=1, max_queue=1, timeout_seconds=5)
+    release = threading.Event()
+    running = pool.submit(release.wait, 5)
+    queued = pool.submit(lambda: "antri")
+
+    with pytest.raises(PoolSaturatedError):
+        pool.submit(lambda: "ditolak")
+
+    release.set()
+    assert running.result(5) is True
+    assert queued.result(5) == "antri"
+    # Slot dilepas setelah pekerjaan selesai
+    assert pool.run(lambda: "lagi") == "lagi"
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_job_sees_its_deadline_and_slow_jobs_time_out():
+    pool = InferencePool(max_workers=1, max_queue=0, timeout_seconds=5)
+
+    deadline = pool.run(current_deadline, timeout=2)
+    assert 0 < deadline - time.monotonic() <= 2
+    assert current_deadline() is None
+
+    with pytest.raises(InferenceTimeoutError):
+        pool.run(time.sleep, 0.5, timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_reservation_holds_a_slot_until_released():
+    pool = InferencePool(max_workers=1, max_queue=0)
+    reservation = pool.reserve()
+
+    with pytest.raises(PoolSaturatedError):
+        pool.reserve()
+    with reservation:
+        assert current_deadline() == reservation.deadline
+    reservation.release()  # pelepasan kedua tidak berpengaruh
+
+    assert current_deadline() is None
+    assert pool.stats()["in_flight"] == 0
+    pool.reserve().release()
@@ -0,0 +1,89 @@
+import threading
+import time
+import types
+import numpy as np
+import kb_artifact
+from kb_artifact import ArtifactWatcher, build_artifact, load_artifact
+from query_cache import QueryCache
+
+
+class FakeSentenceTransformer:
+    def __init__(self):
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        time.sleep(0.2)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def make_entries(count, suffix=""):
+    return [{"gejala": f"gejala {i}{suffix}", "penyebab": f"penyebab {i}", "solusi": f"solusi {i}"}
+            for i in range(count)]
+
+
+def use_fake_model(monkeypatch, entries):
+    model = FakeSentenceTransformer()
+    monkeypatch.setattr(kb_artifact, "registry", types.SimpleNamespace(
+        precision="fp32", get_sentence_transformer=lambda name: model
+    ))
+    monkeypatch.setattr(kb_artifact, "iter_knowledge_base", lambda path: iter(entries))
+    return model
+
+
+def test_concurrent_builds_share_one_version(monkeypatch, tmp_path):
+    entries = make_entries(3)
+    model = use_fake_model(monkeypatch, entries)
+    pdf_path = tmp_path / "kb.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    artifact_dir = str(tmp_path / "artifact")
+
+    # Seperti worker gunicorn tanpa preload_app yang memuat knowledge base bersamaan
+    manifests, errors = [], []
+
+    def build():
+        try:
+            manifests.append(build_artifact(str(pdf_path), artifact_dir, "fake"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len({manifest["version"] for manifest in manifests}) == 1
+    assert model.calls == 1
+    loaded, embeddings, _ = load_artifact(artifact_dir)
+    assert loaded == entries
+    assert embeddings.shape == (3, 4)
+
+
+def test_rebuilt_knowledge_base_misses_query_cache(monkeypatch, tmp_path):
+    use_fake_model(monkeypatch, make_entries(2))
+    pdf_path = tmp_path / "kb.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 lama")
+    artifact_dir = str(tmp_path / "artifact")
+    build_artifact(str(pdf_path), artifact_dir, "fake")
+
+    watcher = ArtifactWatcher(artifact_dir)
+    watcher.load()
+    cache = QueryCache()
+    cache.put("apa penyebab gejala 0?", {"answer": "penyebab 0"}, watcher.version)
+    assert not watcher.changed()
+    assert cache.get("apa penyebab gejala 0?", watcher.version) == {"answer": "penyebab 0"}
+
+    # PDF diperbarui dan artefak dibangun ulang (mis. oleh `kb_artifact.py build` di proses lain)
+    use_fake_model(monkeypatch, make_entries(3, " baru"))
+    pdf_path.write_bytes(b"%PDF-1.4 baru")
+    build_artifact(str(pdf_path), artifact_dir, "fake")
+
+    assert watcher.changed()
+    entries, _, _ = watcher.load()
+    assert len(entries) == 3
+    assert cache.get("apa penyebab gejala 0?", watcher.version) is None
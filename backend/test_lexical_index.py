@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    10: "aki cepat habis karena alternator lemah",
+    20: "rem berdecit karena kampas rem aus",
+    30: "AC tidak dingin karena freon habis",
+    40: "mesin bergetar karena busi kotor",
+}
+
+
+def make_index():
+    return BM25Index(list(DOCS), list(DOCS.values()))
+
+
+def test_tokenize_drops_stopwords_but_keeps_negation():
+    assert tokenize("Kenapa AC tidak dingin, apakah freon habis?") == ["ac", "tidak", "dingin", "freon", "habis"]
+
+
+def test_search_returns_only_documents_with_query_terms():
+    ids, scores = make_index().search("busi mobil kotor", top_k=5)
+
+    assert ids.tolist() == [40]
+    assert scores[0] > 0
+
+
+def test_rarer_and_repeated_terms_rank_higher():
+    index = make_index()
+
+    # "habis" muncul di dua dokumen, "alternator" hanya di satu
+    ids, _ = index.search("alternator habis")
+    assert ids.tolist() == [10, 30]
+    # Pada panjang dokumen yang sama, frekuensi istilah ikut menaikkan skor
+    scores = BM25Index([1, 2], ["rem busi", "rem rem"]).score("rem")
+    assert scores[1] > scores[0] > 0
+
+
+def test_top_k_limits_the_results():
+    ids, scores = make_index().search("habis rem busi", top_k=2)
+
+    assert np.count_nonzero(make_index().score("habis rem busi")) == 4
+    assert len(ids) == 2
+    assert scores[0] >= scores[1]
+
+
+def test_coverage_is_the_idf_weighted_share_of_query_terms():
+    coverage = make_index().coverage("freon habis", [30, 10, 99])
+
+    assert coverage[30] == pytest.approx(1.0)
+    assert 0.0 < coverage[10] < 0.5
+    assert 99 not in coverage
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2, 4]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
@@ -0,0 +1,56 @@
+import pytest
+from metrics import MetricsRegistry, current_trace
+
+
+def test_spans_feed_the_active_trace_and_the_stage_histogram():
+    registry = MetricsRegistry()
+
+    with registry.trace("ask") as trace:
+        assert current_trace() is trace
+        with registry.span("query_encode"):
+            pass
+        with registry.span("kb_scan"):
+            pass
+    with registry.span("generate"):
+        pass  # di luar trace hanya masuk histogram
+
+    assert current_trace() is None
+    assert [stage for stage, _ in trace.spans] == ["query_encode", "kb_scan"]
+    assert sorted(registry.stage_summary()) == ["generate", "kb_scan", "query_encode"]
+    assert registry.histogram("request_latency_seconds", endpoint="ask").count == 1
+
+
+def test_span_is_recorded_when_the_stage_raises():
+    registry = MetricsRegistry()
+
+    with pytest.raises(RuntimeError):
+        with registry.span("generate"):
+            raise RuntimeError("generate gagal")
+
+    assert registry.stage_summary()["generate"]["count"] == 1
+
+
+def test_prometheus_text_has_cumulative_buckets_counters_and_gauges():
+    registry = MetricsRegistry(latency_buckets=(0.1, 1))
+    registry.observe("stage_latency_seconds", 0.05, stage="kb_scan")
+    registry.observe("stage_latency_seconds", 0.5, stage="kb_scan")
+    registry.inc("cascade_answers_total", branch="knowledge_base")
+    registry.inc("cascade_answers_total", 2, branch="knowledge_base")
+    registry.gauge("faiss_index_vectors", lambda: 42)
+    registry.gauge("component_ready", lambda: [({"component": 'qa"model'}, 1), ({"component": "rag"}, None)])
+    registry.gauge("faiss_index_file_bytes", lambda: 1 / 0)
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert "# TYPE sistem_pakar_stage_latency_seconds histogram" in lines
+    assert 'sistem_pakar_stage_latency_seconds_bucket{stage="kb_scan",le="0.1"} 1' in lines
+    assert 'sistem_pakar_stage_latency_seconds_bucket{stage="kb_scan",le="1.0"} 2' in lines
+    assert 'sistem_pakar_stage_latency_seconds_bucket{stage="kb_scan",le="+Inf"} 2' in lines
+    assert 'sistem_pakar_stage_latency_seconds_count{stage="kb_scan"} 2' in lines
+    assert "# TYPE sistem_pakar_cascade_answers_total counter" in lines
+    assert 'sistem_pakar_cascade_answers_total{branch="knowledge_base"} 3' in lines
+    assert "sistem_pakar_faiss_index_vectors 42" in lines
+    # Nilai label di-escape; sampel None dan gauge yang error dilewati
+    assert 'sistem_pakar_component_ready{component="qa\\"model"} 1' in lines
+    assert not any(line.startswith("sistem_pakar_component_ready{component=\"rag\"") for line in lines)
+    assert not any("faiss_index_file_bytes" in line for line in lines)
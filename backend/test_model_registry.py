@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+import torch
+import model_registry
+from model_registry import EMBEDDING_MODEL_NAME, ModelRegistry
+
+
+class FakeSentenceTransformer:
+    loads = []
+
+    def __init__(self, model_name, device=None):
+        # Muat yang lambat agar thread lain sempat meminta model yang sama
+        time.sleep(0.05)
+        self.loads.append((model_name, device))
+
+
+def test_concurrent_requests_load_each_model_once(monkeypatch):
+    FakeSentenceTransformer.loads = []
+    monkeypatch.setattr(model_registry, "SentenceTransformer", FakeSentenceTransformer)
+    registry = ModelRegistry(precision="fp32")
+    models = []
+
+    threads = [
+        threading.Thread(target=lambda: models.append(registry.get_sentence_transformer(device="cpu")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeSentenceTransformer.loads == [(EMBEDDING_MODEL_NAME, "cpu")]
+    assert all(model is models[0] for model in models)
+    # Nama pendek menunjuk ke model yang sama
+    assert registry.get_sentence_transformer("all-MiniLM-L6-v2", device="cpu") is models[0]
+    assert [stats["name"] for stats in registry.report()["models"]] == [EMBEDDING_MODEL_NAME]
+
+
+def test_different_devices_are_separate_models(monkeypatch):
+    FakeSentenceTransformer.loads = []
+    monkeypatch.setattr(model_registry, "SentenceTransformer", FakeSentenceTransformer)
+    registry = ModelRegistry(precision="fp32")
+
+    assert registry.get_sentence_transformer(device="cpu") is not registry.get_sentence_transformer(device="meta")
+    assert len(FakeSentenceTransformer.loads) == 2
+
+
+class FakeSeq2SeqModel:
+    @staticmethod
+    def from_pretrained(model_name):
+        return torch.nn.Sequential(torch.nn.Linear(16, 16))
+
+
+def test_int8_precision_quantizes_linear_layers_on_cpu(monkeypatch):
+    monkeypatch.setattr(model_registry, "AutoModelForSeq2SeqLM", FakeSeq2SeqModel)
+    registry = ModelRegistry(precision="int8")
+
+    quantized = registry.get_seq2seq_model("fake", device="cpu")
+    full = registry.get_seq2seq_model("fake", device="cpu", precision="fp32")
+
+    assert isinstance(quantized[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert isinstance(full[0], torch.nn.Linear)
+    stats = {model["precision"]: model for model in registry.report()["models"]}
+    # Bobot int8 (packed params) ikut terhitung dan lebih kecil dari fp32
+    assert 0 < stats["int8"]["parameter_bytes"] < stats["fp32"]["parameter_bytes"]
+
+
+def test_int8_precision_falls_back_to_fp32_off_cpu():
+    registry = ModelRegistry(precision="int8")
+
+    assert registry.resolve_precision(None, "cpu") == "int8"
+    assert registry.resolve_precision(None, "cuda") == "fp32"
+
+
+def test_unknown_precision_is_rejected(monkeypatch):
+    monkeypatch.setenv("MODEL_PRECISION", "fp16")
+
+    with pytest.raises(ValueError):
+        ModelRegistry()
+    with pytest.raises(ValueError):
+        ModelRegistry(precision="fp32").resolve_precision("bf16", "cpu")
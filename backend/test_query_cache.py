@@ -0,0 +1,123 @@
+import numpy as np
+import query_cache
+from query_cache import QueryCache, SemanticQueryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_equivalent_queries_share_an_entry():
+    cache = QueryCache()
+    cache.put("Apa penyebab aki lemah?", {"answer": "alternator"})
+
+    assert cache.get("  apa PENYEBAB aki   lemah ") == {"answer": "alternator"}
+    assert cache.get("apa penyebab rem aus") is None
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    cache = QueryCache(ttl_seconds=60)
+    cache.put("aki lemah", {"answer": "alternator"})
+
+    clock.now += 59
+    assert cache.get("aki lemah") == {"answer": "alternator"}
+    clock.now += 2
+    assert cache.get("aki lemah") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put("aki lemah", 1)
+    cache.put("rem aus", 2)
+    cache.get("aki lemah")
+
+    cache.put("busi kotor", 3)
+
+    assert cache.get("rem aus") is None
+    assert cache.get("aki lemah") == 1 and cache.get("busi kotor") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_budget_bounds_the_cache():
+    cache = QueryCache(max_bytes=40)
+    cache.put("aki", "a" * 10)  # 3 + 12 byte
+    cache.put("rem", "b" * 10)
+    cache.put("busi", "c" * 40)  # lebih besar dari seluruh anggaran: tidak disimpan
+    cache.put("ac", "d" * 10)  # 2 + 12 byte: "aki" dieviksi
+
+    stats = cache.stats()
+    assert stats["bytes"] == 29
+    assert cache.get("busi") is None and cache.get("aki") is None
+    assert cache.get("rem") == "b" * 10
+
+
+def test_version_change_clears_the_cache():
+    cache = QueryCache()
+    cache.put("aki lemah", {"answer": "alternator"}, version=("kb-1", 1, 3))
+
+    assert cache.get("aki lemah", version=("kb-1", 1, 3)) == {"answer": "alternator"}
+    assert cache.get("aki lemah", version=("kb-2", 1, 3)) is None
+    assert cache.get("aki lemah", version=("kb-1", 1, 3)) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_paraphrase_within_max_distance_reuses_the_answer():
+    cache = SemanticQueryCache(3, max_distance=0.05)
+    cache.put(unit(1, 0, 0), "alternator")
+
+    # Jarak cosine ~0.005: dianggap parafrase; ~0.29: pertanyaan lain
+    assert cache.get(unit(1, 0.1, 0) * 7) == "alternator"
+    assert cache.get(unit(1, 1, 0)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_near_duplicate_put_overwrites_its_slot():
+    cache = SemanticQueryCache(3, capacity=4)
+    cache.put(unit(1, 0, 0), "lama")
+    cache.put(unit(1, 0.01, 0), "baru")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.get(unit(1, 0, 0)) == "baru"
+
+
+def test_least_recently_used_slot_is_evicted_when_full(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    cache = SemanticQueryCache(3, capacity=2)
+    cache.put(unit(1, 0, 0), "aki")
+    clock.now += 1
+    cache.put(unit(0, 1, 0), "rem")
+    clock.now += 1
+    cache.get(unit(1, 0, 0))
+
+    clock.now += 1
+    cache.put(unit(0, 0, 1), "busi")
+
+    assert cache.get(unit(0, 1, 0)) is None
+    assert cache.get(unit(1, 0, 0)) == "aki" and cache.get(unit(0, 0, 1)) == "busi"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_and_outdated_entries_are_not_served(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    cache = SemanticQueryCache(3, ttl_seconds=60)
+    cache.put(unit(1, 0, 0), "aki", version="v1")
+
+    assert cache.get(unit(1, 0, 0), version="v2") is None
+    cache.put(unit(1, 0, 0), "aki", version="v2")
+    clock.now += 61
+    assert cache.get(unit(1, 0, 0), version="v2") is None
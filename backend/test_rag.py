@@ -1,13 +1,18 @@
-from rag_pipeline import RAGPipeline
+import os
+from rag_pipeline import RagPipeline
 
-# Inisialisasi pipeline dengan jalur ke knowledge_base.json
-pipeline = RAGPipeline('knowledge_base.json')
+if __name__ == "__main__":
+    # Inisialisasi pipeline dengan jalur ke PDF knowledge base (bisa diganti lewat env PDF_PATH)
+    pdf_path = os.environ.get(
+        "PDF_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "penyakit_telinga.pdf")
+    )
+    pipeline = RagPipeline(pdf_path)
 
-# Tes query
-query = "Apa itu sistem injeksi bahan bakar?"
-results = pipeline.retrieve_documents(query)
+    # Tes query
+    query = "Apa itu sistem injeksi bahan bakar?"
+    results = pipeline.retriever.retrieve_top_k(query, top_k=3)
 
-# Tampilkan hasil
-print("Hasil pencarian untuk query:", query)
-for doc, score in results:
-    print(f"Dokumen: {doc} | Skor: {score}")
+    # Tampilkan hasil
+    print("Hasil pencarian untuk query:", query)
+    for doc, score in results:
+        print(f"Dokumen: {doc} | Skor: {score}")
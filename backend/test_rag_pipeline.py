@@ -0,0 +1,89 @@
+import hashlib
+import numpy as np
+import rag_pipeline
+from rag_pipeline import KnowledgeBaseRetriever
+
+
+def make_retriever(text, spans):
+    retriever = KnowledgeBaseRetriever.__new__(KnowledgeBaseRetriever)
+    retriever.page_texts = [text]
+    retriever.chunks = [{"page": 0, "start": start, "end": end} for start, end in spans]
+    return retriever
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_pack_context_merges_chunk_bridging_two_spans():
+    text = " ".join(f"w{i}" for i in range(30))
+    # Offset karakter setiap kata agar chunk mulai dan berakhir di batas kata
+    starts = [text.index(f"w{i} ") if i < 29 else text.index("w29") for i in range(30)]
+    a = (starts[0], starts[10] - 1)
+    c = (starts[15], len(text))
+    b = (starts[8], starts[18] - 1)  # menumpang A dan C sekaligus
+    retriever = make_retriever(text, [a, c, b])
+
+    context = retriever.pack_context([(0, 0.9), (1, 0.8), (2, 0.7)], count_words, token_budget=100)
+
+    assert context == text
+    assert count_words(context) == 30
+
+
+class FakeSentenceTransformer:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        vectors = np.stack([
+            np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8)[:8].astype(np.float32) + 1.0
+            for text in texts
+        ])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+
+PAGES = ["aki cepat habis karena alternator lemah", "rem berdecit karena kampas rem aus"]
+
+
+def make_pdf_retriever(monkeypatch, tmp_path, pages, pdf_bytes=b"%PDF-1.4 v1"):
+    model = FakeSentenceTransformer()
+    monkeypatch.setattr(rag_pipeline.registry, "get_sentence_transformer", lambda *args, **kwargs: model)
+    monkeypatch.setattr(
+        rag_pipeline, "iter_pages", lambda path: iter([{"page": i, "content": text} for i, text in enumerate(pages)])
+    )
+    pdf_path = tmp_path / "kb.pdf"
+    pdf_path.write_bytes(pdf_bytes)
+    return KnowledgeBaseRetriever(str(pdf_path), model_name="fake", retrieval_mode="dense"), model
+
+
+def test_chunk_embeddings_are_encoded_once_and_cached_on_disk(monkeypatch, tmp_path):
+    retriever, model = make_pdf_retriever(monkeypatch, tmp_path, PAGES)
+    assert model.encoded == PAGES
+    assert retriever.embeddings.shape == (2, 8)
+    cache_path = retriever.get_cache_path()
+
+    # Query hanya meng-encode dirinya sendiri, bukan seluruh halaman
+    model.encoded.clear()
+    assert retriever.retrieve(PAGES[1], threshold=0.99) == PAGES[1]
+    assert model.encoded == [PAGES[1]]
+
+    # Restart dengan PDF yang sama memakai cache disk tanpa meng-encode ulang
+    restarted, model = make_pdf_retriever(monkeypatch, tmp_path, PAGES)
+    assert model.encoded == []
+    assert restarted.get_cache_path() == cache_path
+    np.testing.assert_array_equal(restarted.embeddings, retriever.embeddings)
+
+
+def test_changed_pdf_is_encoded_again(monkeypatch, tmp_path):
+    cache_path = make_pdf_retriever(monkeypatch, tmp_path, PAGES)[0].get_cache_path()
+    pages = PAGES + ["mesin bergetar karena busi kotor"]
+
+    changed, model = make_pdf_retriever(monkeypatch, tmp_path, pages, pdf_bytes=b"%PDF-1.4 v2")
+
+    assert changed.get_cache_path() != cache_path
+    assert model.encoded == pages
+    assert changed.embeddings.shape == (3, 8)
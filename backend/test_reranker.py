@@ -0,0 +1,41 @@
+import time
+import numpy as np
+import reranker
+from reranker import Reranker
+
+
+class FakeCrossEncoder:
+    def __init__(self, delays):
+        self.delays = list(delays)
+
+    def predict(self, pairs, **kwargs):
+        time.sleep(self.delays.pop(0) if self.delays else 0.0)
+        return np.arange(len(pairs), dtype=np.float32)
+
+
+def make_reranker(monkeypatch, delays):
+    monkeypatch.setattr(reranker.registry, "get_cross_encoder", lambda *args, **kwargs: FakeCrossEncoder(delays))
+    return Reranker(model_name="fake", top_n=10, latency_budget_ms=50.0, margin=0.25)
+
+
+def candidates():
+    return [{"gejala": f"gejala {i}", "penyebab": f"penyebab {i}"} for i in range(10)], [1.0] * 10
+
+
+def test_first_call_is_not_counted(monkeypatch):
+    model = make_reranker(monkeypatch, [0.5])
+    model.rerank("q", *candidates())
+    assert model.stats()["ms_per_pair"] is None
+
+
+def test_slow_call_does_not_disable_reranker(monkeypatch):
+    # Pemanasan cepat, lalu satu panggilan lambat (~30 ms per pasangan), lalu cepat lagi
+    model = make_reranker(monkeypatch, [0.0, 0.3])
+    model.rerank("q", *candidates())
+    model.rerank("q", *candidates())
+
+    reasons = [model.rerank("q", *candidates())[2]["reason"] for _ in range(10)]
+
+    assert reasons[0] == "budget"
+    assert reasons[-1] == "ok"
+    assert model.stats()["skipped_budget"] < 10
@@ -0,0 +1,192 @@
+import importlib
+import json
+import sys
+import time
+import types
+import numpy as np
+import pytest
+import warmup
+from cascade import CascadePlanner, CascadeStage
+from generation import GenerationError
+from inference_pool import InferencePool
+from query_cache import SemanticQueryCache
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    # Modul backend tanpa warmup: model dan indeks diganti tiruan oleh setiap test
+    monkeypatch.setenv("STARTUP_MODE", "background")
+    monkeypatch.setattr(warmup.Warmup, "start", lambda self: None)
+    sys.modules.pop("sistem_pakar_backend", None)
+    module = importlib.import_module("sistem_pakar_backend")
+    yield module
+    sys.modules.pop("sistem_pakar_backend", None)
+
+
+def use_fakes(backend, qa_model_stage):
+    backend.embedding_batcher = types.SimpleNamespace(encode=lambda query: np.ones(4, dtype=np.float32))
+    backend.ask_semantic_cache = SemanticQueryCache(4)
+    backend.ask_cascade = CascadePlanner([CascadeStage("qa_model", qa_model_stage)])
+
+
+def failing_stage(query, query_embedding):
+    raise GenerationError("generate gagal")
+
+
+def test_failed_generation_is_not_cached(backend):
+    use_fakes(backend, failing_stage)
+
+    response = backend.resolve_query("apa penyebab aki lemah?", "v1")
+
+    assert response["answer"] == "Terjadi kesalahan dalam menjawab pertanyaan."
+    assert backend.query_cache.get("apa penyebab aki lemah?", "v1") is None
+
+    # Generasi pulih: request berikutnya menjawab dan baru jawaban itu yang di-cache
+    backend.ask_cascade = CascadePlanner([CascadeStage("qa_model", lambda query, embedding: ({"answer": "aki"}, 0.9))])
+    assert backend.resolve_query("apa penyebab aki lemah?", "v1")["answer"] == "aki"
+    assert backend.query_cache.get("apa penyebab aki lemah?", "v1")["answer"] == "aki"
+
+
+def test_failed_rag_answer_is_not_cached(backend):
+    backend.embedding_batcher = types.SimpleNamespace(encode=lambda query: np.ones(4, dtype=np.float32))
+    backend.rag_semantic_cache = SemanticQueryCache(4)
+    backend.rag_pipeline = types.SimpleNamespace(answer_question=lambda question: None)
+
+    assert backend.resolve_rag_question("apa penyebab aki lemah?", "v1") == "Terjadi kesalahan pada pipeline RAG."
+    assert backend.rag_semantic_cache.get(np.ones(4, dtype=np.float32), "v1") is None
+
+
+def test_paraphrase_does_not_receive_failed_answer(backend):
+    use_fakes(backend, failing_stage)
+    backend.resolve_query("apa penyebab aki lemah?", "v1")
+
+    # Parafrase (embedding sama) tidak boleh mendapat jawaban error dari cache semantik
+    answers = iter([({"answer": "aki"}, 0.9)])
+    backend.ask_cascade = CascadePlanner([CascadeStage("qa_model", lambda query, embedding: next(answers))])
+    assert backend.resolve_query("kenapa aki lemah?", "v1")["answer"] == "aki"
+
+    # Jawaban yang berhasil dipakai untuk parafrase berikutnya tanpa menjalankan kaskade lagi
+    assert backend.resolve_query("mengapa aki cepat lemah?", "v1")["answer"] == "aki"
+    assert backend.ask_semantic_cache.stats()["hits"] == 1
+
+
+def test_knowledge_base_matches_a_batch_of_queries_at_once(backend):
+    backend.knowledge_base = [
+        {"gejala": "aki cepat habis", "penyebab": "alternator lemah", "solusi": "ganti alternator"},
+        {"gejala": "rem berdecit", "penyebab": "kampas rem aus", "solusi": ""},
+    ]
+    backend.knowledge_base_embeddings = np.eye(2, 4, dtype=np.float32)
+    encoded = []
+
+    def encode_many(queries):
+        encoded.append(list(queries))
+        return np.array([[0.0, 1.0, 0.0, 0.0], [0.6, 0.0, 0.8, 0.0], [1.0, 0.0, 0.0, 0.0]], dtype=np.float32)
+
+    backend.embedding_batcher = types.SimpleNamespace(encode_many=encode_many)
+
+    answers = backend.get_answers_from_knowledge_base(["rem", "lainnya", "aki"])
+
+    # Satu encode untuk seluruh batch; skor 0.6 tidak melewati threshold 0.8
+    assert encoded == [["rem", "lainnya", "aki"]]
+    assert answers == [
+        {"gejala": "rem berdecit", "penyebab": "kampas rem aus", "solusi": "Solusi tidak tersedia"},
+        None,
+        {"gejala": "aki cepat habis", "penyebab": "alternator lemah", "solusi": "ganti alternator"},
+    ]
+    answer = backend.get_answer_from_knowledge_base("aki", np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32))
+    assert answer["penyebab"] == "alternator lemah"
+    assert len(encoded) == 1
+
+
+def mark_ready(backend, *names):
+    for name in names:
+        backend.warmup._components[name].state = warmup.READY
+
+
+def parse_sse(body):
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_sse_event_keeps_multiline_payload_on_one_data_line(backend):
+    event = backend.sse_event({"token": "baris satu\nbaris dua"}, event="done")
+
+    assert event == 'event: done\ndata: {"token": "baris satu\\nbaris dua"}\n\n'
+    assert parse_sse(event) == [("done", {"token": "baris satu\nbaris dua"})]
+
+
+def test_qa_model_answer_is_streamed_token_by_token(backend):
+    mark_ready(backend, "embedding_model", "qa_model")
+    backend.embedding_batcher = types.SimpleNamespace(encode=lambda query: np.ones(4, dtype=np.float32))
+    backend.ask_semantic_cache = SemanticQueryCache(4)
+    backend.ask_cascade = CascadePlanner([CascadeStage("knowledge_base", lambda query, embedding: None)])
+    backend.qa_model = types.SimpleNamespace(
+        faiss_index_manager=types.SimpleNamespace(get_metadata_version=lambda: 1),
+        retrieve_relevant_info=lambda query, embedding: "aki lemah karena alternator",
+        generator=types.SimpleNamespace(stream_answer=lambda query, context: iter(["Alternator ", "lemah\n", "."])),
+    )
+    client = backend.app.test_client()
+
+    response = client.post("/ask/stream", json={"query": "kenapa aki lemah?"})
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert response.mimetype == "text/event-stream"
+    assert events[:3] == [("message", {"token": "Alternator "}), ("message", {"token": "lemah\n"}),
+                          ("message", {"token": "."})]
+    assert events[3][0] == "done"
+    assert events[3][1]["answer"] == "Alternator lemah\n."
+    assert events[3][1]["stage"] == "qa_model"
+
+    # Permintaan ulang dijawab dari cache sebagai satu event "done"
+    cached = parse_sse(client.post("/ask/stream", json={"query": "kenapa aki lemah?"}).get_data(as_text=True))
+    assert cached == [events[3]]
+
+
+def test_metrics_endpoint_serves_prometheus_text_during_warmup(backend):
+    mark_ready(backend, "runtime")
+
+    response = backend.app.test_client().get("/metrics")
+    lines = response.get_data(as_text=True).splitlines()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'sistem_pakar_component_ready{component="runtime"} 1' in lines
+    assert 'sistem_pakar_component_ready{component="qa_model"} 0' in lines
+
+
+def test_requests_during_warmup_get_503_until_their_components_are_ready(backend):
+    client = backend.app.test_client()
+
+    health = client.get("/health").get_json()
+    response = client.post("/ask", json={"query": "kenapa aki lemah?"})
+
+    assert health["status"] == "ok"
+    assert health["ready"] is False
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert response.get_json()["components"] == ["embedding_model"]
+
+    mark_ready(backend, "embedding_model")
+    assert client.post("/rag", json={"question": "kenapa aki lemah?"}).get_json()["components"] == ["rag_pipeline"]
+
+
+def test_saturated_or_slow_inference_pool_maps_to_503_and_504(backend):
+    mark_ready(backend, "embedding_model")
+    backend.inference_pool = InferencePool(max_workers=1, max_queue=0, timeout_seconds=0.05)
+    client = backend.app.test_client()
+
+    reservation = backend.inference_pool.reserve()
+    saturated = client.post("/ask", json={"query": "kenapa aki lemah?"})
+    reservation.release()
+    assert saturated.status_code == 503
+    assert saturated.headers["Retry-After"] == "1"
+
+    backend.resolve_query = lambda query, cache_version: time.sleep(0.5)
+    timed_out = client.post("/ask", json={"query": "kenapa aki lemah?"})
+    assert timed_out.status_code == 504
+    assert backend.inference_pool.stats()["timeouts"] == 1
@@ -0,0 +1,58 @@
+import threading
+import pytest
+from warmup import FAILED, LOADING, READY, ComponentNotReadyError, Warmup
+
+
+def test_background_warmup_serves_each_component_as_soon_as_it_is_ready():
+    release = threading.Event()
+    warmup = Warmup()
+    warmup.add("embedding_model", lambda: None)
+    warmup.add("qa_model", lambda: release.wait(5), requires=("embedding_model",))
+
+    warmup.start()
+    try:
+        while not warmup.is_ready("embedding_model"):
+            warmup.wait(0.01)
+        # Tahap murah sudah bisa dilayani sementara model besar masih dimuat
+        warmup.require("embedding_model")
+        with pytest.raises(ComponentNotReadyError) as error:
+            warmup.require("embedding_model", "qa_model")
+        assert error.value.components == ["qa_model"]
+        assert warmup.status()["components"]["qa_model"]["state"] == LOADING
+        assert warmup.status()["ready"] is False
+    finally:
+        release.set()
+
+    assert warmup.wait(5)
+    assert warmup.is_ready("embedding_model", "qa_model")
+    assert warmup.version == 2
+    assert warmup.status()["ready"] is True
+
+
+def test_failed_component_blocks_its_dependents_only():
+    def broken():
+        raise OSError("model tidak ditemukan")
+
+    warmup = Warmup()
+    warmup.add("runtime", lambda: None)
+    warmup.add("embedding_model", broken, requires=("runtime",))
+    warmup.add("qa_model", lambda: None, requires=("embedding_model",))
+    warmup.add("assistant_model", lambda: None, requires=("runtime",))
+
+    warmup.run()
+
+    components = warmup.status()["components"]
+    assert components["embedding_model"]["state"] == FAILED
+    assert components["embedding_model"]["error"] == "model tidak ditemukan"
+    assert components["qa_model"]["state"] == FAILED
+    assert "embedding_model" in components["qa_model"]["error"]
+    assert components["assistant_model"]["state"] == READY
+
+
+def test_eager_warmup_raises_the_load_error():
+    warmup = Warmup()
+    warmup.add("runtime", lambda: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        warmup.run(raise_on_error=True)
+    assert warmup.wait(0)
@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+import time
+from metrics import metrics
+
+# Konfigurasi logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Status komponen selama warmup
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class ComponentNotReadyError(RuntimeError):
+    """Komponen yang dibutuhkan request masih dimuat (atau gagal dimuat); request sebaiknya dijawab 503."""
+
+    def __init__(self, components):
+        self.components = list(components)
+        super().__init__(f"Komponen belum siap: {', '.join(self.components)}")
+
+
+class Component:
+    def __init__(self, name, load, requires=()):
+        """
+        Satu komponen yang dimuat saat warmup.
+
+        :param load: Fungsi tanpa argumen yang memuat komponen (mis. model atau indeks) ke state modul
+        :param requires: Nama komponen yang harus siap lebih dulu
+        """
+        self.name = name
+        self.load = load
+        self.requires = tuple(requires)
+        self.state = PENDING
+        self.load_seconds = None
+        self.ready_at = None  # detik sejak warmup dibuat
+        self.error = None
+
+
+class Warmup:
+    def __init__(self):
+        """
+        Memuat komponen backend sesuai urutan pendaftarannya dan mencatat kesiapan masing-masing.
+
+        ``run`` memuat semuanya di thread pemanggil (start eager: impor selesai setelah semua siap),
+        ``start`` menjalankannya di thread latar sehingga server bisa langsung menerima request
+        dan setiap tahap dilayani begitu komponennya siap.
+        """
+        self.created = time.perf_counter()
+        self._components = {}  # nama -> Component, sesuai urutan pendaftaran
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        # Bertambah setiap ada komponen yang siap; dipakai sebagai bagian versi cache jawaban
+        self.version = 0
+
+    def add(self, name, load, requires=()):
+        with self._lock:
+            self._components[name] = Component(name, load, requires)
+
+    def _load(self, component, raise_on_error):
+        with self._lock:
+            blocked = [name for name in component.requires if self._components[name].state != READY]
+            if blocked:
+                component.state = FAILED
+                component.error = f"Dependensi gagal dimuat: {', '.join(blocked)}"
+            else:
+                component.state = LOADING
+        if blocked:
+            logger.error(f"Komponen {component.name} dilewati: {component.error}")
+            return
+
+        logger.info(f"Memuat komponen {component.name}...")
+        start = time.perf_counter()
+        try:
+            component.load()
+        except Exception as e:
+            with self._lock:
+                component.state = FAILED
+                component.error = str(e)
+                component.load_seconds = time.perf_counter() - start
+            logger.error(f"Komponen {component.name} gagal dimuat: {e}")
+            if raise_on_error:
+                raise
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            component.state = READY
+            component.load_seconds = now - start
+            component.ready_at = now - self.created
+            self.version += 1
+        logger.info(f"Komponen {component.name} siap dalam {component.load_seconds:.2f} s "
+                    f"({component.ready_at:.2f} s sejak start).")
+
+    def run(self, raise_on_error=False):
+        """
+        Memuat seluruh komponen yang belum dimuat di thread ini.
+
+        :param raise_on_error: Meneruskan error komponen (start eager) alih-alih hanya menandainya gagal
+        """
+        try:
+            for component in list(self._components.values()):
+                if component.state == PENDING:
+                    self._load(component, raise_on_error)
+        finally:
+            self._done.set()
+        logger.info(f"Warmup selesai dalam {time.perf_counter() - self.created:.2f} s: "
+                    + ", ".join(f"{name}={c.state}" for name, c in self._components.items()))
+
+    def start(self):
+        """
+        Menjalankan warmup di thread latar (sekali per proses).
+        """
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread_pid = os.getpid()
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """
+        Menunggu warmup selesai; True jika selesai sebelum ``timeout``.
+        """
+        return self._done.wait(timeout)
+
+    def is_ready(self, *names):
+        with self._lock:
+            return all(self._components[name].state == READY for name in names)
+
+    def require(self, *names):
+        """
+        Memastikan komponen siap; jika belum, melempar ComponentNotReadyError.
+        """
+        with self._lock:
+            missing = [name for name in names if self._components[name].state != READY]
+        if missing:
+            raise ComponentNotReadyError(missing)
+
+    def status(self):
+        """
+        Melaporkan status, waktu muat dan error setiap komponen untuk /debug.
+        """
+        with self._lock:
+            components = {
+                name: {
+                    "state": component.state,
+                    "load_seconds": round(component.load_seconds, 3) if component.load_seconds is not None else None,
+                    "ready_at_seconds": round(component.ready_at, 3) if component.ready_at is not None else None,
+                    "error": component.error,
+                }
+                for name, component in self._components.items()
+            }
+        return {
+            "ready": all(component["state"] == READY for component in components.values()),
+            "finished": self._done.is_set(),
+            "uptime_seconds": round(time.perf_counter() - self.created, 3),
+            "components": components,
+        }
+
+    def register_metrics(self):
+        """
+        Mendaftarkan gauge kesiapan dan waktu muat per komponen.
+        """
+        metrics.gauge("component_ready", lambda: [
+            ({'component': name}, int(component["state"] == READY))
+            for name, component in self.status()["components"].items()
+        ])
+        metrics.gauge("component_load_seconds", lambda: [
+            ({'component': name}, component["load_seconds"])
+            for name, component in self.status()["components"].items()
+        ])
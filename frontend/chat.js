@@ -68,22 +68,35 @@ function sendMessage() {
         saveFirstInput(message);
         userInput.value = '';
 
-        // Kirim pertanyaan ke backend Flask
-        fetch('http://127.0.0.1:5000/ask', { // Pastikan URL sesuai dengan backend
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ query: message }) // Key JSON adalah "query"
-        })
-        .then(response => response.json())
+        // Elemen jawaban diisi bertahap begitu token dari model tiba
+        let streamElement = null;
+        const onToken = token => {
+            if (!streamElement) {
+                streamElement = document.createElement('div');
+                streamElement.classList.add('message', 'bot-message');
+                chatBox.appendChild(streamElement);
+            }
+            streamElement.textContent += token;
+            chatBox.scrollTop = chatBox.scrollHeight;
+        };
+
+        // Kirim pertanyaan ke backend Flask (helper SSE bersama dari sse.js)
+        streamAsk(message, onToken)
         .then(data => {
             if (data.answer) {
-                typeMessage(data.answer, () => {
+                if (streamElement) {
+                    // Jawaban sudah tampil token demi token
+                    streamElement.textContent = data.answer;
                     if (data.follow_up) {
-                        typeMessage(data.follow_up); // Tampilkan tindak lanjut jika tersedia
+                        typeMessage(data.follow_up);
                     }
-                });
+                } else {
+                    typeMessage(data.answer, () => {
+                        if (data.follow_up) {
+                            typeMessage(data.follow_up); // Tampilkan tindak lanjut jika tersedia
+                        }
+                    });
+                }
             } else if (data.error) {
                 typeMessage(`Error: ${data.error}`);
             } else {
@@ -108,12 +108,19 @@ document.addEventListener("DOMContentLoaded", function() {
       chatContent.innerHTML += "<div><strong>You:</strong> " + userMessage + "</div>";
       document.getElementById("user-input").value = "";
 
-      // Proses pesan dan tampilkan jawaban (contoh sistem pakar sederhana)
-      setTimeout(async function() {
-        var response = await getDiagnosis(userMessage);  // Mendapatkan diagnosis berdasarkan gejala
-        chatContent.innerHTML += "<div><strong>System:</strong> " + response + "</div>";
+      // Proses pesan dan tampilkan jawaban secara bertahap saat token dari server tiba
+      var systemMessage = document.createElement("div");
+      systemMessage.innerHTML = "<strong>System:</strong> ";
+      var answerText = document.createElement("span");
+      systemMessage.appendChild(answerText);
+      chatContent.appendChild(systemMessage);
+
+      var response = await getDiagnosis(userMessage, function(token) {
+        answerText.textContent += token;
         chatContent.scrollTop = chatContent.scrollHeight; // Scroll ke bawah
-      }, 1000);
+      });
+      answerText.innerHTML = response;  // Jawaban akhir (bisa berisi format HTML dari server)
+      chatContent.scrollTop = chatContent.scrollHeight; // Scroll ke bawah
     }
   });
 });
@@ -160,19 +167,12 @@ async function getDiagnosis(userMessage) {
   }
 }
 
-// Fungsi untuk mengirim pertanyaan ke server dan mendapatkan jawaban
-async function getDiagnosis(userMessage) {
+// Fungsi untuk mengirim pertanyaan ke server dan mendapatkan jawaban secara streaming (Server-Sent Events)
+// onToken dipanggil untuk setiap potongan teks yang tiba sebelum jawaban lengkap dikembalikan
+async function getDiagnosis(userMessage, onToken) {
   try {
-    const response = await fetch('http://127.0.0.1:5000/ask', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ question: userMessage })
-    });
-
-    const data = await response.json();
-    return data.answer || "Tidak ada jawaban yang ditemukan.";
+    const result = await streamAsk(userMessage, onToken);  // Helper SSE bersama dari sse.js
+    return result.answer || result.error || "Tidak ada jawaban yang ditemukan.";
   } catch (error) {
     return "Terjadi kesalahan saat menghubungi server.";
   }
@@ -0,0 +1,67 @@
+// Helper bersama untuk membaca jawaban streaming (Server-Sent Events) dari endpoint /ask/stream
+// Dipakai oleh script.js (getDiagnosis) dan chat.js (sendMessage)
+const ASK_STREAM_URL = 'http://127.0.0.1:5000/ask/stream'; // Pastikan URL sesuai dengan backend
+
+// Mengurai satu blok event SSE menjadi { event, data }
+// Beberapa baris "data:" dalam satu event digabung dengan "\n" sesuai spesifikasi SSE
+function parseSseEvent(rawEvent) {
+    let eventName = 'message';
+    const dataLines = [];
+    rawEvent.split(/\r\n|\r|\n/).forEach(line => {
+        if (!line || line.startsWith(':')) return; // Baris kosong atau komentar
+        const colon = line.indexOf(':');
+        const field = colon === -1 ? line : line.slice(0, colon);
+        let value = colon === -1 ? '' : line.slice(colon + 1);
+        if (value.startsWith(' ')) value = value.slice(1); // Hanya satu spasi awal yang dibuang
+        if (field === 'event') {
+            eventName = value;
+        } else if (field === 'data') {
+            dataLines.push(value);
+        }
+    });
+    return { event: eventName, data: dataLines.length ? dataLines.join('\n') : null };
+}
+
+// Mengirim pertanyaan ke backend dan membaca jawabannya secara streaming
+// onToken dipanggil untuk setiap potongan teks; hasil akhirnya adalah payload event "done"/"error"
+// (atau body JSON biasa bila server menolak permintaan sebelum stream dimulai)
+async function streamAsk(query, onToken) {
+    const response = await fetch(ASK_STREAM_URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ query: query }) // Key JSON adalah "query"
+    });
+
+    if (!response.ok || !response.body) {
+        return response.json();
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split(/\r\n\r\n|\n\n|\r\r/);
+        buffer = events.pop(); // Sisa event yang belum lengkap
+
+        events.forEach(rawEvent => {
+            const { event, data } = parseSseEvent(rawEvent);
+            if (data === null) return;
+
+            const payload = JSON.parse(data);
+            if (event === 'done' || event === 'error') {
+                result = payload;
+            } else if (payload.token && onToken) {
+                onToken(payload.token);
+            }
+        });
+    }
+    return result || {};
+}